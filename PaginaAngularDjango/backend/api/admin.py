@@ -7,6 +7,7 @@ from .models import (
     TipoCambio,
     Portafolio,
     Posicion,
+    Job,
 )
 
 @admin.register(Project)
@@ -49,4 +50,10 @@ class PortafolioAdmin(admin.ModelAdmin):
 @admin.register(Posicion)
 class PosicionAdmin(admin.ModelAdmin):
     list_display = ("id",)  # ajusta campos reales
-    search_fields = ("id",)
\ No newline at end of file
+    search_fields = ("id",)
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "tipo", "estado", "intentos", "procesados", "creado", "terminado")
+    list_filter = ("tipo", "estado")
+    ordering = ("-creado",)
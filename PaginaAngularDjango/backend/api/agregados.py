@@ -0,0 +1,124 @@
+"""
+Agregados regionales materializados (tabla AgregadoRegional).
+
+La unidad de recálculo es el par (tipo, anio): cualquier cambio en un indicador,
+o en la población/región/estado de un país, recalcula las filas de ese par para
+todas las regiones (y LATAM) con una lectura y un bulk upsert. Así las lecturas de
+``/api/regiones/`` no dependen del tamaño del histórico.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+
+from . import cache
+from .models import AgregadoRegional, IndicadorEconomico
+
+
+LATAM = AgregadoRegional.LATAM
+
+CAMPOS = ("paises", "promedio", "promedio_ponderado", "mediana", "minimo", "maximo", "ranking")
+
+
+def estadisticas(codigos: np.ndarray, valores: np.ndarray, poblacion: np.ndarray) -> dict:
+    """
+    Estadísticas de un grupo de países (arrays alineados). El promedio ponderado es
+    None si la población total es 0.
+    """
+    peso_total = poblacion.sum()
+    orden = np.argsort(-valores, kind="stable")
+    return {
+        "paises": int(len(valores)),
+        "promedio": float(valores.mean()),
+        "promedio_ponderado": float(np.dot(valores, poblacion) / peso_total) if peso_total > 0 else None,
+        "mediana": float(np.median(valores)),
+        "minimo": float(valores.min()),
+        "maximo": float(valores.max()),
+        "ranking": [
+            {"codigo_iso": str(codigos[i]), "valor": float(valores[i]), "posicion": posicion}
+            for posicion, i in enumerate(orden.tolist(), start=1)
+        ],
+    }
+
+
+def _calcular(filas) -> dict:
+    """
+    filas: (tipo, anio, valor, codigo_iso, region, poblacion). Devuelve
+    {(tipo, anio, region): estadisticas}.
+    """
+    grupos = defaultdict(list)
+    for tipo, anio, *resto in filas:
+        grupos[(tipo, anio)].append(resto)
+
+    resultado = {}
+    for (tipo, anio), datos in grupos.items():
+        valor, codigo, region, poblacion = (np.asarray(c) for c in zip(*datos))
+        valor = valor.astype(float)
+        poblacion = poblacion.astype(float)
+        resultado[(tipo, anio, LATAM)] = estadisticas(codigo, valor, poblacion)
+        for r in np.unique(region).tolist():
+            mascara = region == r
+            resultado[(tipo, anio, r)] = estadisticas(codigo[mascara], valor[mascara], poblacion[mascara])
+    return resultado
+
+
+def recalcular(claves=None) -> int:
+    """
+    Recalcula los agregados de los pares (tipo, anio) indicados (todos si ``claves`` es None)
+    y borra los que quedaron sin datos. Devuelve el número de filas escritas.
+    """
+    indicadores = IndicadorEconomico.objects.filter(pais__activo=True)
+    existentes = AgregadoRegional.objects.all()
+    if claves is not None:
+        claves = set(claves)
+        if not claves:
+            return 0
+        tipos = {t for t, _ in claves}
+        anios = {a for _, a in claves}
+        indicadores = indicadores.filter(tipo__in=tipos, anio__in=anios)
+        existentes = existentes.filter(tipo__in=tipos, anio__in=anios)
+
+    filas = indicadores.order_by().values_list(
+        "tipo", "anio", "valor", "pais__codigo_iso", "pais__region", "pais__poblacion"
+    )
+    if claves is not None:
+        filas = [f for f in filas if (f[0], f[1]) in claves]
+    calculados = _calcular(filas)
+
+    sobrantes = [
+        pk
+        for pk, tipo, anio, region in existentes.values_list("pk", "tipo", "anio", "region")
+        if (claves is None or (tipo, anio) in claves) and (tipo, anio, region) not in calculados
+    ]
+
+    with transaction.atomic():
+        if calculados:
+            AgregadoRegional.objects.bulk_create(
+                [
+                    AgregadoRegional(tipo=tipo, anio=anio, region=region, **datos)
+                    for (tipo, anio, region), datos in calculados.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["tipo", "anio", "region"],
+                update_fields=[*CAMPOS, "actualizado"],
+            )
+        if sobrantes:
+            AgregadoRegional.objects.filter(pk__in=sobrantes).delete()
+
+    if calculados or sobrantes:
+        cache.invalidar(cache.REGIONES)
+    return len(calculados)
+
+
+def recalcular_paises(codigos_iso) -> int:
+    """
+    Recalcula los pares (tipo, anio) en los que aparecen los países indicados
+    (cambios de población, región o ``activo``).
+    """
+    claves = set(
+        IndicadorEconomico.objects.filter(pais__codigo_iso__in=list(codigos_iso))
+        .order_by()
+        .values_list("tipo", "anio")
+        .distinct()
+    )
+    return recalcular(claves)
@@ -0,0 +1,218 @@
+"""
+Vistas async para ASGI: lecturas de países / tipos de cambio y el encolado del sync de países.
+
+DRF no tiene handlers async, así que son vistas de Django. La autenticación JWT y
+los permisos por rol se evalúan con las mismas clases de DRF (dentro de
+``sync_to_async``), las consultas usan el ORM async y la respuesta sale por los
+mismos serializers y FastJSONRenderer que la API síncrona. Con WSGI también
+funcionan, pero solo ganan concurrencia con un servidor ASGI.
+"""
+import asyncio
+import json
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, PermissionDenied
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import eventos, jobs
+from .filtros import FechaInvalida, filtrar_tipos_cambio
+from .metricas import medido
+from .models import Job, Pais, TipoCambio
+from .permissions import IsAdminRole, IsViewerOrAbove
+from .renderers import FastJSONRenderer
+from .serializers import JobSerializer, PaisDetailSerializer, PaisSerializer, TipoCambioSerializer
+from .sync import parametros_job
+
+
+LIMITE_DEFAULT = 100
+LIMITE_MAX = 1000
+
+
+def _json(data, status_code: int = status.HTTP_200_OK, headers=None) -> HttpResponse:
+    return HttpResponse(
+        FastJSONRenderer().render(data), status=status_code, content_type="application/json", headers=headers
+    )
+
+
+def _autorizar(request, permiso):
+    """
+    Corre los authenticators y el permiso de DRF. Devuelve None (y deja el usuario en
+    ``request.user``) o la respuesta de error.
+    """
+    drf_request = Request(request, authenticators=[a() for a in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        if permiso().has_permission(drf_request, None):
+            request.user = drf_request.user
+            return None
+        error = NotAuthenticated() if not drf_request.user.is_authenticated else PermissionDenied()
+    except APIException as e:  # token inválido o vencido
+        error = e
+    return _json({"detail": error.detail}, error.status_code)
+
+
+def requiere(permiso):
+    def decorador(vista):
+        @wraps(vista)
+        async def wrapper(request, *args, **kwargs):
+            error = await sync_to_async(_autorizar)(request, permiso)
+            if error is not None:
+                return error
+            return await vista(request, *args, **kwargs)
+        return wrapper
+    return decorador
+
+
+@require_GET
+@requiere(IsViewerOrAbove)
+async def paises(request):
+    """
+    GET /api/async/paises/?region=ANDINA  (sin paginar: son pocas filas)
+    """
+    qs = Pais.objects.filter(activo=True)
+    if request.GET.get("region"):
+        qs = qs.filter(region=request.GET["region"])
+    filas = [pais async for pais in qs]
+    return _json(medido(PaisSerializer(filas, many=True)).data)
+
+
+@require_GET
+@requiere(IsViewerOrAbove)
+async def pais(request, codigo_iso):
+    """
+    GET /api/async/paises/{iso}/
+    """
+    try:
+        obj = await Pais.objects.prefetch_related("indicadores").aget(activo=True, codigo_iso=codigo_iso)
+    except Pais.DoesNotExist:
+        return _json({"detail": "No encontrado."}, status.HTTP_404_NOT_FOUND)
+    return _json(medido(PaisDetailSerializer(obj)).data)
+
+
+@require_GET
+@requiere(IsViewerOrAbove)
+async def pais_tipo_cambio(request, codigo_iso):
+    """
+    GET /api/async/paises/{iso}/tipo-cambio/  (última tasa moneda -> USD)
+    """
+    moneda = await Pais.objects.filter(activo=True, codigo_iso=codigo_iso).values_list(
+        "moneda_codigo", flat=True
+    ).afirst()
+    if moneda is None:
+        return _json({"detail": "No encontrado."}, status.HTTP_404_NOT_FOUND)
+    fx = await TipoCambio.objects.filter(moneda_origen=moneda, moneda_destino="USD").order_by("-fecha").afirst()
+    if fx is None:
+        return _json({"detail": "No hay tipo de cambio registrado."}, status.HTTP_404_NOT_FOUND)
+    return _json(medido(TipoCambioSerializer(fx)).data)
+
+
+@require_GET
+@requiere(IsViewerOrAbove)
+async def tipos_cambio(request):
+    """
+    GET /api/async/tipos-cambio/?moneda_origen=&moneda_destino=&desde=&hasta=&limite=100
+    Mismos filtros que /api/tipos-cambio/, las más recientes primero.
+    """
+    try:
+        limite = max(1, min(int(request.GET.get("limite", LIMITE_DEFAULT)), LIMITE_MAX))
+    except ValueError:
+        return _json({"detail": "limite debe ser un entero."}, status.HTTP_400_BAD_REQUEST)
+    try:
+        qs = filtrar_tipos_cambio(TipoCambio.objects.all(), request.GET).order_by("-fecha", "-pk")[:limite]
+    except FechaInvalida as e:
+        return _json(e.detail, e.status_code)
+    return _json(medido(TipoCambioSerializer([fx async for fx in qs], many=True)).data)
+
+
+@csrf_exempt  # autenticación por JWT, no por cookie
+@require_POST
+@requiere(IsAdminRole)
+async def sync_paises(request):
+    """
+    POST /api/async/sync/paises/  body opcional: {"iso": ["CO", "BR"], "forzar": false}
+    Igual que /api/sync/paises/: encola el job (con la misma deduplicación y reintentos)
+    y responde 202 con su URL de seguimiento.
+    """
+    try:
+        body = json.loads(request.body or b"{}")
+    except ValueError:
+        return _json({"detail": "JSON inválido."}, status.HTTP_400_BAD_REQUEST)
+    try:
+        parametros = parametros_job(body)
+    except ValueError as e:
+        return _json({"detail": str(e)}, status.HTTP_400_BAD_REQUEST)
+    datos = await sync_to_async(_encolar_sync)(request, parametros)
+    return _json(datos, status.HTTP_202_ACCEPTED, headers={"Location": datos["url"]})
+
+
+def _encolar_sync(request, parametros) -> dict:
+    # Mismo cuerpo que views.respuesta_job; el serializer lee job.usuario de la base
+    job, creado = jobs.encolar(Job.Tipo.SYNC_PAISES, parametros, usuario=request.user)
+    url = request.build_absolute_uri(reverse("job-detail", args=[job.pk]))
+    return {**JobSerializer(job).data, "duplicado": not creado, "url": url}
+
+
+@require_GET
+async def eventos_stream(request):
+    """
+    GET /api/eventos/?canales=tipos_cambio,indicadores  (text/event-stream)
+    Deltas de tipos de cambio e indicadores en vivo. EventSource no permite headers, así
+    que el access token puede ir en ?token=. Reanuda desde el header Last-Event-ID.
+    """
+    if "token" in request.GET and "HTTP_AUTHORIZATION" not in request.META:
+        request.META["HTTP_AUTHORIZATION"] = f"Bearer {request.GET['token']}"
+    return await _eventos_stream(request)
+
+
+@requiere(IsViewerOrAbove)
+async def _eventos_stream(request):
+    if not hasattr(request, "scope"):
+        # Con WSGI Django consumiría el stream completo antes de responder
+        return _json({"detail": "El stream de eventos requiere un servidor ASGI."}, status.HTTP_501_NOT_IMPLEMENTED)
+    canales = [c for c in request.GET.get("canales", ",".join(eventos.CANALES)).split(",") if c]
+    if not canales or set(canales) - set(eventos.CANALES):
+        return _json({"detail": f"canales admite: {', '.join(eventos.CANALES)}."}, status.HTTP_400_BAD_REQUEST)
+
+    config = eventos.get_config()
+    await sync_to_async(eventos.bus.sondear)(forzar=True)
+    suscripcion, pendientes, reset = eventos.bus.suscribir(
+        asyncio.get_running_loop(), canales, request.headers.get("Last-Event-ID")
+    )
+    response = StreamingHttpResponse(
+        _stream(suscripcion, pendientes, reset, config), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: no bufferear
+    return response
+
+
+async def _stream(suscripcion, pendientes, reset, config):
+    try:
+        yield b"retry: %d\n\n" % config["RETRY_MS"]
+        if reset:
+            yield eventos.bus.reset()
+        if pendientes:
+            yield b"".join(e.mensaje for e in pendientes)
+        fin = time.monotonic() + config["DURACION_MAX_S"]
+        enviado = time.monotonic()
+        while (restante := fin - time.monotonic()) > 0:
+            nuevos = await suscripcion.siguientes(min(config["POLL_S"], restante))
+            if nuevos is None:
+                break  # cliente lento: reconecta con Last-Event-ID y sigue desde el buffer
+            if nuevos:
+                yield b"".join(e.mensaje for e in nuevos)
+                enviado = time.monotonic()
+            elif time.monotonic() - enviado >= config["KEEPALIVE_S"]:
+                yield b": keepalive\n\n"
+                enviado = time.monotonic()
+            # Lo que escribieron otros procesos; como mucho una consulta por POLL_S en el proceso
+            await sync_to_async(eventos.bus.sondear)()
+    finally:
+        eventos.bus.desuscribir(suscripcion)
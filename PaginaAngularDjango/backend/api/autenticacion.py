@@ -0,0 +1,122 @@
+"""
+Autenticación JWT con el usuario y sus roles cacheados en memoria del proceso.
+
+``JWTAuthentication`` de simplejwt lee el usuario de la base en cada request y los
+permisos leen después sus grupos. ``JWTCacheAuthentication`` guarda ambos ``TTL_S``
+segundos por (id de usuario, versión del token): la versión es el claim de revocación
+de simplejwt (hash de la contraseña, con ``CHECK_REVOKE_TOKEN``). Un token emitido antes
+de un cambio de contraseña no encuentra entrada, se valida contra la base y se rechaza.
+
+Las señales descartan las entradas de un usuario cuando se guarda o se borra (cambio de
+contraseña, is_active, is_superuser) o cambian sus grupos, y todas cuando se modifica o
+se borra un grupo. La caché es por proceso: en los demás workers el cambio se ve al
+vencer el TTL, por eso es corto.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .permissions import get_user_roles
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "TTL_S": 60,
+    "MAX_USUARIOS": 10_000,   # entradas (usuario, versión) antes de descartar las más viejas
+    "ROLES_EN_TOKEN": True,   # claim "roles" en los tokens de /api/auth/login/
+}
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "DATAPULSE_AUTH", {})}
+
+
+class CacheUsuarios:
+    """
+    LRU con vencimiento: ``(user_id, version) -> usuario`` con los roles ya resueltos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> (vence, usuario)
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] < time.monotonic():
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[1]
+
+    def guardar(self, clave, usuario, ttl: float, maximo: int) -> None:
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + ttl, usuario)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > maximo:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, user_id) -> None:
+        user_id = str(user_id)
+        with self._lock:
+            for clave in [c for c in self._entradas if c[0] == user_id]:
+                del self._entradas[clave]
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+usuarios = CacheUsuarios()
+
+
+def invalidar_usuario(user_id) -> None:
+    """
+    Descarta al usuario ahora y otra vez al confirmar la transacción: un request que lo
+    leyó antes del commit no deja en la caché la versión vieja.
+    """
+    usuarios.invalidar(user_id)
+    transaction.on_commit(lambda: usuarios.invalidar(user_id))
+
+
+def invalidar_todos() -> None:
+    usuarios.limpiar()
+    transaction.on_commit(usuarios.limpiar)
+
+
+class JWTCacheAuthentication(JWTAuthentication):
+    """
+    Igual que ``JWTAuthentication`` (mismas validaciones y errores), sin queries mientras
+    el usuario esté en la caché. Cada request recibe su propia copia del usuario.
+    """
+
+    def get_user(self, validated_token):
+        config = get_config()
+        if not config["ENABLED"]:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("El token no identifica al usuario.") from e
+
+        version = validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) if api_settings.CHECK_REVOKE_TOKEN else None
+        clave = (str(user_id), version)
+        user = usuarios.obtener(clave)
+        if user is None:
+            # Usuario inexistente, inactivo o con otra contraseña: falla acá y no se cachea
+            user = super().get_user(validated_token)
+            get_user_roles(user)
+            usuarios.guardar(clave, user, config["TTL_S"], config["MAX_USUARIOS"])
+        return copy.copy(user)
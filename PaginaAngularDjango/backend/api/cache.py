@@ -0,0 +1,121 @@
+"""
+Caché de respuestas para endpoints de solo lectura.
+
+Usa el framework de caché de Django (``settings.DATAPULSE_CACHE["ALIAS"]``), así
+que funciona con LocMemCache o FileBasedCache sin servicios externos.
+
+Cada recurso ("paises", "indicadores", "tipos_cambio") tiene un número de versión
+guardado en la misma caché, sin expiración. Las claves incluyen las versiones de los
+recursos de los que depende la respuesta: invalidar es solo cambiar la versión, las
+entradas viejas quedan huérfanas y expiran solas. Las versiones salen del reloj
+(``time.time_ns()``), no de un contador: si la caché descarta la clave de versión
+(FileBasedCache borra entradas al pasar MAX_ENTRIES) la nueva no repite una anterior
+cuyas respuestas sigan vivas.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+DEFAULTS = {
+    "ALIAS": "default",
+    "TIMEOUT": 300,
+    "ENABLED": True,
+}
+
+PAISES = "paises"
+INDICADORES = "indicadores"
+TIPOS_CAMBIO = "tipos_cambio"
+REGIONES = "regiones"
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "DATAPULSE_CACHE", {})}
+
+
+def _backend():
+    return caches[get_config()["ALIAS"]]
+
+
+def _clave_version(recurso: str) -> str:
+    return f"datapulse:v:{recurso}"
+
+
+def versiones(*recursos: str) -> list:
+    backend = _backend()
+    claves = [_clave_version(r) for r in recursos]
+    actuales = backend.get_many(claves)
+    for clave in claves:
+        if clave not in actuales:
+            # Nunca invalidado o descartado por la caché: versión nueva (add, por si otro worker se adelanta)
+            actuales[clave] = backend.get_or_set(clave, time.time_ns, timeout=None)
+    return [actuales[c] for c in claves]
+
+
+def invalidar(*recursos: str) -> None:
+    """
+    Invalida todas las respuestas cacheadas que dependen de alguno de los recursos.
+    """
+    backend = _backend()
+    for recurso in recursos:
+        clave = _clave_version(recurso)
+        # Sin incr: en FileBasedCache es get + set con el TIMEOUT por defecto. Dos workers
+        # que invalidan a la vez dejan una u otra versión, ambas nuevas.
+        backend.set(clave, max(time.time_ns(), backend.get(clave, 0) + 1), timeout=None)
+
+
+def clave_respuesta(request, recursos) -> str:
+    version = ".".join(str(v) for v in versiones(*recursos))
+    ruta = hashlib.md5(request.get_full_path().encode("utf-8")).hexdigest()
+    return f"datapulse:r:{'+'.join(recursos)}:{version}:{ruta}"
+
+
+def cache_response(*recursos: str):
+    """
+    Decorador para métodos de viewset (list/retrieve/@action).
+
+    Va dentro del handler, así que DRF ya aplicó autenticación y permisos cuando se
+    consulta la caché: un usuario sin rol nunca recibe una respuesta cacheada. Solo
+    se guardan respuestas 200 y se guarda ``response.data`` (ya serializado).
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def wrapper(self, request, *args, **kwargs):
+            config = get_config()
+            if not config["ENABLED"]:
+                return metodo(self, request, *args, **kwargs)
+
+            backend = _backend()
+            clave = clave_respuesta(request, recursos)
+            data = backend.get(clave)
+            if data is not None:
+                return Response(data)
+
+            response = metodo(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                backend.set(clave, response.data, timeout=config["TIMEOUT"])
+            return response
+        return wrapper
+    return decorador
+
+
+def memo(nombre: str, recursos, partes, calcular, timeout=None):
+    """
+    Resultado de ``calcular()`` cacheado por ``partes`` y por la versión de ``recursos``.
+    Para valores intermedios (p. ej. matrices de NumPy), no para respuestas.
+    """
+    config = get_config()
+    if not config["ENABLED"]:
+        return calcular()
+    backend = _backend()
+    version = ".".join(str(v) for v in versiones(*recursos))
+    clave = f"datapulse:m:{nombre}:{version}:{hashlib.md5(repr(partes).encode('utf-8')).hexdigest()}"
+    valor = backend.get(clave)
+    if valor is None:
+        valor = calcular()
+        backend.set(clave, valor, timeout=config["TIMEOUT"] if timeout is None else timeout)
+    return valor
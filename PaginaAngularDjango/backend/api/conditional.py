@@ -0,0 +1,56 @@
+"""
+GET condicional (ETag) para los viewsets.
+
+El validador sale de agregados baratos (MAX de la fecha de actualización y COUNT
+de filas) calculados antes de serializar: si el cliente ya tiene la versión actual
+se responde 304 sin tocar el serializer. No se manda Last-Modified: una fecha sola
+no ve los borrados (el MAX no cambia) y If-Modified-Since daría 304 con datos viejos.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _etag(request, agregados) -> str:
+    # La ruta completa y el Accept distinguen listados filtrados/paginados y renderers
+    base = "|".join([request.get_full_path(), request.headers.get("Accept", ""), repr(agregados)])
+    return quote_etag(hashlib.md5(base.encode("utf-8")).hexdigest())
+
+
+def _no_modificado(request, etag: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return "*" in etags or etag in etags or etag in [e.removeprefix("W/") for e in etags]
+
+
+def _con_validadores(response, etag: str):
+    response["ETag"] = etag
+    # El navegador puede guardar la respuesta, pero debe revalidarla siempre
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def conditional_response(agregados):
+    """
+    Decorador para métodos de viewset. ``agregados(self, request, **kwargs)`` devuelve un
+    dict con los agregados que identifican la versión de la respuesta (típicamente el
+    resultado de un ``.aggregate(Max(...), Count(...))``).
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def wrapper(self, request, *args, **kwargs):
+            etag = _etag(request, agregados(self, request, **kwargs))
+            if _no_modificado(request, etag):
+                return _con_validadores(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+            response = metodo(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                _con_validadores(response, etag)
+            return response
+        return wrapper
+    return decorador
@@ -0,0 +1,90 @@
+"""
+Conexiones a la base: PRAGMAs de SQLite al conectar y ruteo de lecturas a una réplica.
+
+Cada alias de ``DATABASES`` puede llevar ``"PRAGMAS": {"journal_mode": "WAL", ...}``; se
+ejecutan en cada conexión nueva (con ``CONN_MAX_AGE`` una sola vez por conexión
+persistente). Los demás motores los ignoran.
+
+``RouterReplica`` manda a la réplica las lecturas de los requests de solo lectura
+(GET / HEAD / OPTIONS, marcados por ``LecturasReplicaMiddleware``) y todo lo demás al
+primario: un request que escribe lee lo que acaba de escribir, y el worker y los
+comandos nunca leen de la réplica. Sin el alias de réplica configurado todo va al
+primario.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+DEFAULTS = {
+    "PRIMARIO": "default",
+    "REPLICA": "replica",
+}
+
+METODOS_LECTURA = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_solo_lectura = contextvars.ContextVar("datapulse_solo_lectura", default=False)
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "DATAPULSE_DB", {})}
+
+
+@contextmanager
+def lecturas_en_replica():
+    """
+    Marca el contexto actual (hilo o tarea async) como de solo lectura.
+    """
+    token = _solo_lectura.set(True)
+    try:
+        yield
+    finally:
+        _solo_lectura.reset(token)
+
+
+def en_replica() -> bool:
+    return _solo_lectura.get()
+
+
+@receiver(connection_created)
+def aplicar_pragmas(sender, connection, **kwargs):
+    pragmas = connection.settings_dict.get("PRAGMAS")
+    if not pragmas or connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for nombre, valor in pragmas.items():
+            if not nombre.isidentifier():
+                raise ValueError(f"PRAGMA inválido: {nombre!r}")
+            cursor.execute(f"PRAGMA {nombre} = {valor}")
+
+
+class RouterReplica:
+    """
+    ``DATABASE_ROUTERS = ["api.db.RouterReplica"]``. Los alias salen de ``DATAPULSE_DB``.
+    """
+
+    def db_for_read(self, model, **hints):
+        config = get_config()
+        if _solo_lectura.get() and config["REPLICA"] in connections:
+            return config["REPLICA"]
+        return config["PRIMARIO"]
+
+    def db_for_write(self, model, **hints):
+        return get_config()["PRIMARIO"]
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplica tienen los mismos datos
+        config = get_config()
+        alias = {config["PRIMARIO"], config["REPLICA"]}
+        if obj1._state.db in alias and obj2._state.db in alias:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == get_config()["REPLICA"]:
+            return False
+        return None
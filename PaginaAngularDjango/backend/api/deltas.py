@@ -0,0 +1,199 @@
+"""
+Feed de cambios por recurso, para que el cliente guarde una copia local y solo baje
+lo que cambió.
+
+``cambios(recurso, since)`` devuelve las filas creadas o modificadas desde la marca
+(por ``fecha_actualizacion`` / ``updated_at``), las claves borradas (lápidas de la
+tabla Borrado) y la marca para la próxima llamada. Sin marca devuelve todo, paginado
+igual. La marca es opaca y guarda (momento, pk) de cada stream, así el corte entre
+páginas es exacto aunque muchas filas compartan el momento (escrituras masivas).
+
+Una transacción que confirma tarde puede dejar filas con un momento anterior a la
+marca: por eso la marca final nunca pasa de ``ahora - SOLAPE_S`` y lo más reciente se
+vuelve a mandar (aplicarlo dos veces no cambia nada). Las lápidas se guardan
+``RETENCION_DIAS``; una marca más vieja levanta ``MarcaVencida`` y el cliente empieza
+de cero.
+"""
+import base64
+import json
+import threading
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Borrado, IndicadorEconomico, Pais, Portafolio, Posicion, TipoCambio
+from .serializers import (
+    IndicadorEconomicoSerializer,
+    PaisSerializer,
+    PortafolioSerializer,
+    PosicionSerializer,
+    TipoCambioSerializer,
+)
+
+
+DEFAULTS = {
+    "LIMITE": 1000,          # filas por página (cambios y borrados, cada uno)
+    "LIMITE_MAX": 5000,
+    "SOLAPE_S": 5,           # margen para transacciones que confirman tarde
+    "RETENCION_DIAS": 30,    # lápidas más viejas se purgan
+}
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "DATAPULSE_DELTAS", {})}
+
+
+@dataclass(frozen=True)
+class Recurso:
+    modelo: type
+    campo: str                 # momento de la última escritura
+    clave: str                 # identifica la fila en el cliente
+    serializer: type
+    select_related: tuple = ()
+    # Filas visibles en la API; las demás (p. ej. países inactivos) se informan como borradas
+    vigente: dict = field(default_factory=dict)
+
+
+RECURSOS = {
+    "paises": Recurso(Pais, "fecha_actualizacion", "codigo_iso", PaisSerializer, vigente={"activo": True}),
+    "indicadores": Recurso(IndicadorEconomico, "fecha_actualizacion", "id", IndicadorEconomicoSerializer),
+    "tipos_cambio": Recurso(TipoCambio, "fecha_actualizacion", "id", TipoCambioSerializer),
+    "portafolios": Recurso(Portafolio, "updated_at", "id", PortafolioSerializer),
+    "posiciones": Recurso(Posicion, "updated_at", "id", PosicionSerializer, select_related=("pais",)),
+}
+
+# Modelo -> nombre del recurso (para las lápidas que registran las señales)
+POR_MODELO = {r.modelo: nombre for nombre, r in RECURSOS.items()}
+
+
+class MarcaInvalida(Exception):
+    pass
+
+
+class MarcaVencida(Exception):
+    pass
+
+
+# ---- marca ----
+
+def codificar(marca: dict) -> str:
+    crudo = json.dumps(
+        {k: [momento.isoformat(), pk] for k, (momento, pk) in marca.items()}, separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(crudo.encode()).decode("ascii").rstrip("=")
+
+
+def decodificar(texto: str) -> dict:
+    try:
+        crudo = base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+        datos = json.loads(crudo)
+        marca = {k: (parse_datetime(datos[k][0]), int(datos[k][1])) for k in ("c", "b")}
+    except (ValueError, TypeError, KeyError, IndexError):
+        raise MarcaInvalida("since inválido.")
+    if any(momento is None or timezone.is_naive(momento) for momento, _ in marca.values()):
+        raise MarcaInvalida("since inválido.")
+    return marca
+
+
+def _despues(campo: str, marca) -> Q:
+    # (campo, pk) > (momento, pk) para cualquier motor
+    momento, pk = marca
+    return Q(**{f"{campo}__gt": momento}) | Q(**{campo: momento, "pk__gt": pk})
+
+
+# ---- lápidas ----
+
+# Lápidas de un borrado en curso (con sus cascadas): pre_delete las junta y el primer
+# post_delete las inserta todas, dentro de la transacción del borrado. ``origen`` es el
+# objeto o queryset borrado; uno distinto descarta lo que dejó un borrado que falló.
+_pendientes = threading.local()
+
+
+def recordar_borrado(modelo, instancia, origen) -> None:
+    if not hasattr(_pendientes, "lapidas") or _pendientes.origen is not origen:
+        _pendientes.origen, _pendientes.lapidas = origen, []
+    nombre = POR_MODELO.get(modelo)
+    if nombre is not None:
+        _pendientes.lapidas.append(Borrado(recurso=nombre, clave=str(getattr(instancia, RECURSOS[nombre].clave))))
+
+
+def registrar_borrados(origen) -> None:
+    if not getattr(_pendientes, "lapidas", None) or _pendientes.origen is not origen:
+        return
+    lapidas = _pendientes.lapidas
+    _pendientes.origen, _pendientes.lapidas = None, []
+    Borrado.objects.bulk_create(lapidas)
+
+
+def purgar(config: dict | None = None) -> int:
+    config = config or get_config()
+    limite = timezone.now() - timedelta(days=config["RETENCION_DIAS"])
+    borradas, _ = Borrado.objects.filter(borrado__lt=limite).delete()
+    return borradas
+
+
+# ---- feed ----
+
+def cambios(nombre: str, since: str | None = None, limite: int | None = None, context=None) -> dict:
+    """
+    ``{"recurso", "clave", "cambios": [...], "borrados": [claves], "since": marca, "mas": bool}``.
+    Con ``mas`` hay que volver a pedir con la marca devuelta antes de dar la copia por al día.
+    El cliente aplica primero ``borrados`` y después ``cambios``.
+    """
+    config = get_config()
+    recurso = RECURSOS[nombre]
+    limite = max(1, min(limite or config["LIMITE"], config["LIMITE_MAX"]))
+    ahora = timezone.now()
+    tope = (ahora - timedelta(seconds=config["SOLAPE_S"]), 0)
+
+    filas = recurso.modelo.objects.select_related(*recurso.select_related)
+    if since:
+        marca = decodificar(since)
+        if marca["b"][0] < ahora - timedelta(days=config["RETENCION_DIAS"]):
+            raise MarcaVencida("La marca es más vieja que la retención de borrados: volver a sincronizar.")
+        filas = filas.filter(_despues(recurso.campo, marca["c"]))
+    else:
+        # Copia inicial: solo lo vigente, y las lápidas desde ahora
+        marca = {"c": None, "b": tope}
+        filas = filas.filter(**recurso.vigente)
+    filas = list(filas.order_by(recurso.campo, "pk")[: limite + 1])
+    lapidas = list(
+        Borrado.objects.filter(_despues("borrado", marca["b"]), recurso=nombre)
+        .order_by("borrado", "pk")
+        .values_list("borrado", "pk", "clave")[: limite + 1]
+    )
+    mas_filas, mas_lapidas = len(filas) > limite, len(lapidas) > limite
+    filas, lapidas = filas[:limite], lapidas[:limite]
+
+    vigentes, borrados = [], []
+    for fila in filas:
+        if all(getattr(fila, k) == v for k, v in recurso.vigente.items()):
+            vigentes.append(fila)
+        else:
+            borrados.append(str(getattr(fila, recurso.clave)))
+    claves_lapidas = {clave for _, _, clave in lapidas}
+    if claves_lapidas:
+        # Claves naturales que se volvieron a crear (p. ej. un país borrado y resincronizado)
+        claves_lapidas -= {
+            str(c) for c in recurso.modelo.objects.filter(
+                **{f"{recurso.clave}__in": claves_lapidas}, **recurso.vigente
+            ).values_list(recurso.clave, flat=True)
+        }
+        borrados.extend(sorted(claves_lapidas))
+
+    # Con más páginas se sigue desde la última fila vista; sin más, todo lo anterior a ``tope``
+    # ya se leyó (también lo que no era vigente) y lo posterior se repite en la próxima
+    ultima_fila = (getattr(filas[-1], recurso.campo), filas[-1].pk) if mas_filas else tope
+    ultima_lapida = lapidas[-1][:2] if mas_lapidas else tope
+    return {
+        "recurso": nombre,
+        "clave": recurso.clave,
+        "cambios": recurso.serializer(vigentes, many=True, context=context or {}).data,
+        "borrados": borrados,
+        "since": codificar({"c": ultima_fila, "b": ultima_lapida}),
+        "mas": mas_filas or mas_lapidas,
+    }
@@ -0,0 +1,234 @@
+"""
+Feed de cambios en vivo (tipos de cambio e indicadores) para el endpoint SSE.
+
+Las señales y los importadores publican deltas compactos en la tabla EventoCambio,
+dentro de la transacción que escribe: el web, los demás workers de uvicorn y
+``manage.py worker`` escriben en la misma secuencia. Cada proceso web la sigue con
+una consulta cada ``POLL_S`` como mucho (la hace el stream que se despierte primero;
+lo que escribe el propio proceso se lee enseguida al confirmar) y reparte en memoria
+a sus suscriptores cada evento ya serializado. Un buffer con los últimos ``BUFFER``
+eventos permite reanudar con ``Last-Event-ID``.
+
+Los ids son los de la tabla, iguales en todos los procesos. Con SQLite los escritores
+van de a uno, así que los ids se confirman en orden y ``pk > último`` no saltea filas.
+Un id que no está en el buffer (o que no es de la tabla) recibe un evento ``reset``
+para que el cliente vuelva a pedir el estado completo. ``purgar`` borra los eventos
+pasada la retención.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+
+import orjson
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EventoCambio
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "BUFFER": 1000,          # eventos recientes para reanudar con Last-Event-ID
+    "POLL_S": 1,             # cada cuánto mira cada proceso web la tabla de eventos
+    "RETENCION_H": 24,       # eventos más viejos se purgan
+    "COLA_MAX": 500,         # eventos sin leer por suscriptor antes de cortarlo
+    "KEEPALIVE_S": 15,       # comentario ": keepalive" para proxies
+    "DURACION_MAX_S": 300,   # el stream se cierra y el navegador reconecta solo
+    "RETRY_MS": 3000,
+}
+
+TIPOS_CAMBIO = "tipos_cambio"
+INDICADORES = "indicadores"
+CANALES = (TIPOS_CAMBIO, INDICADORES)
+
+COLUMNAS = {
+    TIPOS_CAMBIO: ("moneda_origen", "moneda_destino", "fecha", "tasa"),
+    INDICADORES: ("codigo_iso", "tipo", "anio", "valor"),
+}
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "DATAPULSE_EVENTOS", {})}
+
+
+@dataclass(frozen=True)
+class Evento:
+    numero: int
+    canal: str
+    mensaje: bytes  # bloque SSE ya serializado
+
+
+class Suscripcion:
+    """
+    Cola de un cliente. La llena ``Bus`` desde cualquier hilo (vía el event loop del
+    cliente) y la vacía el generador del stream.
+    """
+
+    def __init__(self, loop, canales, maximo: int):
+        self.loop = loop
+        self.canales = set(canales)
+        self.maximo = maximo
+        self.eventos = deque()
+        self.desbordada = False
+        self.aviso = asyncio.Event()
+
+    def _entregar(self, evento: Evento) -> None:
+        # Corre en el loop del cliente
+        if len(self.eventos) >= self.maximo:
+            self.desbordada = True
+        else:
+            self.eventos.append(evento)
+        self.aviso.set()
+
+    async def siguientes(self, timeout: float) -> list:
+        """
+        Eventos pendientes (espera hasta ``timeout``). None si el cliente quedó atrás.
+        """
+        if not self.eventos and not self.desbordada:
+            try:
+                await asyncio.wait_for(self.aviso.wait(), timeout)
+            except TimeoutError:
+                pass
+        self.aviso.clear()
+        if self.desbordada:
+            return None
+        pendientes = list(self.eventos)
+        self.eventos.clear()
+        return pendientes
+
+
+class Bus:
+    """
+    Sigue la tabla EventoCambio y reparte los eventos a los suscriptores del proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sondeo = threading.Lock()
+        self._sondeado = 0.0
+        self._ultimo = None  # último id leído de la tabla; None hasta la primera lectura
+        self._buffer = deque(maxlen=get_config()["BUFFER"])
+        self._suscripciones = set()
+
+    def sondear(self, forzar: bool = False) -> int:
+        """
+        Lee los eventos nuevos de la tabla y los reparte; devuelve cuántos. Sin ``forzar``
+        hace como mucho una consulta cada POLL_S por proceso. La primera lectura solo
+        llena el buffer con los últimos BUFFER eventos.
+        """
+        config = get_config()
+        with self._sondeo:
+            ahora = time.monotonic()
+            if not forzar and ahora - self._sondeado < config["POLL_S"]:
+                return 0
+            self._sondeado = ahora
+            columnas = ("pk", "canal", "cuerpo")
+            if self._ultimo is None:
+                recientes = list(EventoCambio.objects.order_by("-pk").values_list(*columnas)[:config["BUFFER"]])
+                with self._lock:
+                    self._ultimo = recientes[0][0] if recientes else 0
+                    for pk, canal, cuerpo in reversed(recientes):
+                        self._buffer.append(self._evento(pk, canal, cuerpo))
+                return 0
+
+            leidos = 0
+            while True:
+                filas = list(
+                    EventoCambio.objects.filter(pk__gt=self._ultimo).order_by("pk").values_list(*columnas)
+                    [:config["BUFFER"]]
+                )
+                for pk, canal, cuerpo in filas:
+                    self._emitir(self._evento(pk, canal, cuerpo))
+                leidos += len(filas)
+                if len(filas) < config["BUFFER"]:
+                    return leidos
+
+    def avisar(self) -> None:
+        # Al confirmar una escritura del proceso: sus suscriptores la ven sin esperar POLL_S
+        if self._suscripciones:
+            self.sondear(forzar=True)
+
+    @staticmethod
+    def _evento(pk: int, canal: str, cuerpo: str) -> Evento:
+        mensaje = b"id: %d\nevent: %s\ndata: %s\n\n" % (pk, canal.encode(), cuerpo.encode())
+        return Evento(pk, canal, mensaje)
+
+    def _emitir(self, evento: Evento) -> None:
+        with self._lock:
+            self._ultimo = evento.numero
+            self._buffer.append(evento)
+            for suscripcion in list(self._suscripciones):
+                if evento.canal not in suscripcion.canales:
+                    continue
+                try:
+                    suscripcion.loop.call_soon_threadsafe(suscripcion._entregar, evento)
+                except RuntimeError:  # el loop del cliente ya se cerró
+                    self._suscripciones.discard(suscripcion)
+
+    def suscribir(self, loop, canales, ultimo_id: str | None = None, maximo: int | None = None):
+        """
+        Registra un suscriptor y devuelve (suscripcion, pendientes, reset). Se hace bajo el
+        mismo lock que ``_emitir``: ningún evento queda entre el buffer y la cola. Conviene
+        ``sondear(forzar=True)`` antes para que el buffer esté al día.
+        """
+        suscripcion = Suscripcion(loop, canales, maximo or get_config()["COLA_MAX"])
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+            if not ultimo_id:
+                return suscripcion, [], False
+            ultimo = self._ultimo or 0
+            numero = int(ultimo_id) if ultimo_id.isdigit() else None
+            primero = self._buffer[0].numero if self._buffer else ultimo + 1
+            if numero is None or numero > ultimo or numero < primero - 1:
+                return suscripcion, [], True
+            pendientes = [e for e in self._buffer if e.numero > numero and e.canal in suscripcion.canales]
+        return suscripcion, pendientes, False
+
+    def desuscribir(self, suscripcion) -> None:
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def reiniciar(self) -> None:
+        """
+        Vuelve a leer la tabla desde cero (tests, o si la tabla se recreó).
+        """
+        with self._sondeo, self._lock:
+            self._ultimo = None
+            self._sondeado = 0.0
+            self._buffer.clear()
+
+    def reset(self) -> bytes:
+        return b"id: %d\nevent: reset\ndata: {}\n\n" % (self._ultimo or 0)
+
+    @property
+    def suscriptores(self) -> int:
+        return len(self._suscripciones)
+
+
+bus = Bus()
+
+
+def publicar(canal: str, filas: list, borradas: list = ()) -> None:
+    """
+    Publica un delta ``{"columnas": [...], "filas": [[...]], "borradas": [[...]]}``: lo
+    guarda en la transacción en curso (sale solo si confirma). Las borradas llevan solo
+    las columnas clave (todas menos la última).
+    """
+    if not get_config()["ENABLED"] or not (filas or borradas):
+        return
+    datos = {"canal": canal, "columnas": COLUMNAS[canal], "filas": list(filas)}
+    if borradas:
+        datos["borradas"] = list(borradas)
+    EventoCambio.objects.create(canal=canal, cuerpo=orjson.dumps(datos).decode())
+    transaction.on_commit(bus.avisar)
+
+
+def purgar(config: dict | None = None) -> int:
+    config = config or get_config()
+    limite = timezone.now() - timedelta(hours=config["RETENCION_H"])
+    borrados, _ = EventoCambio.objects.filter(creado__lt=limite).delete()
+    return borrados
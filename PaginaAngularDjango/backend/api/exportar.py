@@ -0,0 +1,201 @@
+"""
+Exportaciones completas en streaming (CSV o columnar binario).
+
+Las filas se leen con ``values_list(...).iterator(chunk_size)`` y se emiten por
+lotes, así que la memoria usada depende del tamaño del lote y no del total.
+
+Formato columnar (``.dpcol``), pensado como un Parquet mínimo sin dependencias extra:
+
+    b"DPCOL1\\n"
+    por cada lote (row group):
+        uint32 little-endian con el largo del header + header JSON
+            {"filas": n, "columnas": ["a", "b", ...]}
+        una columna tras otra, cada una en formato .npy (``np.save``, sin pickle)
+    uint32 0 como cierre
+
+Se lee con ``leer_columnar`` o con cualquier lector de .npy.
+
+Bajo ASGI Django junta en memoria los iteradores síncronos de StreamingHttpResponse
+antes de mandarlos: ``en_hilo`` los convierte en async, un lote por vez.
+"""
+import csv
+import io
+import json
+import math
+import struct
+from datetime import timezone as dt_timezone
+
+import numpy as np
+from asgiref.sync import sync_to_async
+
+from .models import IndicadorEconomico, Posicion, TipoCambio
+
+
+CHUNK_SIZE = 5000
+MAGIC = b"DPCOL1\n"
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "columnar": ("application/vnd.datapulse.columnar", "dpcol"),
+}
+
+# nombre de columna -> ruta ORM, por recurso
+COLUMNAS = {
+    "indicadores": (
+        IndicadorEconomico,
+        {
+            "codigo_iso": "pais__codigo_iso",
+            "region": "pais__region",
+            "tipo": "tipo",
+            "anio": "anio",
+            "valor": "valor",
+            "unidad": "unidad",
+            "fuente": "fuente",
+        },
+    ),
+    "tipos_cambio": (
+        TipoCambio,
+        {
+            "moneda_origen": "moneda_origen",
+            "moneda_destino": "moneda_destino",
+            "fecha": "fecha",
+            "tasa": "tasa",
+            "variacion_porcentual": "variacion_porcentual",
+            "fuente": "fuente",
+        },
+    ),
+    "posiciones": (
+        Posicion,
+        {
+            "activo": "activo",
+            "ticker": "ticker",
+            "tipo_activo": "tipo_activo",
+            "codigo_iso": "pais__codigo_iso",
+            "moneda": "moneda",
+            "cantidad": "cantidad",
+            "precio_unitario": "precio_unitario",
+            "peso_porcentual": "peso_porcentual",
+            "created_at": "created_at",
+        },
+    ),
+}
+
+
+def _campo(modelo, ruta: str):
+    partes = ruta.split("__")
+    for parte in partes[:-1]:
+        modelo = modelo._meta.get_field(parte).related_model
+    return modelo._meta.get_field(partes[-1])
+
+
+def _lotes(filas, tamano):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _filas(qs, recurso: str, chunk_size: int):
+    _, columnas = COLUMNAS[recurso]
+    return qs.values_list(*columnas.values()).iterator(chunk_size=chunk_size)
+
+
+# ---- CSV ----
+
+def stream_csv(qs, recurso: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Genera el CSV (bytes UTF-8) por lotes de ``chunk_size`` filas.
+    """
+    _, columnas = COLUMNAS[recurso]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columnas)
+    for lote in _lotes(_filas(qs, recurso, chunk_size), chunk_size):
+        writer.writerows(lote)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+# ---- columnar ----
+
+def _array(valores, campo) -> np.ndarray:
+    tipo = campo.get_internal_type()
+    if tipo in ("FloatField", "DecimalField"):
+        return np.array([math.nan if v is None else float(v) for v in valores], dtype=np.float64)
+    if tipo in ("IntegerField", "PositiveIntegerField", "BigIntegerField", "AutoField", "BigAutoField"):
+        return np.array(valores, dtype=np.int64)
+    if tipo == "DateField":
+        return np.array(valores, dtype="datetime64[D]")
+    if tipo == "DateTimeField":
+        # numpy no maneja zonas horarias: se exporta en UTC
+        return np.array(
+            [v.astimezone(dt_timezone.utc).replace(tzinfo=None) if v.tzinfo else v for v in valores],
+            dtype="datetime64[us]",
+        )
+    if tipo == "BooleanField":
+        return np.array(valores, dtype=bool)
+    return np.array(["" if v is None else str(v) for v in valores], dtype=np.str_)
+
+
+def _bloque(header: dict) -> bytes:
+    crudo = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return struct.pack("<I", len(crudo)) + crudo
+
+
+def stream_columnar(qs, recurso: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Genera el archivo .dpcol: un row group por cada lote de ``chunk_size`` filas.
+    """
+    modelo, columnas = COLUMNAS[recurso]
+    campos = [_campo(modelo, ruta) for ruta in columnas.values()]
+    yield MAGIC
+    for lote in _lotes(_filas(qs, recurso, chunk_size), chunk_size):
+        buffer = io.BytesIO()
+        buffer.write(_bloque({"filas": len(lote), "columnas": list(columnas)}))
+        for valores, campo in zip(zip(*lote), campos):
+            np.save(buffer, _array(valores, campo), allow_pickle=False)
+        yield buffer.getvalue()
+    yield struct.pack("<I", 0)
+
+
+def leer_columnar(stream):
+    """
+    Lee un .dpcol y devuelve un generador de row groups ``{columna: np.ndarray}``.
+    """
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError("No es un archivo columnar de DataPulse.")
+    while True:
+        (largo,) = struct.unpack("<I", stream.read(4))
+        if not largo:
+            return
+        header = json.loads(stream.read(largo))
+        yield {columna: np.load(stream, allow_pickle=False) for columna in header["columnas"]}
+
+
+def exportar(qs, recurso: str, formato: str = "csv", chunk_size: int = CHUNK_SIZE):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+    generador = stream_csv if formato == "csv" else stream_columnar
+    return generador(qs, recurso, chunk_size)
+
+
+async def en_hilo(iterable):
+    """
+    Itera ``iterable`` desde código async: cada ``next`` corre en el hilo de las vistas
+    sync (``thread_sensitive``), así el cursor sigue en la misma conexión.
+    """
+    iterador = iter(iterable)
+    siguiente = sync_to_async(next)
+    fin = object()
+    try:
+        while (bloque := await siguiente(iterador, fin)) is not fin:
+            yield bloque
+    finally:
+        if hasattr(iterador, "close"):
+            await sync_to_async(iterador.close)()
@@ -0,0 +1,66 @@
+"""
+Filtros por query params compartidos entre los listados, las exportaciones y los
+comandos de management. ``params`` es cualquier mapping (QueryDict o dict).
+"""
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+
+class FechaInvalida(ValidationError):
+    """
+    400 con el mismo cuerpo que los demás errores de parámetros: ``{"detail": "..."}``.
+    """
+
+    def __init__(self, nombre: str):
+        super().__init__({"detail": f"{nombre} debe ser una fecha válida YYYY-MM-DD."})
+
+
+def parametro_fecha(params, nombre: str):
+    """
+    ``params[nombre]`` como date, o None si no viene. Levanta ``FechaInvalida`` tanto si
+    está mal formada como si no existe (``2024-02-30``: parse_date levanta ValueError).
+    """
+    valor = params.get(nombre)
+    if not valor:
+        return None
+    try:
+        fecha = parse_date(str(valor))
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise FechaInvalida(nombre)
+    return fecha
+
+
+def filtrar_indicadores(qs, params):
+    """
+    pais (ISO), region, tipo, desde / hasta (año).
+    """
+    if params.get("pais"):
+        qs = qs.filter(pais__codigo_iso=params["pais"].upper())
+    if params.get("region"):
+        qs = qs.filter(pais__region=params["region"])
+    if params.get("tipo"):
+        qs = qs.filter(tipo=params["tipo"])
+    if str(params.get("desde") or "").isdigit():
+        qs = qs.filter(anio__gte=int(params["desde"]))
+    if str(params.get("hasta") or "").isdigit():
+        qs = qs.filter(anio__lte=int(params["hasta"]))
+    return qs
+
+
+def filtrar_tipos_cambio(qs, params):
+    """
+    moneda_origen, moneda_destino, desde / hasta (YYYY-MM-DD; inválidas: ``FechaInvalida``).
+    """
+    if params.get("moneda_origen"):
+        qs = qs.filter(moneda_origen=params["moneda_origen"].upper())
+    if params.get("moneda_destino"):
+        qs = qs.filter(moneda_destino=params["moneda_destino"].upper())
+    desde = parametro_fecha(params, "desde")
+    if desde:
+        qs = qs.filter(fecha__gte=desde)
+    hasta = parametro_fecha(params, "hasta")
+    if hasta:
+        qs = qs.filter(fecha__lte=hasta)
+    return qs
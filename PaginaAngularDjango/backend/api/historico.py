@@ -0,0 +1,256 @@
+"""
+Valor histórico de los portafolios (tabla ValorPortafolio).
+
+Cada fila es el valor en USD de las posiciones actuales de un portafolio a las tasas
+vigentes ese día. Las fechas son las de las tasas de sus monedas, desde el primer día
+en que todas (las que tienen alguna tasa) están cotizadas; un portafolio sin ninguna
+moneda cotizada (p. ej. solo USD) tiene valor constante y toma los días en que se
+crearon sus posiciones. La tasa vigente de cada día
+sale de un as-of join sobre las series ordenadas (``np.searchsorted``): una query por
+recálculo, nunca una por día.
+
+El mantenimiento es incremental:
+- una tasa nueva, modificada o borrada de la moneda M en la fecha F solo cambia los
+  días entre F y la siguiente tasa de M, y solo en los portafolios que tienen M;
+- un cambio de posiciones recalcula la serie de ese portafolio y de ningún otro.
+Las escrituras masivas (importador de tasas) recalculan explícitamente, como con los
+agregados regionales. ``manage.py recalcular_historico`` reconstruye todo.
+"""
+import datetime
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate, Upper
+
+from .models import Posicion, TipoCambio, ValorPortafolio
+from .series import cierres
+from .valuacion import MONEDA_PIVOTE, tasas_a_usd
+
+
+LOTE = 2000
+FRECUENCIAS = ("diaria", "semanal", "mensual")
+
+_SIN_FECHAS = np.empty(0, dtype="datetime64[D]")
+
+
+class HistoricoError(Exception):
+    pass
+
+
+def exposiciones(portafolios=None) -> dict:
+    """
+    ``{portafolio_id: {moneda: valor en moneda local}}`` en una query.
+    """
+    qs = Posicion.objects.all()
+    if portafolios is not None:
+        qs = qs.filter(portafolio__in=portafolios)
+    filas = (
+        qs.order_by()
+        .annotate(moneda_upper=Upper("moneda"))
+        .values_list("portafolio", "moneda_upper")
+        .annotate(valor=Sum(F("cantidad") * F("precio_unitario")))
+    )
+    resultado = defaultdict(dict)
+    for portafolio, moneda, valor in filas:
+        resultado[portafolio][moneda] = float(valor or 0.0)
+    return resultado
+
+
+def series_a_usd(monedas, desde=None, hasta=None) -> dict:
+    """
+    ``{moneda: (fechas datetime64[D], tasas float64)}`` ordenadas por fecha. Con ``desde``
+    cada serie arranca con la última tasa anterior (fechada el día previo) para que el
+    as-of del primer día no quede vacío.
+    """
+    monedas = set(monedas) - {MONEDA_PIVOTE}
+    if not monedas:
+        return {}
+    qs = TipoCambio.objects.filter(moneda_origen__in=monedas, moneda_destino=MONEDA_PIVOTE, tasa__gt=0)
+    if desde is not None:
+        qs = qs.filter(fecha__gte=desde)
+    if hasta is not None:
+        qs = qs.filter(fecha__lte=hasta)
+    filas = list(qs.order_by("moneda_origen", "fecha").values_list("moneda_origen", "fecha", "tasa"))
+
+    series = {}
+    if filas:
+        moneda, fecha, tasa = zip(*filas)
+        moneda = np.array(moneda)
+        cortes = np.flatnonzero(moneda[1:] != moneda[:-1]) + 1
+        for m, f, t in zip(
+            moneda[np.r_[0, cortes]].tolist(),
+            np.split(np.array(fecha, dtype="datetime64[D]"), cortes),
+            np.split(np.array(tasa, dtype=float), cortes),
+        ):
+            series[m] = (f, t)
+
+    if desde is not None:
+        anterior = np.datetime64(desde - datetime.timedelta(days=1), "D")
+        for m, tasa in tasas_a_usd(monedas, fecha=desde - datetime.timedelta(days=1)).items():
+            if m == MONEDA_PIVOTE:
+                continue
+            f, t = series.get(m, (_SIN_FECHAS, np.empty(0)))
+            series[m] = (np.r_[anterior, f], np.r_[tasa, t])
+    return series
+
+
+def asof(fechas_serie: np.ndarray, valores_serie: np.ndarray, fechas: np.ndarray) -> np.ndarray:
+    """
+    Valor vigente de la serie en cada una de ``fechas`` (el último con fecha <= a la
+    pedida); NaN antes del primero.
+    """
+    i = np.searchsorted(fechas_serie, fechas, side="right") - 1
+    return np.where(i >= 0, valores_serie[np.maximum(i, 0)], np.nan)
+
+
+def fechas_posiciones(portafolios, desde=None, hasta=None) -> dict:
+    """
+    ``{portafolio_id: fechas datetime64[D]}``: los días en que se crearon sus posiciones.
+    """
+    qs = Posicion.objects.filter(portafolio__in=portafolios).annotate(dia=TruncDate("created_at"))
+    if desde is not None:
+        qs = qs.filter(dia__gte=desde)
+    if hasta is not None:
+        qs = qs.filter(dia__lte=hasta)
+    resultado = defaultdict(list)
+    for portafolio, dia in qs.order_by("dia").values_list("portafolio", "dia").distinct():
+        resultado[portafolio].append(dia)
+    return {p: np.array(dias, dtype="datetime64[D]") for p, dias in resultado.items()}
+
+
+def valores(exposicion: dict, series: dict, desde=None, fechas_fijas=None):
+    """
+    (fechas, valores en USD) de un portafolio con ``exposicion`` {moneda: valor local}.
+    Las monedas sin ninguna tasa en ``series`` no cuentan (como en la valuación). Si no
+    cuenta ninguna el valor es constante y las fechas son ``fechas_fijas``.
+    """
+    monedas = [m for m in exposicion if m != MONEDA_PIVOTE and m in series]
+    if not monedas:
+        if fechas_fijas is None or MONEDA_PIVOTE not in exposicion:
+            return _SIN_FECHAS, np.empty(0)
+        return fechas_fijas, np.full(len(fechas_fijas), exposicion[MONEDA_PIVOTE])
+    fechas = np.unique(np.concatenate([series[m][0] for m in monedas]))
+    if desde is not None:
+        fechas = fechas[fechas >= np.datetime64(desde, "D")]
+
+    tasas = np.column_stack([asof(*series[m], fechas) for m in monedas])
+    completas = ~np.isnan(tasas).any(axis=1)
+    montos = np.array([exposicion[m] for m in monedas])
+    return fechas[completas], tasas[completas] @ montos + exposicion.get(MONEDA_PIVOTE, 0.0)
+
+
+def recalcular(portafolios=None, desde=None, hasta=None) -> int:
+    """
+    Recalcula el valor diario de ``portafolios`` (todos si es None) entre ``desde`` y
+    ``hasta`` (sin límites si no se pasan). Escribe solo los días que cambian y borra los
+    que ya no tienen valor. Devuelve el número de filas escritas.
+    """
+    expos = exposiciones(portafolios)
+    monedas = {m for e in expos.values() for m in e}
+    series = series_a_usd(monedas, desde, hasta)
+
+    existentes = ValorPortafolio.objects.all()
+    if portafolios is not None:
+        existentes = existentes.filter(portafolio__in=portafolios)
+    if desde is not None:
+        existentes = existentes.filter(fecha__gte=desde)
+    if hasta is not None:
+        existentes = existentes.filter(fecha__lte=hasta)
+    actuales = {
+        (portafolio, fecha): valor
+        for portafolio, fecha, valor in existentes.order_by().values_list("portafolio", "fecha", "valor")
+    }
+
+    # Los que no tienen ninguna moneda cotizada: valor constante en los días de sus posiciones
+    sin_series = [p for p, e in expos.items() if not any(m in series for m in e if m != MONEDA_PIVOTE)]
+    fijas = fechas_posiciones(sin_series, desde, hasta) if sin_series else {}
+
+    nuevos = []
+    vigentes = set()
+    for portafolio, exposicion in expos.items():
+        fechas, montos = valores(exposicion, series, desde, fijas.get(portafolio, _SIN_FECHAS))
+        for fecha, valor in zip(fechas.astype(object).tolist(), montos.tolist()):
+            clave = (portafolio, fecha)
+            vigentes.add(clave)
+            anterior = actuales.get(clave)
+            if anterior is None or not np.isclose(anterior, valor):
+                nuevos.append(ValorPortafolio(portafolio_id=portafolio, fecha=fecha, valor=valor))
+    sobrantes = defaultdict(list)
+    for portafolio, fecha in actuales.keys() - vigentes:
+        sobrantes[portafolio].append(fecha)
+
+    with transaction.atomic():
+        ValorPortafolio.objects.bulk_create(
+            nuevos,
+            batch_size=LOTE,
+            update_conflicts=True,
+            unique_fields=["portafolio", "fecha"],
+            update_fields=["valor", "actualizado"],
+        )
+        for portafolio, fechas in sobrantes.items():
+            ValorPortafolio.objects.filter(portafolio=portafolio, fecha__in=fechas).delete()
+    return len(nuevos)
+
+
+def recalcular_moneda(moneda: str, desde, hasta=None) -> int:
+    """
+    Tras escribir o borrar tasas de ``moneda`` entre ``desde`` y ``hasta``: recalcula, en los
+    portafolios con esa moneda, los días hasta la siguiente tasa (que no dependen de
+    nada anterior). Si no hay tasas previas a ``desde`` cambia el primer día de la serie
+    y se recalcula desde el principio.
+    """
+    moneda = moneda.upper()
+    if moneda == MONEDA_PIVOTE:
+        return 0
+    portafolios = list(
+        Posicion.objects.filter(moneda__iexact=moneda).order_by().values_list("portafolio", flat=True).distinct()
+    )
+    if not portafolios:
+        return 0
+
+    par = TipoCambio.objects.filter(moneda_origen=moneda, moneda_destino=MONEDA_PIVOTE, tasa__gt=0)
+    siguiente = par.filter(fecha__gt=hasta or desde).order_by("fecha").values_list("fecha", flat=True).first()
+    if not par.filter(fecha__lt=desde).exists():
+        desde = None
+    return recalcular(portafolios, desde, siguiente - datetime.timedelta(days=1) if siguiente else None)
+
+
+def serie(portafolio, moneda_base: str = MONEDA_PIVOTE, desde=None, hasta=None, frecuencia: str = "diaria") -> dict:
+    """
+    Serie de valores del portafolio en ``moneda_base``. Las frecuencias semanal y mensual
+    toman el último valor de cada periodo.
+    """
+    moneda_base = (moneda_base or MONEDA_PIVOTE).upper()
+    qs = ValorPortafolio.objects.filter(portafolio=portafolio)
+    if desde is not None:
+        qs = qs.filter(fecha__gte=desde)
+    if hasta is not None:
+        qs = qs.filter(fecha__lte=hasta)
+    filas = list(qs.order_by("fecha").values_list("fecha", "valor"))
+    fechas = np.array([f for f, _ in filas], dtype="datetime64[D]")
+    montos = np.array([v for _, v in filas], dtype=float)
+
+    if moneda_base != MONEDA_PIVOTE:
+        inicio = filas[0][0] if filas else desde
+        base = series_a_usd({moneda_base}, inicio, hasta).get(moneda_base)
+        if base is None:
+            raise HistoricoError(f"No hay tipo de cambio {moneda_base}/{MONEDA_PIVOTE} registrado.")
+        montos = montos / asof(*base, fechas)
+        validos = ~np.isnan(montos)
+        fechas, montos = fechas[validos], montos[validos]
+
+    if frecuencia != "diaria":
+        idx = cierres(fechas, frecuencia)
+        fechas, montos = fechas[idx], montos[idx]
+
+    return {
+        "portafolio": portafolio.pk,
+        "moneda_base": moneda_base,
+        "frecuencia": frecuencia,
+        "desde": desde,
+        "hasta": hasta,
+        "puntos": int(len(fechas)),
+        "serie": [{"fecha": str(f), "valor": float(v)} for f, v in zip(fechas, montos)],
+    }
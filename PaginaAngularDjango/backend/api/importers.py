@@ -0,0 +1,483 @@
+"""
+Carga masiva de datos desde archivos CSV / JSON.
+
+Los archivos se leen en streaming y se procesan por lotes (``chunk_size``):
+cada lote se valida, se deduplica y se escribe con un único
+``bulk_create(update_conflicts=True)``. La memoria depende del tamaño del
+lote, no del archivo.
+
+Para TipoCambio, ``variacion_porcentual`` se recalcula al final con NumPy y
+solo en la ventana de fechas que tocó el archivo para cada par.
+"""
+import csv
+import io
+import json
+import math
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import agregados, cache, eventos, historico
+from .models import IndicadorEconomico, Pais, TipoCambio
+from .valuacion import MONEDA_PIVOTE
+
+
+CHUNK_SIZE = 2000
+MAX_ERRORES_REPORTADOS = 100
+
+_SEPARADORES_JSON = re.compile(r"[\s,\[\]]*")
+_WORLD_BANK_METADATA = {"page", "pages", "per_page"}
+
+# Códigos de indicador del Banco Mundial -> (tipo, unidad)
+WORLD_BANK_INDICADORES = {
+    "NY.GDP.MKTP.CD": (IndicadorEconomico.Tipo.PIB, IndicadorEconomico.Unidad.USD),
+    "FP.CPI.TOTL.ZG": (IndicadorEconomico.Tipo.INFLACION, IndicadorEconomico.Unidad.PORCENTAJE),
+    "SL.UEM.TOTL.ZS": (IndicadorEconomico.Tipo.DESEMPLEO, IndicadorEconomico.Unidad.PORCENTAJE),
+    "NE.RSB.GNFS.CD": (IndicadorEconomico.Tipo.BALANZA_COMERCIAL, IndicadorEconomico.Unidad.USD),
+    "GC.DOD.TOTL.GD.ZS": (IndicadorEconomico.Tipo.DEUDA_PIB, IndicadorEconomico.Unidad.PORCENTAJE),
+    "NY.GDP.PCAP.CD": (IndicadorEconomico.Tipo.PIB_PERCAPITA, IndicadorEconomico.Unidad.USD),
+}
+
+# El Banco Mundial usa ISO alpha-3; Pais guarda alpha-2
+ISO3_A_ISO2 = {
+    "ARG": "AR", "BOL": "BO", "BRA": "BR", "CHL": "CL", "COL": "CO", "CRI": "CR",
+    "CUB": "CU", "DOM": "DO", "ECU": "EC", "GTM": "GT", "HND": "HN", "HTI": "HT",
+    "JAM": "JM", "MEX": "MX", "NIC": "NI", "PAN": "PA", "PER": "PE", "PRY": "PY",
+    "SLV": "SV", "TTO": "TT", "URY": "UY", "VEN": "VE", "BLZ": "BZ", "BHS": "BS",
+    "BRB": "BB", "PRI": "PR",
+}
+
+
+class ImportacionError(Exception):
+    """
+    El archivo no se puede leer (formato desconocido, JSON mal formado, ...).
+    """
+
+
+@dataclass
+class ReporteImportacion:
+    leidas: int = 0
+    insertadas: int = 0
+    actualizadas: int = 0
+    rechazadas: int = 0
+    lotes: int = 0
+    variaciones_recalculadas: int = 0
+    valores_portafolio_recalculados: int = 0
+    errores: list = field(default_factory=list)
+    duracion_s: float = 0.0
+    filas_por_segundo: float = 0.0
+
+    def rechazar(self, fila: int, motivo: str) -> None:
+        self.rechazadas += 1
+        if len(self.errores) < MAX_ERRORES_REPORTADOS:
+            self.errores.append({"fila": fila, "error": motivo})
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+# ---- lectura en streaming ----
+
+def _texto(stream):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+def iter_csv(stream):
+    """
+    Filas de un CSV como dicts. Soporta el CSV "ancho" del Banco Mundial
+    (una columna por año y líneas de metadatos antes del encabezado).
+    """
+    lector = csv.reader(_texto(stream))
+    for encabezado in lector:
+        if "Indicator Code" in encabezado or len([c for c in encabezado if c.strip()]) >= 3:
+            break
+    else:
+        return
+
+    encabezado = [c.strip() for c in encabezado]
+    if "Indicator Code" in encabezado:
+        anios = [(i, c) for i, c in enumerate(encabezado) if c.isdigit()]
+        i_pais = encabezado.index("Country Code")
+        i_indicador = encabezado.index("Indicator Code")
+        for fila in lector:
+            if len(fila) <= i_indicador:
+                continue
+            for i, anio in anios:
+                if i < len(fila) and fila[i].strip():
+                    yield {
+                        "pais": fila[i_pais],
+                        "indicador": fila[i_indicador],
+                        "anio": anio,
+                        "valor": fila[i],
+                    }
+        return
+
+    for fila in lector:
+        if fila:
+            yield dict(zip(encabezado, fila))
+
+
+def iter_json(stream, tamano_buffer: int = 64 * 1024):
+    """
+    Objetos de un JSON sin cargarlo entero: acepta JSON Lines, un array de
+    objetos o el formato paginado del Banco Mundial ``[metadata, [registros]]``.
+    """
+    texto = _texto(stream)
+    decoder = json.JSONDecoder()
+    buffer, pos, fin = "", 0, False
+
+    while True:
+        # Los corchetes y comas entre objetos se saltan: los arrays anidados se aplanan
+        pos = _SEPARADORES_JSON.match(buffer, pos).end()
+        if pos < len(buffer):
+            try:
+                obj, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if fin:
+                    raise ImportacionError(f"JSON inválido: {e}") from e
+            else:
+                if isinstance(obj, dict) and not _WORLD_BANK_METADATA <= obj.keys():
+                    yield obj
+                continue
+        elif fin:
+            return
+
+        bloque = texto.read(tamano_buffer)
+        fin = not bloque
+        buffer, pos = buffer[pos:] + bloque, 0
+
+
+def iter_filas(stream, formato: str):
+    if formato == "csv":
+        return iter_csv(stream)
+    if formato in ("json", "jsonl", "ndjson"):
+        return iter_json(stream)
+    raise ImportacionError(f"Formato no soportado: {formato}")
+
+
+FORMATOS = ("csv", "json", "jsonl", "ndjson")
+
+
+def formato_desde_nombre(nombre: str) -> str:
+    extension = (nombre or "").rsplit(".", 1)[-1].lower()
+    return "json" if extension in ("json", "jsonl", "ndjson") else "csv"
+
+
+def _lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+# ---- indicadores ----
+
+def _valor(fila: dict, *claves):
+    for clave in claves:
+        valor = fila.get(clave)
+        if isinstance(valor, dict):
+            valor = valor.get("id")
+        if valor not in (None, ""):
+            return valor
+    return None
+
+
+def normalizar_indicador(fila: dict, paises: dict, fuente: str) -> dict:
+    """
+    Convierte una fila (formato propio o del Banco Mundial) en campos de IndicadorEconomico.
+    Lanza ValueError con el motivo si la fila no es válida.
+    """
+    iso = str(_valor(fila, "codigo_iso", "pais", "country", "countryiso3code") or "").strip().upper()
+    iso = ISO3_A_ISO2.get(iso, iso)
+    if iso not in paises:
+        raise ValueError(f"País desconocido: {iso or '-'}")
+
+    codigo = _valor(fila, "indicador", "indicator")
+    if codigo in WORLD_BANK_INDICADORES:
+        tipo, unidad = WORLD_BANK_INDICADORES[codigo]
+    else:
+        tipo = str(_valor(fila, "tipo") or codigo or "").upper()
+        unidad = str(_valor(fila, "unidad") or "").upper()
+    if tipo not in IndicadorEconomico.Tipo.values:
+        raise ValueError(f"Tipo desconocido: {tipo or '-'}")
+    if unidad not in IndicadorEconomico.Unidad.values:
+        raise ValueError(f"Unidad desconocida: {unidad or '-'}")
+
+    try:
+        anio = int(str(_valor(fila, "anio", "date", "year")).strip())
+        valor = float(_valor(fila, "valor", "value"))
+    except (TypeError, ValueError):
+        raise ValueError("anio/valor no numéricos")
+    if not math.isfinite(valor):
+        raise ValueError("valor no finito")
+    if anio < 1800 or anio > 2200:
+        raise ValueError(f"Año fuera de rango: {anio}")
+
+    fuente_fila = str(_valor(fila, "fuente") or fuente).upper()
+    if fuente_fila not in IndicadorEconomico.Fuente.values:
+        fuente_fila = fuente
+
+    return {
+        "pais_id": paises[iso],
+        "tipo": tipo,
+        "unidad": unidad,
+        "anio": anio,
+        "valor": valor,
+        "fuente": fuente_fila,
+    }
+
+
+def _importar(filas, chunk_size, normalizar, clave, existentes, modelo, unique_fields, update_fields,
+             al_escribir=None, progreso=None):
+    """
+    Bucle común: valida cada lote, lo deduplica por ``clave`` y hace un bulk upsert.
+    ``existentes(claves)`` devuelve las claves del lote que ya estaban en la BD.
+    ``progreso(filas_leidas)`` se llama al terminar cada lote.
+    """
+    inicio = time.perf_counter()
+    reporte = ReporteImportacion()
+
+    numero = 0
+    for lote in _lotes(filas, chunk_size):
+        validas = {}
+        for fila in lote:
+            numero += 1
+            try:
+                datos = normalizar(fila)
+            except ValueError as e:
+                reporte.rechazar(numero, str(e))
+                continue
+            # Dentro del lote gana la última aparición de cada clave
+            validas[clave(datos)] = datos
+        reporte.leidas += len(lote)
+        reporte.lotes += 1
+        if not validas:
+            if progreso is not None:
+                progreso(reporte.leidas)
+            continue
+
+        previas = existentes(validas.keys())
+        with transaction.atomic():
+            modelo.objects.bulk_create(
+                [modelo(**datos) for datos in validas.values()],
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=update_fields,
+            )
+        nuevas = len(validas.keys() - previas)
+        reporte.insertadas += nuevas
+        reporte.actualizadas += len(validas) - nuevas
+        if al_escribir is not None:
+            al_escribir(validas)
+        if progreso is not None:
+            progreso(reporte.leidas)
+
+    reporte.duracion_s = round(time.perf_counter() - inicio, 3)
+    if reporte.duracion_s:
+        reporte.filas_por_segundo = round(reporte.leidas / reporte.duracion_s, 1)
+    return reporte
+
+
+def importar_indicadores(
+    stream,
+    formato: str = "csv",
+    *,
+    fuente: str = IndicadorEconomico.Fuente.WORLD_BANK,
+    chunk_size: int = CHUNK_SIZE,
+    progreso=None,
+) -> ReporteImportacion:
+    """
+    Upsert de indicadores contra ``uniq_indicador_pais_tipo_anio``.
+    """
+    paises = dict(Pais.objects.values_list("codigo_iso", "id"))
+
+    def existentes(claves):
+        return set(
+            IndicadorEconomico.objects.filter(
+                pais_id__in={k[0] for k in claves},
+                tipo__in={k[1] for k in claves},
+                anio__in={k[2] for k in claves},
+            ).values_list("pais_id", "tipo", "anio")
+        )
+
+    tocadas = set()
+    iso_por_id = {pk: iso for iso, pk in paises.items()}
+
+    def al_escribir(validas):
+        tocadas.update((tipo, anio) for _, tipo, anio in validas)
+        eventos.publicar(eventos.INDICADORES, [
+            [iso_por_id[d["pais_id"]], d["tipo"], d["anio"], d["valor"]] for d in validas.values()
+        ])
+
+    reporte = _importar(
+        iter_filas(stream, formato),
+        chunk_size,
+        normalizar=lambda fila: normalizar_indicador(fila, paises, fuente),
+        clave=lambda d: (d["pais_id"], d["tipo"], d["anio"]),
+        existentes=existentes,
+        modelo=IndicadorEconomico,
+        unique_fields=["pais", "tipo", "anio"],
+        update_fields=["valor", "unidad", "fuente", "fecha_actualizacion"],
+        al_escribir=al_escribir,
+        progreso=progreso,
+    )
+    if reporte.insertadas or reporte.actualizadas:
+        cache.invalidar(cache.INDICADORES)
+        # Un solo recálculo de agregados al final, no por lote
+        agregados.recalcular(tocadas)
+    return reporte
+
+
+# ---- tipos de cambio ----
+
+def normalizar_tipo_cambio(fila: dict, fuente: str) -> dict:
+    """
+    Convierte una fila en campos de TipoCambio. ``variacion_porcentual`` se ignora:
+    se recalcula después de escribir.
+    """
+    origen = str(_valor(fila, "moneda_origen", "origen") or "").strip().upper()
+    destino = str(_valor(fila, "moneda_destino", "destino") or "USD").strip().upper()
+    if len(origen) != 3 or len(destino) != 3 or not (origen + destino).isalpha():
+        raise ValueError(f"Par de monedas inválido: {origen or '-'}/{destino or '-'}")
+
+    fecha = parse_date(str(_valor(fila, "fecha", "date") or "").strip()[:10])
+    if fecha is None:
+        raise ValueError("fecha debe ser YYYY-MM-DD")
+
+    try:
+        tasa = float(_valor(fila, "tasa", "rate", "valor"))
+    except (TypeError, ValueError):
+        raise ValueError("tasa no numérica")
+    if not math.isfinite(tasa) or tasa <= 0:
+        raise ValueError("tasa debe ser positiva")
+
+    return {
+        "moneda_origen": origen,
+        "moneda_destino": destino,
+        "fecha": fecha,
+        "tasa": tasa,
+        "fuente": str(_valor(fila, "fuente") or fuente)[:50],
+    }
+
+
+def variaciones(tasas: np.ndarray, tasa_anterior: float | None = None) -> np.ndarray:
+    """
+    Variación porcentual día a día de una serie ordenada; NaN donde no hay dato previo.
+    """
+    previas = np.empty_like(tasas)
+    previas[0] = np.nan if tasa_anterior is None else tasa_anterior
+    previas[1:] = tasas[:-1]
+    return (tasas / previas - 1.0) * 100.0
+
+
+def recalcular_variaciones(moneda_origen: str, moneda_destino: str, desde=None, hasta=None) -> int:
+    """
+    Recalcula ``variacion_porcentual`` de un par entre ``desde`` y el primer día posterior
+    a ``hasta`` (cuya variación depende de ``hasta``). Solo escribe las filas que cambian.
+    Devuelve cuántas filas se actualizaron.
+    """
+    par = TipoCambio.objects.filter(moneda_origen=moneda_origen, moneda_destino=moneda_destino)
+
+    tasa_anterior = None
+    ventana = par
+    if desde is not None:
+        ventana = ventana.filter(fecha__gte=desde)
+        tasa_anterior = par.filter(fecha__lt=desde).order_by("-fecha").values_list("tasa", flat=True).first()
+    if hasta is not None:
+        siguiente = par.filter(fecha__gt=hasta).order_by("fecha").values_list("fecha", flat=True).first()
+        ventana = ventana.filter(fecha__lte=siguiente or hasta)
+
+    filas = list(ventana.order_by("fecha").values_list("id", "tasa", "variacion_porcentual"))
+    if not filas:
+        return 0
+
+    ids, tasas, actuales = zip(*filas)
+    nuevas = variaciones(np.array(tasas, dtype=float), tasa_anterior)
+    actuales = np.array([np.nan if v is None else v for v in actuales], dtype=float)
+    cambiadas = np.flatnonzero(~np.isclose(nuevas, actuales, equal_nan=True))
+
+    ahora = timezone.now()
+    objetos = [
+        TipoCambio(
+            id=ids[i],
+            variacion_porcentual=None if np.isnan(nuevas[i]) else float(nuevas[i]),
+            fecha_actualizacion=ahora,
+        )
+        for i in cambiadas
+    ]
+    TipoCambio.objects.bulk_update(
+        objetos, ["variacion_porcentual", "fecha_actualizacion"], batch_size=CHUNK_SIZE
+    )
+    return len(objetos)
+
+
+def importar_tipos_cambio(
+    stream,
+    formato: str = "csv",
+    *,
+    fuente: str = "MANUAL",
+    chunk_size: int = CHUNK_SIZE,
+    progreso=None,
+) -> ReporteImportacion:
+    """
+    Upsert de tasas contra ``uniq_fx_pair_fecha`` y recálculo de ``variacion_porcentual``
+    solo en la ventana de fechas tocada por el archivo para cada par.
+    """
+    ventanas = {}  # (origen, destino) -> [min fecha, max fecha]
+
+    def al_escribir(validas):
+        eventos.publicar(eventos.TIPOS_CAMBIO, [
+            [d["moneda_origen"], d["moneda_destino"], d["fecha"], d["tasa"]] for d in validas.values()
+        ])
+        for origen, destino, fecha in validas:
+            ventana = ventanas.setdefault((origen, destino), [fecha, fecha])
+            ventana[0] = min(ventana[0], fecha)
+            ventana[1] = max(ventana[1], fecha)
+
+    def existentes(claves):
+        return set(
+            TipoCambio.objects.filter(
+                moneda_origen__in={k[0] for k in claves},
+                moneda_destino__in={k[1] for k in claves},
+                fecha__in={k[2] for k in claves},
+            ).values_list("moneda_origen", "moneda_destino", "fecha")
+        )
+
+    reporte = _importar(
+        iter_filas(stream, formato),
+        chunk_size,
+        normalizar=lambda fila: normalizar_tipo_cambio(fila, fuente),
+        clave=lambda d: (d["moneda_origen"], d["moneda_destino"], d["fecha"]),
+        existentes=existentes,
+        modelo=TipoCambio,
+        unique_fields=["moneda_origen", "moneda_destino", "fecha"],
+        update_fields=["tasa", "fuente", "fecha_actualizacion"],
+        al_escribir=al_escribir,
+        progreso=progreso,
+    )
+
+    inicio = time.perf_counter()
+    with transaction.atomic():
+        reporte.variaciones_recalculadas = sum(
+            recalcular_variaciones(origen, destino, desde, hasta)
+            for (origen, destino), (desde, hasta) in ventanas.items()
+        )
+        # Histórico de portafolios: solo los días que cubren las ventanas tocadas
+        reporte.valores_portafolio_recalculados = sum(
+            historico.recalcular_moneda(origen, desde, hasta)
+            for (origen, destino), (desde, hasta) in ventanas.items()
+            if destino == MONEDA_PIVOTE
+        )
+    if ventanas:
+        cache.invalidar(cache.TIPOS_CAMBIO)
+    reporte.duracion_s = round(reporte.duracion_s + time.perf_counter() - inicio, 3)
+    if reporte.duracion_s:
+        reporte.filas_por_segundo = round(reporte.leidas / reporte.duracion_s, 1)
+    return reporte
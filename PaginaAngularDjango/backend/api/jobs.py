@@ -0,0 +1,289 @@
+"""
+Cola de tareas en la base de datos (modelo Job) para las operaciones largas.
+
+- ``encolar`` crea el job o devuelve el que ya está activo con la misma clave, así dos
+  admins que piden el mismo sync a la vez comparten un solo job. Los archivos de las
+  cargas se hashean por bloques y se guardan en el storage (MEDIA_ROOT/tmp/jobs/): ni el
+  request ni la BD ni el worker los tienen enteros en memoria.
+- ``tomar`` reclama el siguiente job con un UPDATE condicional: varios workers (hilos,
+  procesos o máquinas) compiten sin locks de la BD y solo uno gana cada job.
+- ``ejecutar`` corre el handler del tipo, guarda progreso y resultado, y reintenta los
+  errores transitorios con backoff exponencial.
+- Un job EN_CURSO sin latido por más de ``TIMEOUT_S`` (worker caído) se vuelve a tomar.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .importers import ImportacionError, importar_indicadores, importar_tipos_cambio
+from .models import Job
+from .sync import sincronizar_paises
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "MAX_INTENTOS": 3,
+    "BACKOFF_S": 30,       # espera antes del reintento n: BACKOFF_S * 2 ** (n - 1)
+    "BACKOFF_MAX_S": 900,
+    "TIMEOUT_S": 600,      # sin latido por más de esto se asume que el worker murió
+    "INTERVALO_S": 2.0,    # polling del worker con la cola vacía
+    "LATIDO_S": 1.0,       # cada cuánto se persiste el progreso
+    "EAGER": False,        # ejecutar al encolar (desarrollo sin worker)
+}
+
+# Errores que no se arreglan reintentando
+PERMANENTES = (ImportacionError, KeyError, ValueError)
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "DATAPULSE_JOBS", {})}
+
+
+# ---- handlers: (job, progreso) -> (resultado, errores) ----
+
+def _sync_paises(job, progreso):
+    resultado = sincronizar_paises(
+        job.parametros.get("iso"), forzar=job.parametros.get("forzar", False), progreso=progreso
+    )
+    return resultado.as_dict(), resultado.errors
+
+
+def _importador(funcion):
+    def handler(job, progreso):
+        # El importador lee por bloques directo del archivo
+        with job.archivo.open("rb") as archivo:
+            reporte = funcion(
+                archivo.file,
+                job.parametros["formato"],
+                fuente=job.parametros["fuente"],
+                progreso=progreso,
+            )
+        return reporte.as_dict(), reporte.errores
+    return handler
+
+
+HANDLERS = {
+    Job.Tipo.SYNC_PAISES: _sync_paises,
+    Job.Tipo.IMPORTAR_INDICADORES: _importador(importar_indicadores),
+    Job.Tipo.IMPORTAR_TIPOS_CAMBIO: _importador(importar_tipos_cambio),
+}
+
+
+# ---- encolado ----
+
+def hash_archivo(archivo) -> str:
+    """
+    sha256 de un File de Django (p. ej. el UploadedFile del request), leído por bloques.
+    """
+    h = hashlib.sha256()
+    for bloque in archivo.chunks():
+        h.update(bloque)
+    return h.hexdigest()
+
+
+def calcular_clave(tipo: str, parametros: dict, sha256_archivo: str = "") -> str:
+    h = hashlib.sha256(tipo.encode())
+    h.update(json.dumps(parametros, sort_keys=True, separators=(",", ":")).encode())
+    h.update(sha256_archivo.encode())
+    return h.hexdigest()
+
+
+def _guardar_archivo(archivo, sha256_archivo: str) -> str:
+    # Con TemporaryUploadedFile (cargas grandes) el storage mueve el temporal, no lo copia
+    campo = Job._meta.get_field("archivo")
+    nombre = campo.generate_filename(None, sha256_archivo[:32])
+    return campo.storage.save(nombre, archivo, max_length=campo.max_length)
+
+
+def _borrar_archivo(nombre: str) -> None:
+    if nombre:
+        Job._meta.get_field("archivo").storage.delete(nombre)
+
+
+def encolar(tipo: str, parametros: dict | None = None, *, archivo=None, usuario=None):
+    """
+    Devuelve (job, creado). Si ya hay un job PENDIENTE / EN_CURSO con la misma clave
+    se devuelve ese (creado=False) en lugar de duplicar el trabajo. ``archivo`` es un
+    File de Django; solo se guarda si se crea el job.
+    """
+    config = get_config()
+    parametros = parametros or {}
+    sha256_archivo = hash_archivo(archivo) if archivo is not None else ""
+    clave = calcular_clave(tipo, parametros, sha256_archivo)
+    existente = Job.objects.filter(clave=clave, estado__in=Job.ACTIVOS).first()
+    if existente is not None:
+        return existente, False
+
+    ruta = _guardar_archivo(archivo, sha256_archivo) if archivo is not None else ""
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(
+                tipo=tipo,
+                parametros=parametros,
+                archivo=ruta,
+                archivo_sha256=sha256_archivo,
+                clave=clave,
+                usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+                max_intentos=config["MAX_INTENTOS"],
+                disponible_desde=timezone.now(),
+            )
+    except IntegrityError:
+        # Carrera con otro request entre la consulta y el insert: gana el índice único
+        _borrar_archivo(ruta)
+        existente = Job.objects.filter(clave=clave, estado__in=Job.ACTIVOS).first()
+        if existente is None:
+            raise
+        return existente, False
+
+    if config["EAGER"]:
+        tomado = tomar("eager", config, pk=job.pk)
+        if tomado is not None:
+            ejecutar(tomado, config)
+        job.refresh_from_db()
+    return job, True
+
+
+# ---- ejecución ----
+
+class _Progreso:
+    """
+    Callback ``progreso(procesados, total=None)`` para los handlers. Escribe en la BD a
+    lo sumo cada ``LATIDO_S`` segundos; cada escritura también sirve de latido.
+    """
+
+    def __init__(self, job, config):
+        self.job = job
+        self.intervalo = config["LATIDO_S"]
+        self.procesados = 0
+        self.total = None
+        self._ultimo = 0.0
+
+    def __call__(self, procesados: int, total: int | None = None) -> None:
+        self.procesados, self.total = procesados, total
+        ahora = time.monotonic()
+        if ahora - self._ultimo < self.intervalo:
+            return
+        self._ultimo = ahora
+        Job.objects.filter(pk=self.job.pk, worker=self.job.worker).update(
+            procesados=procesados, total=total, latido=timezone.now()
+        )
+
+
+def tomar(worker: str, config: dict | None = None, *, pk=None):
+    """
+    Reclama el próximo job disponible (o el job ``pk``) para ``worker``. None si no hay.
+    """
+    config = config or get_config()
+    ahora = timezone.now()
+    vencido = ahora - timedelta(seconds=config["TIMEOUT_S"])
+    candidatos = Job.objects.filter(
+        Q(estado=Job.Estado.PENDIENTE, disponible_desde__lte=ahora)
+        | Q(estado=Job.Estado.EN_CURSO, latido__lt=vencido)
+    )
+    if pk is not None:
+        candidatos = candidatos.filter(pk=pk)
+    for job_pk, estado, latido in candidatos.order_by("disponible_desde", "pk").values_list(
+        "pk", "estado", "latido"
+    )[:10]:
+        # Solo gana quien ve la fila todavía en el estado leído
+        tomados = Job.objects.filter(pk=job_pk, estado=estado, latido=latido).update(
+            estado=Job.Estado.EN_CURSO,
+            worker=worker,
+            latido=ahora,
+            iniciado=ahora,
+            procesados=0,
+            intentos=F("intentos") + 1,
+        )
+        if tomados:
+            return Job.objects.get(pk=job_pk)
+    return None
+
+
+def backoff(intento: int, config: dict) -> float:
+    return min(config["BACKOFF_S"] * 2 ** max(intento - 1, 0), config["BACKOFF_MAX_S"])
+
+
+def ejecutar(job, config: dict | None = None):
+    """
+    Corre un job ya tomado y deja su estado final (o PENDIENTE con backoff si se reintenta).
+    """
+    config = config or get_config()
+    progreso = _Progreso(job, config)
+    try:
+        if job.intentos > job.max_intentos:
+            raise RuntimeError("El worker se detuvo sin terminar el job demasiadas veces.")
+        resultado, errores = HANDLERS[job.tipo](job, progreso)
+    except Exception as e:
+        return _fallar(job, e, progreso, config)
+
+    ahora = timezone.now()
+    terminado = Job.objects.filter(pk=job.pk, worker=job.worker).update(
+        estado=Job.Estado.COMPLETADO,
+        resultado=resultado,
+        errores=[*job.errores, *errores],
+        procesados=progreso.procesados,
+        total=progreso.total,
+        archivo="",
+        latido=ahora,
+        terminado=ahora,
+    )
+    if terminado:  # si otro worker retomó el job, el archivo sigue siendo suyo
+        _borrar_archivo(job.archivo.name)
+    return job
+
+
+def _fallar(job, error: Exception, progreso: _Progreso, config: dict):
+    ahora = timezone.now()
+    errores = [*job.errores, {"intento": job.intentos, "error": f"{type(error).__name__}: {error}"}]
+    campos = {"errores": errores, "procesados": progreso.procesados, "total": progreso.total, "latido": ahora}
+    if isinstance(error, PERMANENTES) or job.intentos >= job.max_intentos:
+        logger.error("Job %s falló (intento %s): %s", job.pk, job.intentos, error)
+        campos.update(estado=Job.Estado.FALLIDO, archivo="", terminado=ahora)
+    else:
+        espera = backoff(job.intentos, config)
+        logger.warning("Job %s falló (intento %s), reintento en %ss: %s", job.pk, job.intentos, espera, error)
+        campos.update(estado=Job.Estado.PENDIENTE, disponible_desde=ahora + timedelta(seconds=espera))
+    if Job.objects.filter(pk=job.pk, worker=job.worker).update(**campos) and campos.get("archivo") == "":
+        _borrar_archivo(job.archivo.name)
+    return job
+
+
+def trabajar(worker: str, *, detener: threading.Event | None = None, una_vez: bool = False,
+             config: dict | None = None) -> int:
+    """
+    Bucle de un worker: toma y ejecuta jobs hasta ``detener`` (o hasta vaciar la cola si
+    ``una_vez``). Devuelve cuántos jobs ejecutó.
+    """
+    config = config or get_config()
+    detener = detener or threading.Event()
+    ejecutados = 0
+    try:
+        while not detener.is_set():
+            _renovar_conexion()
+            job = tomar(worker, config)
+            if job is None:
+                if una_vez:
+                    break
+                detener.wait(config["INTERVALO_S"])
+                continue
+            ejecutar(job, config)
+            ejecutados += 1
+    finally:
+        _renovar_conexion()
+    return ejecutados
+
+
+def _renovar_conexion() -> None:
+    # Como entre requests: descarta conexiones rotas o vencidas (CONN_MAX_AGE), salvo
+    # dentro de una transacción de quien llama (p. ej. los tests)
+    if not connection.in_atomic_block:
+        close_old_connections()
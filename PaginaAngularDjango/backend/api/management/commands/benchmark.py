@@ -0,0 +1,426 @@
+import json
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from django.contrib.auth.models import Group, User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api import agregados, historico, jobs, urls as api_urls
+from api.cache import get_config as get_cache_config
+from api.models import (
+    AgregadoRegional,
+    ContactMessage,
+    IndicadorEconomico,
+    Job,
+    Pais,
+    Portafolio,
+    Posicion,
+    Project,
+    TipoCambio,
+)
+from api.permissions import IsAdminRole, IsAnalystOrAdmin, IsViewerOrAbove, invalidate_user_roles
+from api.renderers import FastJSONRenderer
+from api.serializers import (
+    AgregadoRegionalSerializer,
+    IndicadorEconomicoSerializer,
+    PaisSerializer,
+    PortafolioListSerializer,
+    PosicionSerializer,
+    TipoCambioSerializer,
+)
+from api.sinteticos import FX_INICIO, Escala, generar
+
+
+PASSWORD = "benchmark"
+
+# Rutas que no se pueden medir offline
+OMITIDAS = {
+    "sync-paises": "requiere red (RestCountries)",
+    "async-sync-paises": "requiere red (RestCountries)",
+    "eventos": "stream SSE de larga duración (requiere ASGI)",
+}
+
+
+def _percentiles(tiempos_ms) -> dict:
+    if not len(tiempos_ms):
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "media_ms": None}
+    p50, p95, p99 = np.percentile(tiempos_ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "media_ms": round(float(np.mean(tiempos_ms)), 3),
+    }
+
+
+def _nombres_rutas(patrones) -> set:
+    nombres = set()
+    for patron in patrones:
+        if isinstance(patron, URLResolver):
+            nombres |= _nombres_rutas(patron.url_patterns)
+        elif patron.name:
+            nombres.add(patron.name)
+    return nombres
+
+
+def _commit():
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        )
+        return salida.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark reproducible de la API sobre una base SQLite temporal: genera datos sintéticos, "
+        "corre micro-benchmarks de serializers/renderers/permisos y una carga en proceso con JWT "
+        "sobre todas las rutas de api/urls.py. Guarda el resultado en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--paises", type=int, default=20)
+        parser.add_argument("--fx-filas", type=int, default=50_000)
+        parser.add_argument("--anio-desde", type=int, default=2000)
+        parser.add_argument("--portafolios", type=int, default=20)
+        parser.add_argument("--posiciones", type=int, default=5_000)
+        parser.add_argument("--requests", type=int, default=30, help="Requests por ruta en la carga")
+        parser.add_argument("--concurrencia", type=int, default=4, help="Clientes simultáneos (hilos)")
+        parser.add_argument("--micro-objetos", type=int, default=500)
+        parser.add_argument("--micro-repeticiones", type=int, default=20)
+        parser.add_argument("--solo", choices=["micro", "carga"])
+        parser.add_argument("--salida", default="benchmark.json")
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def handle(self, *args, **options):
+        escala = Escala(
+            paises=options["paises"],
+            fx_filas=options["fx_filas"],
+            anio_desde=options["anio_desde"],
+            portafolios=options["portafolios"],
+            posiciones=options["posiciones"],
+            semilla=options["semilla"],
+        )
+        resultado = {
+            "fecha": timezone.now().isoformat(),
+            "commit": _commit(),
+            "escala": escala.as_dict(),
+        }
+
+        setup_test_environment()
+        nombre_original = connection.settings_dict["NAME"]
+        with tempfile.TemporaryDirectory() as tmp:
+            # Base de archivo (no en memoria) para que los hilos de la carga compartan los datos
+            connection.settings_dict["TEST"] = {
+                **connection.settings_dict.get("TEST", {}),
+                "NAME": str(Path(tmp) / "benchmark_api.sqlite3"),
+            }
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            # Los archivos de las cargas encoladas quedan en el directorio temporal
+            media = override_settings(MEDIA_ROOT=str(Path(tmp) / "media"))
+            media.enable()
+            try:
+                caches[get_cache_config()["ALIAS"]].clear()
+                self.stdout.write("Generando datos...")
+                inicio = time.perf_counter()
+                contexto = generar(escala)
+                agregados.recalcular()
+                historico.recalcular()
+                resultado["generacion_s"] = round(time.perf_counter() - inicio, 3)
+                usuarios = self._usuarios()
+
+                if options["solo"] in (None, "micro"):
+                    self.stdout.write("Micro-benchmarks...")
+                    resultado["micro"] = self._micro(usuarios, options)
+                if options["solo"] in (None, "carga"):
+                    self.stdout.write("Carga...")
+                    resultado["carga"] = self._carga(contexto, options)
+            finally:
+                media.disable()
+                connection.creation.destroy_test_db(nombre_original, verbosity=0)
+                teardown_test_environment()
+
+        Path(options["salida"]).write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+        self._imprimir(resultado)
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+
+    # ---- datos ----
+
+    def _usuarios(self) -> dict:
+        usuarios = {}
+        for rol, grupo in (("viewer", "VIEWER"), ("analista", "ANALISTA"), ("admin", "ADMIN")):
+            user = User.objects.create_user(f"bench_{rol}", password=PASSWORD)
+            user.groups.add(Group.objects.get_or_create(name=grupo)[0])
+            usuarios[rol] = user
+        usuarios["anonimo"] = None
+        return usuarios
+
+    # ---- micro-benchmarks ----
+
+    def _medir(self, funcion, repeticiones: int) -> list:
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos
+
+    def _micro(self, usuarios, options) -> dict:
+        n = options["micro_objetos"]
+        repeticiones = options["micro_repeticiones"]
+        # Los objetos se cargan antes: solo se mide la serialización
+        conjuntos = {
+            "PaisSerializer": (PaisSerializer, list(Pais.objects.all()[:n])),
+            "IndicadorEconomicoSerializer": (IndicadorEconomicoSerializer, list(IndicadorEconomico.objects.all()[:n])),
+            "TipoCambioSerializer": (TipoCambioSerializer, list(TipoCambio.objects.all()[:n])),
+            "AgregadoRegionalSerializer": (AgregadoRegionalSerializer, list(AgregadoRegional.objects.all()[:n])),
+            "PosicionSerializer": (PosicionSerializer, list(Posicion.objects.select_related("pais")[:n])),
+            "PortafolioListSerializer": (
+                PortafolioListSerializer,
+                list(Portafolio.objects.annotate(posiciones_count=Count("posiciones")).order_by("-created_at")[:n]),
+            ),
+        }
+        serializers = {}
+        datos_render = None
+        for nombre, (serializer_class, objetos) in conjuntos.items():
+            tiempos = self._medir(lambda: serializer_class(objetos, many=True).data, repeticiones)
+            serializers[nombre] = {
+                "objetos": len(objetos),
+                **_percentiles(tiempos),
+                "us_por_objeto": round(float(np.median(tiempos)) * 1000 / max(len(objetos), 1), 3),
+            }
+            if nombre == "IndicadorEconomicoSerializer":
+                datos_render = serializer_class(objetos, many=True).data
+
+        renderers = {
+            clase.__name__: _percentiles(self._medir(lambda: clase().render(datos_render), repeticiones))
+            for clase in (JSONRenderer, FastJSONRenderer)
+        }
+
+        factory = APIRequestFactory()
+        iteraciones = 2_000
+        permisos = {}
+        for permiso in (IsViewerOrAbove, IsAnalystOrAdmin, IsAdminRole):
+            for rol, user in usuarios.items():
+                if user is None:
+                    continue
+                request = Request(factory.get("/"))
+                request.user = user
+                instancia = permiso()
+
+                def caliente():
+                    for _ in range(iteraciones):
+                        instancia.has_permission(request, None)
+
+                def frio():
+                    # Sin roles memorizados: una query por chequeo
+                    for _ in range(iteraciones // 20):
+                        invalidate_user_roles(user)
+                        instancia.has_permission(request, None)
+
+                permisos[f"{permiso.__name__}.{rol}"] = {
+                    "caliente_ns_por_llamada": round(float(np.median(self._medir(caliente, 5))) * 1e6 / iteraciones, 1),
+                    "frio_us_por_llamada": round(float(np.median(self._medir(frio, 5))) * 1e3 / (iteraciones // 20), 2),
+                }
+        return {"serializers": serializers, "renderers": renderers, "permisos": permisos}
+
+    # ---- carga ----
+
+    def _tokens(self) -> dict:
+        client = Client()
+        tokens = {}
+        for rol in ("viewer", "analista", "admin"):
+            resp = client.post(
+                "/api/auth/login/",
+                {"username": f"bench_{rol}", "password": PASSWORD},
+                content_type="application/json",
+            )
+            tokens[rol] = resp.json()
+        return tokens
+
+    def _escenarios(self, contexto, tokens) -> list:
+        pais = contexto["pais"].codigo_iso
+        portafolio = contexto["portafolio"].pk
+        project = Project.objects.create(title="Benchmark", description="-")
+        mensaje = ContactMessage.objects.create(name="Bench", email="bench@example.com", message="-")
+        job, _ = jobs.encolar(Job.Tipo.SYNC_PAISES, {"iso": None, "forzar": False})
+        csv_indicadores = f"codigo_iso,tipo,unidad,anio,valor\n{pais},PIB,USD,2024,1\n".encode()
+        csv_fx = f"moneda_origen,moneda_destino,fecha,tasa\n{contexto['moneda']},USD,2030-01-01,1.5\n".encode()
+
+        def archivo(nombre, contenido):
+            return lambda: {"archivo": SimpleUploadedFile(nombre, contenido, content_type="text/csv")}
+
+        def json_body(datos):
+            return lambda: json.dumps(datos)
+
+        # (nombre de ruta, método, url, rol, body, status esperado)
+        return [
+            ("api-root", "get", reverse("api-root"), "viewer", None, 200),
+            ("project-list", "get", reverse("project-list"), "anonimo", None, 200),
+            ("project-detail", "get", reverse("project-detail", args=[project.pk]), "anonimo", None, 200),
+            ("contactmessage-list", "post", reverse("contactmessage-list"), "anonimo",
+             json_body({"name": "Bench", "email": "bench@example.com", "message": "hola"}), 201),
+            ("contactmessage-list", "get", reverse("contactmessage-list"), "admin", None, 200),
+            ("contactmessage-detail", "get", reverse("contactmessage-detail", args=[mensaje.pk]), "admin", None, 200),
+            ("pais-list", "get", reverse("pais-list"), "viewer", None, 200),
+            ("pais-bulk", "get", reverse("pais-bulk") + f"?iso={pais},AA,AB", "viewer", None, 200),
+            ("pais-detail", "get", reverse("pais-detail", args=[pais]), "viewer", None, 200),
+            ("pais-indicadores", "get", reverse("pais-indicadores", args=[pais]), "viewer", None, 200),
+            ("pais-tipo-cambio", "get", reverse("pais-tipo-cambio", args=[pais]), "viewer", None, 200),
+            ("pais-tipo-cambio-serie", "get", reverse("pais-tipo-cambio-serie", args=[pais]) + "?frecuencia=mensual",
+             "viewer", None, 200),
+            ("indicador-list", "get", reverse("indicador-list") + "?page_size=100", "viewer", None, 200),
+            ("indicador-detail", "get", reverse("indicador-detail", args=[IndicadorEconomico.objects.first().pk]),
+             "viewer", None, 200),
+            ("indicador-exportar", "get", reverse("indicador-exportar") + f"?pais={pais}", "viewer", None, 200),
+            ("tipocambio-list", "get", reverse("tipocambio-list") + f"?moneda_origen={contexto['moneda']}",
+             "viewer", None, 200),
+            ("tipocambio-detail", "get", reverse("tipocambio-detail", args=[TipoCambio.objects.first().pk]),
+             "viewer", None, 200),
+            ("tipocambio-exportar", "get", reverse("tipocambio-exportar") + f"?moneda_origen={contexto['moneda']}",
+             "viewer", None, 200),
+            ("agregadoregional-list", "get", reverse("agregadoregional-list") + "?region=LATAM", "viewer", None, 200),
+            ("agregadoregional-detail", "get",
+             reverse("agregadoregional-detail", args=[AgregadoRegional.objects.first().pk]), "viewer", None, 200),
+            ("portafolio-list", "get", reverse("portafolio-list"), "viewer", None, 200),
+            ("portafolio-list", "post", reverse("portafolio-list"), "analista",
+             json_body({"nombre": "Bench", "descripcion": "-"}), 201),
+            ("portafolio-detail", "get", reverse("portafolio-detail", args=[portafolio]), "viewer", None, 200),
+            ("portafolio-posiciones", "get", reverse("portafolio-posiciones", args=[portafolio]), "viewer", None, 200),
+            ("portafolio-exportar-posiciones", "get", reverse("portafolio-exportar-posiciones", args=[portafolio]),
+             "viewer", None, 200),
+            ("portafolio-valuacion", "get", reverse("portafolio-valuacion", args=[portafolio]), "viewer", None, 200),
+            ("portafolio-riesgo", "get",
+             reverse("portafolio-riesgo", args=[portafolio]) + f"?desde={FX_INICIO}&hasta={contexto['hasta']}",
+             "viewer", None, 200),
+            ("portafolio-historico", "get", reverse("portafolio-historico", args=[portafolio]) + "?frecuencia=mensual",
+             "viewer", None, 200),
+            # Solo se mide el encolado (202); los jobs repetidos se deduplican
+            ("importar-indicadores", "post", reverse("importar-indicadores"), "admin",
+             archivo("indicadores.csv", csv_indicadores), 202),
+            ("importar-tipos-cambio", "post", reverse("importar-tipos-cambio"), "admin",
+             archivo("tipos_cambio.csv", csv_fx), 202),
+            ("job-list", "get", reverse("job-list"), "admin", None, 200),
+            ("job-detail", "get", reverse("job-detail", args=[job.pk]), "admin", None, 200),
+            ("token_obtain_pair", "post", reverse("token_obtain_pair"), "anonimo",
+             json_body({"username": "bench_viewer", "password": PASSWORD}), 200),
+            ("token_refresh", "post", reverse("token_refresh"), "anonimo",
+             json_body({"refresh": tokens["viewer"]["refresh"]}), 200),
+            ("auth-me", "get", reverse("auth-me"), "viewer", None, 200),
+            ("metrics", "get", reverse("metrics"), "admin", None, 200),
+            ("cambios", "get", reverse("cambios", args=["indicadores"]) + "?limite=500", "viewer", None, 200),
+            ("async-paises", "get", reverse("async-paises"), "viewer", None, 200),
+            ("async-pais", "get", reverse("async-pais", args=[pais]), "viewer", None, 200),
+            ("async-pais-tipo-cambio", "get", reverse("async-pais-tipo-cambio", args=[pais]), "viewer", None, 200),
+            ("async-tipos-cambio", "get", reverse("async-tipos-cambio") + f"?moneda_origen={contexto['moneda']}",
+             "viewer", None, 200),
+        ]
+
+    def _ejecutar(self, escenario, tokens, cantidad: int) -> tuple:
+        _, metodo, url, rol, body, esperado = escenario
+        headers = {}
+        if rol != "anonimo":
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {tokens[rol]['access']}"
+        client = Client(raise_request_exception=False)
+        tiempos, errores = [], 0
+        try:
+            for _ in range(cantidad):
+                kwargs = dict(headers)
+                if body is not None:
+                    datos = body()
+                    if isinstance(datos, str):
+                        kwargs.update(data=datos, content_type="application/json")
+                    else:
+                        kwargs["data"] = datos
+                inicio = time.perf_counter()
+                resp = getattr(client, metodo)(url, **kwargs)
+                if resp.streaming:
+                    for _ in resp.streaming_content:
+                        pass
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                errores += resp.status_code != esperado
+        finally:
+            # Cada hilo abre su propia conexión
+            connections.close_all()
+        return tiempos, errores
+
+    def _carga(self, contexto, options) -> dict:
+        tokens = self._tokens()
+        escenarios = self._escenarios(contexto, tokens)
+        concurrencia = max(1, options["concurrencia"])
+        por_hilo = max(1, options["requests"] // concurrencia)
+
+        rutas = {}
+        todos = []
+        inicio_total = time.perf_counter()
+        for escenario in escenarios:
+            nombre, metodo, url, rol, _, _ = escenario
+            # SQLite admite un solo escritor: las escrituras van en un único hilo
+            hilos = concurrencia if metodo == "get" else 1
+            cantidad = por_hilo * concurrencia // hilos
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=hilos) as pool:
+                partes = list(pool.map(lambda _: self._ejecutar(escenario, tokens, cantidad), range(hilos)))
+            duracion = time.perf_counter() - inicio
+            tiempos = [t for parte, _ in partes for t in parte]
+            todos += tiempos
+            rutas[f"{metodo.upper()} {nombre}"] = {
+                "url": url,
+                "rol": rol,
+                "concurrencia": hilos,
+                "requests": len(tiempos),
+                "errores": sum(e for _, e in partes),
+                "rps": round(len(tiempos) / duracion, 1) if duracion else None,
+                **_percentiles(tiempos),
+            }
+        duracion_total = time.perf_counter() - inicio_total
+
+        cubiertas = {e[0] for e in escenarios}
+        return {
+            "concurrencia": concurrencia,
+            "requests_por_ruta": por_hilo * concurrencia,
+            "rutas": rutas,
+            "total": {
+                "requests": len(todos),
+                "errores": sum(r["errores"] for r in rutas.values()),
+                "rps": round(len(todos) / duracion_total, 1) if duracion_total else None,
+                **_percentiles(todos),
+            },
+            "omitidas": OMITIDAS,
+            "sin_cubrir": sorted(_nombres_rutas(api_urls.urlpatterns) - cubiertas - set(OMITIDAS)),
+        }
+
+    # ---- salida ----
+
+    def _imprimir(self, resultado):
+        for nombre, datos in resultado.get("micro", {}).get("serializers", {}).items():
+            self.stdout.write(f"{nombre:<32} {datos['us_por_objeto']:>9.2f} us/objeto")
+        carga = resultado.get("carga")
+        if not carga:
+            return
+        for nombre, datos in carga["rutas"].items():
+            self.stdout.write(
+                f"{nombre:<40} {datos['rps']:>8} req/s  p50 {datos['p50_ms']:>8.2f}  p95 {datos['p95_ms']:>8.2f}"
+                f"  p99 {datos['p99_ms']:>8.2f} ms  errores {datos['errores']}"
+            )
+        total = carga["total"]
+        self.stdout.write(f"TOTAL {total['requests']} requests, {total['rps']} req/s, p95 {total['p95_ms']} ms")
+        if carga["sin_cubrir"]:
+            self.stdout.write(self.style.WARNING(f"Rutas sin escenario: {', '.join(carga['sin_cubrir'])}"))
@@ -0,0 +1,247 @@
+import io
+import json
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import agregados, historico
+from api.cache import get_config as get_cache_config
+from api.importers import importar_tipos_cambio
+from api.management.commands.benchmark import _commit, _percentiles
+from api.models import Pais
+from api.sinteticos import Escala, generar
+from config import settings_produccion
+
+
+FUTURO = date(2100, 1, 1)
+
+# Perfil de desarrollo: rollback journal, una conexión por request, sin réplica
+BASE = {"CONN_MAX_AGE": 0, "OPTIONS": {}, "PRAGMAS": {}, "replica": False}
+
+PRODUCCION = {
+    "CONN_MAX_AGE": 600,
+    "OPTIONS": settings_produccion.DATABASES["default"]["OPTIONS"],
+    "PRAGMAS": settings_produccion.PRAGMAS_SQLITE,
+    "replica": True,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga mixta de lecturas (GET a la API) y escrituras (importaciones de tipos de cambio) "
+        "concurrentes sobre una base SQLite temporal, con el perfil de desarrollo y con el de "
+        "config/settings_produccion.py (WAL, PRAGMAs, conexiones persistentes, réplica de lectura)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--segundos", type=float, default=10, help="Duración de cada perfil")
+        parser.add_argument("--lectores", type=int, default=8, help="Hilos que hacen GET")
+        parser.add_argument("--escritores", type=int, default=1, help="Hilos que importan tasas")
+        parser.add_argument("--filas-por-lote", type=int, default=500, help="Filas por importación")
+        parser.add_argument("--pausa-ms", type=float, default=50, help="Pausa entre importaciones")
+        parser.add_argument("--paises", type=int, default=20)
+        parser.add_argument("--fx-filas", type=int, default=50_000)
+        parser.add_argument("--posiciones", type=int, default=5_000)
+        parser.add_argument("--salida", default="benchmark_concurrencia.json")
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def handle(self, *args, **options):
+        escala = Escala(
+            paises=options["paises"],
+            fx_filas=options["fx_filas"],
+            posiciones=options["posiciones"],
+            semilla=options["semilla"],
+        )
+        resultado = {
+            "fecha": timezone.now().isoformat(),
+            "commit": _commit(),
+            "escala": escala.as_dict(),
+            "parametros": {
+                k: options[k] for k in ("segundos", "lectores", "escritores", "filas_por_lote", "pausa_ms")
+            },
+        }
+
+        setup_test_environment()
+        nombre_original = connection.settings_dict["NAME"]
+        with tempfile.TemporaryDirectory() as tmp:
+            connection.settings_dict["TEST"] = {
+                **connection.settings_dict.get("TEST", {}),
+                "NAME": str(Path(tmp) / "benchmark_concurrencia.sqlite3"),
+            }
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self.stdout.write("Generando datos...")
+                contexto = generar(escala)
+                agregados.recalcular()
+                historico.recalcular()
+                token = self._token()
+                urls = self._urls(contexto)
+
+                # El perfil base primero: WAL queda grabado en el archivo
+                for nombre, perfil in (("base", BASE), ("produccion", PRODUCCION)):
+                    self.stdout.write(f"Perfil {nombre}...")
+                    resultado[nombre] = self._correr(perfil, urls, token, contexto, options)
+            finally:
+                self._aplicar(BASE)
+                connection.creation.destroy_test_db(nombre_original, verbosity=0)
+                teardown_test_environment()
+
+        resultado["mejora"] = self._mejora(resultado["base"], resultado["produccion"])
+        Path(options["salida"]).write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+        self._imprimir(resultado)
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+
+    # ---- preparación ----
+
+    def _token(self) -> str:
+        user = User.objects.create_user("bench_concurrencia", password="benchmark")
+        user.groups.add(Group.objects.get_or_create(name="VIEWER")[0])
+        return str(AccessToken.for_user(user))
+
+    def _urls(self, contexto) -> list:
+        moneda = contexto["moneda"]
+        pais = Pais.objects.filter(activo=True, moneda_codigo=moneda).first() or Pais.objects.filter(activo=True).first()
+        portafolio = contexto["portafolio"].pk
+        return [
+            reverse("pais-list"),
+            reverse("pais-tipo-cambio", args=[pais.codigo_iso]),
+            reverse("pais-tipo-cambio-serie", args=[pais.codigo_iso]) + "?frecuencia=mensual",
+            reverse("tipocambio-list") + f"?moneda_origen={moneda}",
+            reverse("indicador-list") + "?page_size=100",
+            reverse("portafolio-valuacion", args=[portafolio]),
+            reverse("portafolio-historico", args=[portafolio]) + "?frecuencia=mensual",
+            reverse("auth-me"),
+        ]
+
+    def _aplicar(self, perfil) -> None:
+        """
+        Cambia el perfil de la conexión en caliente: las conexiones nuevas de cada hilo toman
+        el settings_dict compartido (y el receiver de api.db aplica los PRAGMAs).
+        """
+        connections.close_all()
+        primario = connections.settings["default"]
+        primario.update(
+            CONN_MAX_AGE=perfil["CONN_MAX_AGE"], OPTIONS=dict(perfil["OPTIONS"]), PRAGMAS=dict(perfil["PRAGMAS"])
+        )
+        if perfil["replica"]:
+            # Réplica sobre el mismo archivo, como en producción con SQLite
+            connections.settings["replica"] = {**settings_produccion.replica(primario, primario["NAME"]), "TEST": {}}
+        else:
+            connections.settings.pop("replica", None)
+
+    # ---- carga ----
+
+    def _correr(self, perfil, urls, token, contexto, options) -> dict:
+        self._aplicar(perfil)
+        caches[get_cache_config()["ALIAS"]].clear()
+        ajustes = {
+            # Sin caché de respuestas: se mide la base, no LocMemCache
+            "DATAPULSE_CACHE": {**get_cache_config(), "ENABLED": False},
+            "DATAPULSE_METRICS": {"ENABLED": False},
+        }
+        if perfil["replica"]:
+            ajustes["DATABASE_ROUTERS"] = settings_produccion.ROUTERS_REPLICA
+            ajustes["MIDDLEWARE"] = settings_produccion.MIDDLEWARE_REPLICA
+
+        fin = time.perf_counter() + options["segundos"]
+        lecturas = [{"tiempos": [], "errores": 0} for _ in range(options["lectores"])]
+        escrituras = [{"tiempos": [], "filas": 0, "errores": 0} for _ in range(options["escritores"])]
+        # Cada escritor inserta fechas nuevas de una moneda con posiciones (recalcula el histórico)
+        siguiente = [FUTURO + timedelta(days=i * 100_000) for i in range(options["escritores"])]
+        moneda = contexto["moneda"]
+
+        def leer(i):
+            client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f"Bearer {token}")
+            azar = random.Random(options["semilla"] + i)
+            try:
+                while time.perf_counter() < fin:
+                    inicio = time.perf_counter()
+                    resp = client.get(azar.choice(urls))
+                    lecturas[i]["tiempos"].append((time.perf_counter() - inicio) * 1000)
+                    lecturas[i]["errores"] += resp.status_code != 200
+            finally:
+                connections.close_all()
+
+        def escribir(i):
+            try:
+                while time.perf_counter() < fin:
+                    fechas = [siguiente[i] + timedelta(days=d) for d in range(options["filas_por_lote"])]
+                    siguiente[i] = fechas[-1] + timedelta(days=1)
+                    csv = "moneda_origen,moneda_destino,fecha,tasa\n" + "".join(
+                        f"{moneda},USD,{f},{1 + d / 1000}\n" for d, f in enumerate(fechas)
+                    )
+                    inicio = time.perf_counter()
+                    try:
+                        reporte = importar_tipos_cambio(io.BytesIO(csv.encode()), "csv")
+                        escrituras[i]["filas"] += reporte.insertadas + reporte.actualizadas
+                    except Exception:  # "database is locked" y similares
+                        escrituras[i]["errores"] += 1
+                    escrituras[i]["tiempos"].append((time.perf_counter() - inicio) * 1000)
+                    time.sleep(options["pausa_ms"] / 1000)
+            finally:
+                connections.close_all()
+
+        with override_settings(**ajustes):
+            hilos = [threading.Thread(target=leer, args=(i,)) for i in range(options["lectores"])]
+            hilos += [threading.Thread(target=escribir, args=(i,)) for i in range(options["escritores"])]
+            inicio = time.perf_counter()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            duracion = time.perf_counter() - inicio
+
+        tiempos_lectura = [t for parte in lecturas for t in parte["tiempos"]]
+        tiempos_escritura = [t for parte in escrituras for t in parte["tiempos"]]
+        filas = sum(parte["filas"] for parte in escrituras)
+        return {
+            "duracion_s": round(duracion, 3),
+            "lecturas": {
+                "requests": len(tiempos_lectura),
+                "rps": round(len(tiempos_lectura) / duracion, 1),
+                "errores": sum(parte["errores"] for parte in lecturas),
+                **_percentiles(tiempos_lectura),
+            },
+            "escrituras": {
+                "lotes": len(tiempos_escritura),
+                "filas_por_s": round(filas / duracion, 1),
+                "errores": sum(parte["errores"] for parte in escrituras),
+                **_percentiles(tiempos_escritura),
+            },
+        }
+
+    # ---- salida ----
+
+    def _mejora(self, base, produccion) -> dict:
+        def cociente(a, b):
+            return round(a / b, 2) if a and b else None
+
+        return {
+            "lecturas_rps_x": cociente(produccion["lecturas"]["rps"], base["lecturas"]["rps"]),
+            "lecturas_p95_x": cociente(base["lecturas"]["p95_ms"], produccion["lecturas"]["p95_ms"]),
+            "escrituras_filas_por_s_x": cociente(
+                produccion["escrituras"]["filas_por_s"], base["escrituras"]["filas_por_s"]
+            ),
+        }
+
+    def _imprimir(self, resultado) -> None:
+        self.stdout.write(f"{'perfil':<12}{'lect/s':>10}{'p95 ms':>10}{'err':>6}{'filas/s':>12}{'p95 ms':>10}{'err':>6}")
+        for nombre in ("base", "produccion"):
+            lect, esc = resultado[nombre]["lecturas"], resultado[nombre]["escrituras"]
+            self.stdout.write(
+                f"{nombre:<12}{lect['rps']:>10}{lect['p95_ms'] or 0:>10}{lect['errores']:>6}"
+                f"{esc['filas_por_s']:>12}{esc['p95_ms'] or 0:>10}{esc['errores']:>6}"
+            )
@@ -0,0 +1,119 @@
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.models import IndicadorEconomico, Pais, Posicion, TipoCambio
+from api.sinteticos import Escala, generar
+
+
+ALIAS = "benchmark"
+
+# Índices agregados en 0007_indices_consultas_frecuentes: se quitan para medir el "antes"
+INDICES = {
+    IndicadorEconomico: ["indicador_pais_anio_idx"],
+    TipoCambio: ["fx_par_fecha_tasa_idx", "fx_fecha_id_idx"],
+    Posicion: ["posicion_portafolio_fecha_idx"],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide las consultas frecuentes (EXPLAIN + latencias) sobre una base SQLite temporal "
+        "sin y con los índices de 0007_indices_consultas_frecuentes y guarda el resultado en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fx-filas", type=int, default=2_000_000, help="Filas de TipoCambio a generar")
+        parser.add_argument("--monedas", type=int, default=40)
+        parser.add_argument("--posiciones", type=int, default=200_000)
+        parser.add_argument("--repeticiones", type=int, default=30)
+        parser.add_argument("--salida", default="benchmark_indices.json")
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            self._registrar_alias(Path(tmp) / "benchmark.sqlite3")
+            try:
+                call_command("migrate", database=ALIAS, verbosity=0)
+                self._indices(crear=False)
+                self.stdout.write("Generando datos...")
+                escala = Escala(
+                    paises=options["monedas"],
+                    fx_filas=options["fx_filas"],
+                    posiciones=options["posiciones"],
+                    semilla=options["semilla"],
+                )
+                contexto = generar(escala, using=ALIAS)
+
+                antes = self._medir(contexto, options["repeticiones"])
+                self._indices(crear=True)
+                connections[ALIAS].cursor().execute("ANALYZE")
+                despues = self._medir(contexto, options["repeticiones"])
+            finally:
+                connections[ALIAS].close()
+                del connections.settings[ALIAS]
+
+        resultado = {
+            "parametros": {k: options[k] for k in ("fx_filas", "monedas", "posiciones", "repeticiones", "semilla")},
+            "consultas": {
+                nombre: {"antes": antes[nombre], "despues": despues[nombre]} for nombre in antes
+            },
+        }
+        Path(options["salida"]).write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+        for nombre, medidas in resultado["consultas"].items():
+            self.stdout.write(
+                f"{nombre:<24} p50 {medidas['antes']['p50_ms']:>9.3f} ms -> {medidas['despues']['p50_ms']:>9.3f} ms"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+
+    def _registrar_alias(self, ruta):
+        base = connections.settings["default"]
+        connections.settings[ALIAS] = {**base, "ENGINE": "django.db.backends.sqlite3", "NAME": str(ruta), "TEST": {}}
+
+    def _indices(self, crear: bool):
+        with connections[ALIAS].schema_editor() as editor:
+            for modelo, nombres in INDICES.items():
+                for index in modelo._meta.indexes:
+                    if index.name in nombres:
+                        (editor.add_index if crear else editor.remove_index)(modelo, index)
+
+    def _consultas(self, c):
+        fx = TipoCambio.objects.using(ALIAS)
+        return {
+            "fx_ultima_tasa": lambda: fx.filter(moneda_origen=c["moneda"], moneda_destino="USD").order_by("-fecha")[:1],
+            "fx_serie_un_anio": lambda: fx.filter(
+                moneda_origen=c["moneda"], moneda_destino="USD", fecha__range=(c["desde"], c["hasta"])
+            ).order_by("fecha").values_list("fecha", "tasa"),
+            "fx_listado_global": lambda: fx.order_by("-fecha", "-pk")[:50],
+            "indicadores_pais": lambda: IndicadorEconomico.objects.using(ALIAS).filter(
+                pais=c["pais"]
+            ).order_by("-anio", "-pk"),
+            "paises_activos_region": lambda: Pais.objects.using(ALIAS).filter(activo=True, region="ANDINA"),
+            "posiciones_portafolio": lambda: Posicion.objects.using(ALIAS).filter(
+                portafolio=c["portafolio"]
+            ).order_by("-created_at", "-pk")[:50],
+        }
+
+    def _medir(self, contexto, repeticiones):
+        resultados = {}
+        for nombre, consulta in self._consultas(contexto).items():
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                list(consulta())
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            tiempos.sort()
+            resultados[nombre] = {
+                "plan": consulta().explain(),
+                "p50_ms": round(statistics.median(tiempos), 3),
+                "p95_ms": round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 3),
+                "min_ms": round(tiempos[0], 3),
+            }
+        return resultados
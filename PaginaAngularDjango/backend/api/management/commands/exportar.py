@@ -0,0 +1,59 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exportar import CHUNK_SIZE, FORMATOS, exportar
+from api.filtros import FechaInvalida, filtrar_indicadores, filtrar_tipos_cambio
+from api.models import IndicadorEconomico, Posicion, TipoCambio
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta indicadores, tipos de cambio o las posiciones de un portafolio a CSV o al "
+        "formato columnar (.dpcol) en streaming, con los mismos filtros que la API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("recurso", choices=["indicadores", "tipos-cambio", "posiciones"])
+        parser.add_argument("--formato", choices=list(FORMATOS), default="csv")
+        parser.add_argument("--salida", help="Archivo de salida (por defecto stdout)")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        # indicadores
+        parser.add_argument("--pais")
+        parser.add_argument("--region")
+        parser.add_argument("--tipo")
+        # indicadores (año) y tipos de cambio (YYYY-MM-DD)
+        parser.add_argument("--desde")
+        parser.add_argument("--hasta")
+        # tipos de cambio
+        parser.add_argument("--moneda-origen")
+        parser.add_argument("--moneda-destino")
+        # posiciones
+        parser.add_argument("--portafolio", type=int)
+
+    def handle(self, *args, **options):
+        recurso = options["recurso"]
+        if recurso == "indicadores":
+            qs = filtrar_indicadores(IndicadorEconomico.objects.all(), options).order_by("-anio", "-pk")
+        elif recurso == "tipos-cambio":
+            try:
+                qs = filtrar_tipos_cambio(TipoCambio.objects.all(), options).order_by(
+                    "moneda_origen", "moneda_destino", "fecha"
+                )
+            except FechaInvalida as e:
+                raise CommandError(e.detail["detail"])
+        else:
+            if options["portafolio"] is None:
+                raise CommandError("posiciones requiere --portafolio")
+            qs = Posicion.objects.filter(portafolio_id=options["portafolio"]).order_by("-created_at", "-pk")
+
+        partes = exportar(qs, recurso.replace("-", "_"), options["formato"], options["chunk_size"])
+        if options["salida"]:
+            with open(options["salida"], "wb") as f:
+                for parte in partes:
+                    f.write(parte)
+            self.stderr.write(self.style.SUCCESS(f"Exportado a {options['salida']}"))
+        else:
+            for parte in partes:
+                sys.stdout.buffer.write(parte)
+            sys.stdout.buffer.flush()
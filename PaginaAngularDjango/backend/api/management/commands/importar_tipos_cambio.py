@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importers import CHUNK_SIZE, ImportacionError, formato_desde_nombre, importar_tipos_cambio
+
+
+class Command(BaseCommand):
+    help = "Importa tasas de cambio diarias desde un CSV/JSON y recalcula variacion_porcentual."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta del archivo CSV, JSON o JSON Lines")
+        parser.add_argument("--formato", choices=["csv", "json"], help="Por defecto se deduce de la extensión")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument("--fuente", default="MANUAL", help="Fuente por defecto si la fila no trae una")
+
+    def handle(self, *args, **options):
+        formato = options["formato"] or formato_desde_nombre(options["archivo"])
+        try:
+            with open(options["archivo"], "rb") as f:
+                reporte = importar_tipos_cambio(
+                    f, formato, fuente=options["fuente"], chunk_size=options["chunk_size"]
+                )
+        except (OSError, ImportacionError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(json.dumps(reporte.as_dict(), indent=2, ensure_ascii=False))
+        self.stdout.write(self.style.SUCCESS(
+            f"{reporte.insertadas} insertadas, {reporte.actualizadas} actualizadas, "
+            f"{reporte.rechazadas} rechazadas, {reporte.variaciones_recalculadas} variaciones "
+            f"({reporte.filas_por_segundo} filas/s)"
+        ))
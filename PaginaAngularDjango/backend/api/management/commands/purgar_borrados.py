@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api import deltas, eventos
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra las lápidas del feed de cambios más viejas que DATAPULSE_DELTAS['RETENCION_DIAS'] y los "
+        "eventos SSE más viejos que DATAPULSE_EVENTOS['RETENCION_H'] (cron diario)."
+    )
+
+    def handle(self, *args, **options):
+        borradas = deltas.purgar()
+        self.stdout.write(self.style.SUCCESS(f"{borradas} lápidas purgadas"))
+        borrados = eventos.purgar()
+        self.stdout.write(self.style.SUCCESS(f"{borrados} eventos purgados"))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import agregados
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la tabla de agregados regionales desde cero (normalmente se mantiene sola)."
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        filas = agregados.recalcular()
+        self.stdout.write(self.style.SUCCESS(
+            f"{filas} agregados recalculados en {time.perf_counter() - inicio:.2f} s"
+        ))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import historico
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el valor histórico diario de los portafolios (normalmente se mantiene "
+        "solo con cada tasa o posición nueva)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("portafolios", nargs="*", type=int, help="IDs (todos si no se indican)")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        filas = historico.recalcular(options["portafolios"] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f"{filas} valores recalculados en {time.perf_counter() - inicio:.2f} s"
+        ))
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _correr(hilos: int, una_vez: bool) -> int:
+    """
+    ``hilos`` workers en este proceso. SIGINT / SIGTERM terminan el job en curso y salen.
+    """
+    # Import tardío: los procesos "spawn" importan este módulo antes de django.setup()
+    from api import jobs
+
+    detener = threading.Event()
+    previos = {sig: signal.signal(sig, lambda *_: detener.set()) for sig in (signal.SIGINT, signal.SIGTERM)}
+
+    prefijo = f"{socket.gethostname()}:{os.getpid()}"
+    ejecutados = [0] * hilos
+
+    def trabajar(i):
+        ejecutados[i] = jobs.trabajar(f"{prefijo}:{i}", detener=detener, una_vez=una_vez)
+
+    workers = [threading.Thread(target=trabajar, args=(i,), name=f"worker-{i}") for i in range(hilos)]
+    for w in workers:
+        w.start()
+    try:
+        for w in workers:
+            while w.is_alive():
+                w.join(timeout=1)  # join sin timeout no deja atender señales
+    finally:
+        for sig, previo in previos.items():
+            signal.signal(sig, previo)
+    return sum(ejecutados)
+
+
+def _proceso(hilos: int, una_vez: bool) -> None:
+    # Con "spawn" el hijo arranca sin Django configurado
+    import django
+    django.setup()
+    _correr(hilos, una_vez)
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta los jobs encolados en la BD (sync de países, cargas masivas) con un pool de "
+        "hilos y, opcionalmente, varios procesos. Varios workers pueden correr a la vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=2, help="Workers (hilos) por proceso")
+        parser.add_argument(
+            "--procesos", type=int, default=1,
+            help="Procesos; más de 1 sirve para jobs que usan CPU (parseo de cargas grandes)",
+        )
+        parser.add_argument("--una-vez", action="store_true", help="Vaciar la cola y salir (cron / CI)")
+
+    def handle(self, *args, **options):
+        hilos, procesos, una_vez = options["hilos"], options["procesos"], options["una_vez"]
+        if hilos < 1 or procesos < 1:
+            raise CommandError("--hilos y --procesos deben ser >= 1")
+
+        if procesos == 1:
+            ejecutados = _correr(hilos, una_vez)
+            self.stdout.write(self.style.SUCCESS(f"{ejecutados} jobs ejecutados"))
+            return
+
+        # Procesos nuevos (no fork): no heredan conexiones abiertas a la BD
+        contexto = multiprocessing.get_context("spawn")
+        hijos = [contexto.Process(target=_proceso, args=(hilos, una_vez)) for _ in range(procesos)]
+        for hijo in hijos:
+            hijo.start()
+
+        def reenviar(*_):
+            for hijo in hijos:
+                if hijo.is_alive():
+                    hijo.terminate()  # SIGTERM: cada hijo termina su job y sale
+
+        signal.signal(signal.SIGTERM, reenviar)
+        signal.signal(signal.SIGINT, reenviar)
+        for hijo in hijos:
+            hijo.join()
+        self.stdout.write(self.style.SUCCESS(f"{procesos} procesos x {hilos} hilos terminados"))
@@ -0,0 +1,216 @@
+"""
+Métricas de requests en memoria del proceso (las alimenta ``api.middleware``).
+
+Por cada (endpoint, método) se guardan contadores acumulados y una ventana
+deslizante con las últimas ``WINDOW`` muestras de duración. Los percentiles se
+calculan recién al exportar, así que registrar una muestra es O(1).
+"""
+import contextvars
+import functools
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "SAMPLE_RATE": 1.0,     # fracción de requests instrumentadas
+    "WINDOW": 1024,         # muestras por endpoint para los percentiles
+    "SERVER_TIMING": True,  # header Server-Timing en las respuestas muestreadas
+}
+
+CUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+# nombre de la serie -> (descripción, atributo de la muestra)
+RESUMENES = {
+    "request_duration_ms": ("Duración total del request (ms).", "total_ms"),
+    "db_duration_ms": ("Tiempo en la base de datos por request (ms).", "db_ms"),
+    "render_duration_ms": ("Tiempo de serialización y render de la respuesta, sin queries (ms).", "render_ms"),
+}
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "DATAPULSE_METRICS", {})}
+
+
+def muestrear(config: dict) -> bool:
+    tasa = config["SAMPLE_RATE"]
+    return tasa >= 1 or random.random() < tasa
+
+
+class Medicion:
+    """
+    Lo que se mide de un request muestreado. Es el ``execute_wrapper`` de las conexiones
+    (número y duración de las queries) y acumula el tiempo de serialización y render.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_s = 0.0
+        self.render_s = 0.0
+        self.serializando = False
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_s += time.perf_counter() - inicio
+
+
+# Medición del request en curso (la fija api.middleware); llega a las vistas async y a los hilos de sync_to_async
+medicion_actual = contextvars.ContextVar("datapulse_medicion", default=None)
+
+
+@contextmanager
+def medir_serializacion():
+    """
+    Suma el bloque al render del request en curso, sin las queries que dispare (un
+    queryset sin evaluar se lee recién al serializar). Los anidados no cuentan dos veces.
+    """
+    medicion = medicion_actual.get()
+    if medicion is None or medicion.serializando:
+        yield
+        return
+    medicion.serializando = True
+    inicio, db_s = time.perf_counter(), medicion.db_s
+    try:
+        yield
+    finally:
+        medicion.render_s += time.perf_counter() - inicio - (medicion.db_s - db_s)
+        medicion.serializando = False
+
+
+@functools.cache
+def _clase_medida(cls):
+    def data(self):
+        with medir_serializacion():
+            return super(medida, self).data
+
+    medida = type(cls.__name__, (cls,), {
+        "data": property(data), "__module__": cls.__module__, "__qualname__": cls.__qualname__,
+    })
+    return medida
+
+
+def medido(serializer):
+    """
+    El mismo serializer, con ``.data`` (también con many=True) contado como render del
+    request en curso. Cambia la clase de la instancia por una subclase que solo mide.
+    """
+    serializer.__class__ = _clase_medida(type(serializer))
+    return serializer
+
+
+class SerializacionMedidaMixin:
+    """
+    Para vistas de DRF: los serializers de ``get_serializer()`` se miden con ``medido``.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        return medido(super().get_serializer(*args, **kwargs))
+
+
+class _Endpoint:
+    __slots__ = ("requests", "errores", "queries", "bytes", "sumas", "ventanas")
+
+    def __init__(self, ventana: int):
+        self.requests = 0
+        self.errores = 0
+        self.queries = 0
+        self.bytes = 0
+        self.sumas = dict.fromkeys(RESUMENES, 0.0)
+        self.ventanas = {nombre: deque(maxlen=ventana) for nombre in RESUMENES}
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._endpoints = {}
+
+    def registrar(self, endpoint: str, metodo: str, status: int, *, total_ms: float, db_ms: float,
+                  queries: int, render_ms: float, bytes_respuesta: int) -> None:
+        valores = {"total_ms": total_ms, "db_ms": db_ms, "render_ms": render_ms}
+        with self._lock:
+            datos = self._endpoints.get((endpoint, metodo))
+            if datos is None:
+                datos = self._endpoints[(endpoint, metodo)] = _Endpoint(get_config()["WINDOW"])
+            datos.requests += 1
+            datos.errores += status >= 500
+            datos.queries += queries
+            datos.bytes += bytes_respuesta
+            for nombre, (_, atributo) in RESUMENES.items():
+                datos.sumas[nombre] += valores[atributo]
+                datos.ventanas[nombre].append(valores[atributo])
+
+    def resumen(self) -> dict:
+        """
+        {(endpoint, metodo): {"requests": n, ..., "request_duration_ms": {"p50": ...}}}
+        """
+        with self._lock:
+            copia = {
+                clave: (d.requests, d.errores, d.queries, d.bytes, dict(d.sumas),
+                        {n: np.fromiter(v, dtype=float) for n, v in d.ventanas.items()})
+                for clave, d in self._endpoints.items()
+            }
+        resultado = {}
+        for clave, (requests, errores, queries, bytes_, sumas, ventanas) in copia.items():
+            fila = {"requests": requests, "errores": errores, "queries": queries, "bytes": bytes_}
+            for nombre, valores in ventanas.items():
+                percentiles = np.quantile(valores, CUANTILES) if len(valores) else [0.0] * len(CUANTILES)
+                fila[nombre] = {
+                    "suma": sumas[nombre],
+                    **{f"p{int(q * 100)}": float(p) for q, p in zip(CUANTILES, percentiles)},
+                }
+            resultado[clave] = fila
+        return resultado
+
+    def prometheus(self) -> str:
+        """
+        Formato de exposición de texto de Prometheus (0.0.4).
+        """
+        resumen = self.resumen()
+        lineas = [
+            "# HELP datapulse_metrics_sample_rate Fracción de requests instrumentadas.",
+            "# TYPE datapulse_metrics_sample_rate gauge",
+            f"datapulse_metrics_sample_rate {get_config()['SAMPLE_RATE']}",
+        ]
+        contadores = {
+            "requests_total": ("Requests instrumentadas.", "requests"),
+            "errors_total": ("Requests instrumentadas con status 5xx.", "errores"),
+            "db_queries_total": ("Queries SQL ejecutadas.", "queries"),
+            "response_bytes_total": ("Bytes de respuesta (sin contar streaming).", "bytes"),
+        }
+        for nombre, (ayuda, campo) in contadores.items():
+            lineas += [f"# HELP datapulse_{nombre} {ayuda}", f"# TYPE datapulse_{nombre} counter"]
+            for (endpoint, metodo), fila in resumen.items():
+                lineas.append(f"datapulse_{nombre}{{{_etiquetas(endpoint, metodo)}}} {fila[campo]}")
+
+        for nombre, (ayuda, _) in RESUMENES.items():
+            lineas += [f"# HELP datapulse_{nombre} {ayuda}", f"# TYPE datapulse_{nombre} summary"]
+            for (endpoint, metodo), fila in resumen.items():
+                etiquetas = _etiquetas(endpoint, metodo)
+                for q in CUANTILES:
+                    valor = fila[nombre][f"p{int(q * 100)}"]
+                    lineas.append(f'datapulse_{nombre}{{{etiquetas},quantile="{q}"}} {valor:.3f}')
+                lineas.append(f"datapulse_{nombre}_sum{{{etiquetas}}} {fila[nombre]['suma']:.3f}")
+                lineas.append(f"datapulse_{nombre}_count{{{etiquetas}}} {fila['requests']}")
+        return "\n".join(lineas) + "\n"
+
+
+def _etiquetas(endpoint: str, metodo: str) -> str:
+    endpoint = endpoint.replace("\\", "\\\\").replace('"', '\\"')
+    return f'endpoint="{endpoint}",method="{metodo}"'
+
+
+metricas = Metricas()
@@ -0,0 +1,145 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+
+from .db import METODOS_LECTURA, lecturas_en_replica
+from .metricas import Medicion, get_config, medicion_actual, metricas, muestrear
+
+
+def nombre_endpoint(request) -> str:
+    """
+    ``PaisViewSet.list`` para viewsets de DRF, la clase para APIViews y el nombre de la
+    ruta para el resto.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "sin_ruta"
+    cls = getattr(match.func, "cls", None)
+    if cls is None:
+        return match.view_name or match._func_path
+    acciones = getattr(match.func, "actions", None)
+    if acciones:
+        return f"{cls.__name__}.{acciones.get(request.method.lower(), request.method.lower())}"
+    return cls.__name__
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide tiempo total, queries (cantidad y tiempo), serialización + render y tamaño de la
+    respuesta de una fracción ``SAMPLE_RATE`` de los requests, los acumula en
+    ``api.metricas`` y agrega ``Server-Timing``. Los requests no muestreados no pagan nada más que el random().
+    Funciona en modo sync y async (no fuerza cambios de hilo en ASGI).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_config()
+        if not config["ENABLED"] or not muestrear(config):
+            return self.get_response(request)
+
+        medicion = request._datapulse_medicion = Medicion()
+        token = medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with self._contar_queries(medicion):
+                response = self.get_response(request)
+        finally:
+            medicion_actual.reset(token)
+        return self._registrar(request, response, medicion, inicio, config)
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config["ENABLED"] or not muestrear(config):
+            return await self.get_response(request)
+
+        medicion = request._datapulse_medicion = Medicion()
+        token = medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with self._contar_queries(medicion):
+                response = await self.get_response(request)
+        finally:
+            medicion_actual.reset(token)
+        return self._registrar(request, response, medicion, inicio, config)
+
+    def _contar_queries(self, medicion) -> ExitStack:
+        stack = ExitStack()
+        for conexion in connections.all():
+            stack.enter_context(conexion.execute_wrapper(medicion))
+        return stack
+
+    def _registrar(self, request, response, medicion, inicio, config):
+        total_ms = (time.perf_counter() - inicio) * 1000
+        db_ms = medicion.db_s * 1000
+        render_ms = medicion.render_s * 1000
+        metricas.registrar(
+            nombre_endpoint(request),
+            request.method,
+            response.status_code,
+            total_ms=total_ms,
+            db_ms=db_ms,
+            queries=medicion.queries,
+            render_ms=render_ms,
+            bytes_respuesta=0 if response.streaming else len(response.content),
+        )
+        if config["SERVER_TIMING"]:
+            response["Server-Timing"] = ", ".join([
+                f'db;dur={db_ms:.2f};desc="{medicion.queries} queries"',
+                f"render;dur={render_ms:.2f}",
+                f"app;dur={max(total_ms - db_ms - render_ms, 0):.2f}",
+                f"total;dur={total_ms:.2f}",
+            ])
+        return response
+
+    def process_template_response(self, request, response):
+        # Las Response de DRF se renderizan después de este hook: se suma el render a la
+        # serialización, que miden las vistas (api.metricas.SerializacionMedidaMixin / medido)
+        medicion = getattr(request, "_datapulse_medicion", None)
+        if medicion is not None:
+            inicio = time.perf_counter()
+
+            def fin_render(r):
+                medicion.render_s += time.perf_counter() - inicio
+
+            response.add_post_render_callback(fin_render)
+        return response
+
+
+class LecturasReplicaMiddleware:
+    """
+    Marca los requests GET / HEAD / OPTIONS para que ``api.db.RouterReplica`` mande sus
+    lecturas a la réplica. La marca es una ContextVar: llega a las vistas async y a los
+    ``sync_to_async`` que lanzan. El cuerpo de las respuestas streaming (exportaciones) se
+    genera después, ya fuera de la marca, y lee del primario.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.method not in METODOS_LECTURA:
+            return self.get_response(request)
+        with lecturas_en_replica():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.method not in METODOS_LECTURA:
+            return await self.get_response(request)
+        with lecturas_en_replica():
+            return await self.get_response(request)
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_portafolio_owner_posicion_defaults'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncEstado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.CharField(max_length=500, unique=True)),
+                ('etag', models.CharField(blank=True, default='', max_length=200)),
+                ('last_modified', models.CharField(blank=True, default='', max_length=100)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='pais',
+            name='hash_contenido',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_pais_hash_contenido_syncestado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pais',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='portafolio',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='posicion',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='tipocambio',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
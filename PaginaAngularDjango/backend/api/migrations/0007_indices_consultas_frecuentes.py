@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-18 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_fecha_actualizacion_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='indicadoreconomico',
+            index=models.Index(fields=['pais', '-anio', '-id'], name='indicador_pais_anio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='posicion',
+            index=models.Index(fields=['portafolio', '-created_at', '-id'], name='posicion_portafolio_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tipocambio',
+            index=models.Index(fields=['moneda_origen', 'moneda_destino', '-fecha', 'tasa'], name='fx_par_fecha_tasa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tipocambio',
+            index=models.Index(fields=['-fecha', '-id'], name='fx_fecha_id_idx'),
+        ),
+    ]
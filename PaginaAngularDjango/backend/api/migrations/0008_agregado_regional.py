@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-18 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgregadoRegional',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=20)),
+                ('tipo', models.CharField(choices=[('PIB', 'PIB'), ('INFLACION', 'INFLACION'), ('DESEMPLEO', 'DESEMPLEO'), ('BALANZA_COMERCIAL', 'BALANZA_COMERCIAL'), ('DEUDA_PIB', 'DEUDA_PIB'), ('PIB_PERCAPITA', 'PIB_PERCAPITA')], max_length=30)),
+                ('anio', models.PositiveIntegerField()),
+                ('paises', models.PositiveIntegerField()),
+                ('promedio', models.FloatField()),
+                ('promedio_ponderado', models.FloatField(null=True)),
+                ('mediana', models.FloatField()),
+                ('minimo', models.FloatField()),
+                ('maximo', models.FloatField()),
+                ('ranking', models.JSONField(default=list)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-anio', 'region'],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'anio', 'region'), name='uniq_agregado_tipo_anio_region')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-18 02:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_agregado_regional'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('SYNC_PAISES', 'SYNC_PAISES'), ('IMPORTAR_INDICADORES', 'IMPORTAR_INDICADORES'), ('IMPORTAR_TIPOS_CAMBIO', 'IMPORTAR_TIPOS_CAMBIO')], max_length=30)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'PENDIENTE'), ('EN_CURSO', 'EN_CURSO'), ('COMPLETADO', 'COMPLETADO'), ('FALLIDO', 'FALLIDO')], default='PENDIENTE', max_length=20)),
+                ('parametros', models.JSONField(default=dict)),
+                ('archivo', models.BinaryField(null=True)),
+                ('clave', models.CharField(max_length=64)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('max_intentos', models.PositiveIntegerField(default=3)),
+                ('disponible_desde', models.DateTimeField()),
+                ('worker', models.CharField(blank=True, default='', max_length=100)),
+                ('latido', models.DateTimeField(blank=True, null=True)),
+                ('procesados', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(blank=True, null=True)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('errores', models.JSONField(default=list)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('iniciado', models.DateTimeField(blank=True, null=True)),
+                ('terminado', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-creado'],
+                'indexes': [models.Index(fields=['estado', 'disponible_desde'], name='job_estado_disponible_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('estado__in', ['PENDIENTE', 'EN_CURSO'])), fields=('clave',), name='uniq_job_activo_clave')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 03:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValorPortafolio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('valor', models.FloatField()),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('portafolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historico', to='api.portafolio')),
+            ],
+            options={
+                'ordering': ['fecha'],
+                'constraints': [models.UniqueConstraint(fields=('portafolio', 'fecha'), name='uniq_valor_portafolio_fecha')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-18 03:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_valorportafolio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Borrado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recurso', models.CharField(max_length=20)),
+                ('clave', models.CharField(max_length=64)),
+                ('borrado', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='indicadoreconomico',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='indicador_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pais',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='pais_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='portafolio',
+            index=models.Index(fields=['updated_at', 'id'], name='portafolio_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='posicion',
+            index=models.Index(fields=['updated_at', 'id'], name='posicion_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tipocambio',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='fx_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrado',
+            index=models.Index(fields=['recurso', 'borrado', 'id'], name='borrado_recurso_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:12
+
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+
+def mover_archivos(apps, schema_editor):
+    """
+    Los jobs activos con el archivo en la BD lo pasan al storage.
+    """
+    Job = apps.get_model("api", "Job")
+    campo = Job._meta.get_field("archivo")
+    for job in Job.objects.filter(estado__in=("PENDIENTE", "EN_CURSO"), archivo_datos__isnull=False).iterator():
+        datos = bytes(job.archivo_datos)
+        sha256 = hashlib.sha256(datos).hexdigest()
+        job.archivo = campo.storage.save(campo.generate_filename(None, sha256[:32]), ContentFile(datos))
+        job.archivo_sha256 = sha256
+        job.save(update_fields=["archivo", "archivo_sha256"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_borrado_indices_actualizacion'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='job',
+            old_name='archivo',
+            new_name='archivo_datos',
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='archivo',
+            field=models.FileField(blank=True, editable=False, max_length=255, upload_to='tmp/jobs/'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='archivo_sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.RunPython(mover_archivos, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='job',
+            name='archivo_datos',
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_job_archivo_en_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('canal', models.CharField(max_length=20)),
+                ('cuerpo', models.TextField()),
+                ('creado', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -56,13 +56,34 @@ class Pais(models.Model):
 
     activo = models.BooleanField(default=True)
 
+    # sha256 de los campos sincronizados: permite saltar filas sin cambios en el sync
+    hash_contenido = models.CharField(max_length=64, blank=True, default="")
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
     class Meta:
         ordering = ["nombre"]
+        indexes = [
+            # Feed de cambios (api.deltas): WHERE (fecha_actualizacion, id) > marca
+            models.Index(fields=["fecha_actualizacion", "id"], name="pais_actualizacion_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.nombre} ({self.codigo_iso})"
 
 
+class SyncEstado(models.Model):
+    """
+    Validadores HTTP (ETag / Last-Modified) de la última descarga de cada URL sincronizada.
+    """
+    url = models.CharField(max_length=500, unique=True)
+    etag = models.CharField(max_length=200, blank=True, default="")
+    last_modified = models.CharField(max_length=100, blank=True, default="")
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return self.url
+
+
 class IndicadorEconomico(models.Model):
     class Tipo(models.TextChoices):
         PIB = "PIB", "PIB"
@@ -97,11 +118,51 @@ class IndicadorEconomico(models.Model):
                 name="uniq_indicador_pais_tipo_anio",
             ),
         ]
+        indexes = [
+            # indicadores de un país ordenados por año (el unique empieza por pais, tipo)
+            models.Index(fields=["pais", "-anio", "-id"], name="indicador_pais_anio_idx"),
+            models.Index(fields=["fecha_actualizacion", "id"], name="indicador_actualizacion_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.pais.codigo_iso} {self.tipo} {self.anio}"
 
 
+class AgregadoRegional(models.Model):
+    """
+    Estadísticas de un indicador por región y año, materializadas desde IndicadorEconomico
+    (solo países activos). Las mantiene ``api.agregados``; no se editan a mano.
+    """
+    LATAM = "LATAM"
+
+    region = models.CharField(max_length=20)  # Pais.Region o LATAM (todas las regiones)
+    tipo = models.CharField(max_length=30, choices=IndicadorEconomico.Tipo.choices)
+    anio = models.PositiveIntegerField()
+
+    paises = models.PositiveIntegerField()
+    promedio = models.FloatField()
+    promedio_ponderado = models.FloatField(null=True)  # ponderado por población
+    mediana = models.FloatField()
+    minimo = models.FloatField()
+    maximo = models.FloatField()
+    # [{"codigo_iso": "CO", "valor": 1.0, "posicion": 1}, ...] de mayor a menor valor
+    ranking = models.JSONField(default=list)
+
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-anio", "region"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tipo", "anio", "region"],
+                name="uniq_agregado_tipo_anio_region",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.region} {self.tipo} {self.anio}"
+
+
 class TipoCambio(models.Model):
     # Guardamos tasa de moneda local contra USD por defecto
     moneda_origen = models.CharField(max_length=3)  # Ej: "COP"
@@ -111,6 +172,7 @@ class TipoCambio(models.Model):
 
     variacion_porcentual = models.FloatField(null=True, blank=True)
     fuente = models.CharField(max_length=50, blank=True, default="MANUAL")
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-fecha"]
@@ -120,6 +182,16 @@ class TipoCambio(models.Model):
                 name="uniq_fx_pair_fecha",
             ),
         ]
+        indexes = [
+            # Cubre "última tasa del par" y las series (fecha, tasa) sin leer la tabla
+            models.Index(
+                fields=["moneda_origen", "moneda_destino", "-fecha", "tasa"],
+                name="fx_par_fecha_tasa_idx",
+            ),
+            # Listado keyset global: ORDER BY -fecha, -id
+            models.Index(fields=["-fecha", "-id"], name="fx_fecha_id_idx"),
+            models.Index(fields=["fecha_actualizacion", "id"], name="fx_actualizacion_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.moneda_origen}/{self.moneda_destino} {self.fecha}"
@@ -138,9 +210,13 @@ class Portafolio(models.Model):
         related_name="portafolios",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="portafolio_actualizacion_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.nombre
@@ -170,11 +246,130 @@ class Posicion(models.Model):
     peso_porcentual = models.FloatField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["portafolio", "-created_at", "-id"], name="posicion_portafolio_fecha_idx"),
+            models.Index(fields=["updated_at", "id"], name="posicion_actualizacion_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.portafolio.nombre} - {self.activo}"
     
-    
\ No newline at end of file
+    
+
+class ValorPortafolio(models.Model):
+    """
+    Valor diario de un portafolio en USD (posiciones actuales a las tasas vigentes ese
+    día). Lo mantiene ``api.historico``: no se escribe a mano.
+    """
+    portafolio = models.ForeignKey(Portafolio, on_delete=models.CASCADE, related_name="historico")
+    fecha = models.DateField()
+    valor = models.FloatField()
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["fecha"]
+        constraints = [
+            models.UniqueConstraint(fields=["portafolio", "fecha"], name="uniq_valor_portafolio_fecha"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.portafolio_id} {self.fecha}"
+
+
+class Borrado(models.Model):
+    """
+    Lápida de una fila borrada: el feed de cambios (``api.deltas``) la informa a los
+    clientes que guardan una copia local. Se purgan pasada la retención.
+    """
+    recurso = models.CharField(max_length=20)  # nombre en api.deltas.RECURSOS
+    clave = models.CharField(max_length=64)
+    borrado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["recurso", "borrado", "id"], name="borrado_recurso_fecha_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.recurso} {self.clave}"
+
+
+class EventoCambio(models.Model):
+    """
+    Delta publicado para el stream SSE (``api.eventos``). La tabla es la secuencia que
+    comparten todos los procesos: cada servidor web la sigue y reparte a sus clientes lo
+    que escriben él, los demás workers y ``manage.py worker``. Se purgan pasada la retención.
+    """
+    canal = models.CharField(max_length=20)
+    cuerpo = models.TextField()  # JSON ya serializado, tal cual va en el "data:" del evento
+    creado = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.pk} {self.canal}"
+
+
+class Job(models.Model):
+    """
+    Tarea en segundo plano (sync de países, cargas masivas). La cola es esta tabla:
+    la toma ``manage.py worker`` (ver ``api.jobs``).
+    """
+    class Tipo(models.TextChoices):
+        SYNC_PAISES = "SYNC_PAISES", "SYNC_PAISES"
+        IMPORTAR_INDICADORES = "IMPORTAR_INDICADORES", "IMPORTAR_INDICADORES"
+        IMPORTAR_TIPOS_CAMBIO = "IMPORTAR_TIPOS_CAMBIO", "IMPORTAR_TIPOS_CAMBIO"
+
+    class Estado(models.TextChoices):
+        PENDIENTE = "PENDIENTE", "PENDIENTE"
+        EN_CURSO = "EN_CURSO", "EN_CURSO"
+        COMPLETADO = "COMPLETADO", "COMPLETADO"
+        FALLIDO = "FALLIDO", "FALLIDO"
+
+    ACTIVOS = (Estado.PENDIENTE, Estado.EN_CURSO)
+
+    tipo = models.CharField(max_length=30, choices=Tipo.choices)
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE)
+    parametros = models.JSONField(default=dict)
+    # Carga subida, en MEDIA_ROOT/tmp/jobs/ (nunca entera en memoria ni en la BD); se borra al terminar
+    archivo = models.FileField(upload_to="tmp/jobs/", max_length=255, blank=True, editable=False)
+    archivo_sha256 = models.CharField(max_length=64, blank=True, default="")
+    # sha256 de tipo + parámetros (+ sha256 del archivo): un solo job activo por clave
+    clave = models.CharField(max_length=64)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs"
+    )
+
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=3)
+    disponible_desde = models.DateTimeField()  # backoff entre reintentos
+    worker = models.CharField(max_length=100, blank=True, default="")
+    latido = models.DateTimeField(null=True, blank=True)  # último progreso del worker
+
+    procesados = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    resultado = models.JSONField(null=True, blank=True)
+    errores = models.JSONField(default=list)
+
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-creado"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["clave"],
+                condition=models.Q(estado__in=["PENDIENTE", "EN_CURSO"]),
+                name="uniq_job_activo_clave",
+            ),
+        ]
+        indexes = [
+            # El worker busca PENDIENTE por disponible_desde
+            models.Index(fields=["estado", "disponible_desde"], name="job_estado_disponible_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.tipo} #{self.pk} ({self.estado})"
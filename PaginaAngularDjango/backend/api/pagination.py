@@ -0,0 +1,159 @@
+"""
+Paginación keyset (por cursor) para listados grandes.
+
+A diferencia de PageNumberPagination no hace COUNT(*) ni OFFSET: el cursor
+guarda los valores del orden (más la pk como desempate) del último elemento
+visto y la página siguiente se obtiene con un WHERE sobre esos valores, así que
+cualquier página cuesta lo mismo que la primera.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    La vista define ``keyset_ordering`` (p. ej. ``("-fecha",)``); la pk se agrega
+    siempre al final para que el orden sea total.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = api_settings.PAGE_SIZE or 10
+    max_page_size = 500
+    ordering = ("-pk",)
+
+    # ---- cursor ----
+
+    def _codificar(self, obj, reverso: bool) -> str:
+        valores = []
+        for campo in self.campos:
+            valor = getattr(obj, campo)
+            valores.append(valor.isoformat() if isinstance(valor, (date, datetime)) else valor)
+        crudo = json.dumps({"v": valores, "r": reverso}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(crudo.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def _decodificar(self, cursor: str):
+        try:
+            crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            datos = json.loads(crudo)
+            valores = datos["v"]
+            if len(valores) != len(self.campos):
+                raise ValueError
+            convertidos = [self._convertir(campo, valor) for campo, valor in zip(self.campos, valores)]
+            return convertidos, bool(datos.get("r"))
+        except (ValueError, TypeError, KeyError, DjangoValidationError):
+            raise NotFound("Cursor inválido.")
+
+    def _convertir(self, campo, valor):
+        field = self.modelo._meta.pk if campo == "pk" else self.modelo._meta.get_field(campo)
+        if field.get_internal_type() == "DateField":
+            convertido = parse_date(valor)
+        elif field.get_internal_type() == "DateTimeField":
+            convertido = parse_datetime(valor)
+        else:
+            convertido = field.to_python(valor)
+        # parse_date/parse_datetime devuelven None si el formato no coincide
+        if convertido is None:
+            raise ValueError
+        return convertido
+
+    # ---- consulta ----
+
+    def _filtro(self, valores, reverso: bool) -> Q:
+        """
+        (a, b, pk) > (va, vb, vpk) en el orden pedido, expandido a ORs para cualquier motor.
+        """
+        filtro = Q()
+        for i, campo in enumerate(self.campos):
+            descendente = self.direcciones[i] != reverso
+            condicion = Q(**{f"{campo}__{'lt' if descendente else 'gt'}": valores[i]})
+            for previo, valor in zip(self.campos[:i], valores[:i]):
+                condicion &= Q(**{previo: valor})
+            filtro |= condicion
+        return filtro
+
+    def get_page_size(self, request):
+        try:
+            tamano = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(tamano, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.modelo = queryset.model
+        orden = list(getattr(view, "keyset_ordering", self.ordering))
+        if orden[-1].lstrip("-") not in ("pk", "id"):
+            orden.append("-pk" if orden[-1].startswith("-") else "pk")
+        self.campos = [o.lstrip("-") for o in orden]
+        self.direcciones = [o.startswith("-") for o in orden]
+        self.page_size_actual = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        reverso = False
+        if cursor:
+            valores, reverso = self._decodificar(cursor)
+            queryset = queryset.filter(self._filtro(valores, reverso))
+
+        if reverso:
+            orden = [o[1:] if o.startswith("-") else f"-{o}" for o in orden]
+        filas = list(queryset.order_by(*orden)[: self.page_size_actual + 1])
+        hay_mas = len(filas) > self.page_size_actual
+        filas = filas[: self.page_size_actual]
+        if reverso:
+            filas.reverse()
+
+        self.tiene_siguiente = hay_mas if not reverso else True
+        self.tiene_anterior = bool(cursor) if not reverso else hay_mas
+        self.primero = filas[0] if filas else None
+        self.ultimo = filas[-1] if filas else None
+        return filas
+
+    # ---- respuesta ----
+
+    def _url(self, cursor):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.tiene_siguiente or self.ultimo is None:
+            return None
+        return self._url(self._codificar(self.ultimo, reverso=False))
+
+    def get_previous_link(self):
+        if not self.tiene_anterior:
+            return None
+        if self.primero is None:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._url(self._codificar(self.primero, reverso=True))
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "page_size": self.page_size_actual,
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "page_size": {"type": "integer"},
+                "results": schema,
+            },
+        }
@@ -1,10 +1,39 @@
 from rest_framework.permissions import BasePermission
 
 
-def _has_group(user, group_name: str) -> bool:
+# Atributo donde se guardan los grupos ya resueltos sobre la instancia del usuario. Con
+# JWTCacheAuthentication la instancia (con sus roles) se reutiliza hasta DATAPULSE_AUTH["TTL_S"]
+# segundos; las señales de api/autenticacion.py la descartan al cambiar usuario o grupos.
+_ROLES_ATTR = "_datapulse_roles"
+
+
+def get_user_roles(user) -> frozenset:
+    """
+    Devuelve los nombres de grupo del usuario con una sola query por request.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, _ROLES_ATTR, None)
+    if roles is None:
+        roles = frozenset(user.groups.values_list("name", flat=True))
+        setattr(user, _ROLES_ATTR, roles)
+    return roles
+
+
+def invalidate_user_roles(user) -> None:
+    """
+    Descarta los grupos cacheados en la instancia (p. ej. tras cambiar su membresía).
+    """
+    if user is not None and hasattr(user, _ROLES_ATTR):
+        delattr(user, _ROLES_ATTR)
+
+
+def _has_any_group(user, *group_names: str) -> bool:
     if not user or not user.is_authenticated:
         return False
-    return user.groups.filter(name=group_name).exists()
+    if user.is_superuser:
+        return True
+    return not get_user_roles(user).isdisjoint(group_names)
 
 
 class IsAdminRole(BasePermission):
@@ -12,8 +41,7 @@ class IsAdminRole(BasePermission):
     Permite solo usuarios en el grupo ADMIN o superuser.
     """
     def has_permission(self, request, view):
-        user = request.user
-        return bool(user and user.is_authenticated and (user.is_superuser or _has_group(user, "ADMIN")))
+        return _has_any_group(request.user, "ADMIN")
 
 
 class IsAnalystOrAdmin(BasePermission):
@@ -21,12 +49,7 @@ class IsAnalystOrAdmin(BasePermission):
     Permite ANALISTA o ADMIN (o superuser).
     """
     def has_permission(self, request, view):
-        user = request.user
-        return bool(
-            user and user.is_authenticated and (
-                user.is_superuser or _has_group(user, "ADMIN") or _has_group(user, "ANALISTA")
-            )
-        )
+        return _has_any_group(request.user, "ADMIN", "ANALISTA")
 
 
 class IsViewerOrAbove(BasePermission):
@@ -34,12 +57,4 @@ class IsViewerOrAbove(BasePermission):
     Permite VIEWER, ANALISTA o ADMIN (o superuser).
     """
     def has_permission(self, request, view):
-        user = request.user
-        return bool(
-            user and user.is_authenticated and (
-                user.is_superuser
-                or _has_group(user, "ADMIN")
-                or _has_group(user, "ANALISTA")
-                or _has_group(user, "VIEWER")
-            )
-        )
\ No newline at end of file
+        return _has_any_group(request.user, "ADMIN", "ANALISTA", "VIEWER")
@@ -0,0 +1,61 @@
+"""
+Renderers JSON de la API.
+
+- FastJSONRenderer: usa orjson (C) si está instalado y si no cae al JSONRenderer de DRF.
+  Fechas, Decimal, lazy strings, etc. pasan por el encoder de DRF para que la salida
+  sea idéntica con o sin orjson.
+- ColumnarJSONRenderer: formato opcional para series (``?format=columnar``): las listas
+  de filas se envían como un objeto de columnas ``{"fecha": [...], "tasa": [...]}``.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+# Claves que contienen la lista de filas en las respuestas paginadas / de series
+CLAVES_FILAS = ("results", "serie")
+
+
+def a_columnas(filas: list) -> dict:
+    """
+    [{"a": 1, "b": 2}, {"a": 3, "b": 4}] -> {"a": [1, 3], "b": [2, 4]}
+    """
+    if not filas:
+        return {}
+    return {columna: [fila.get(columna) for fila in filas] for columna in filas[0]}
+
+
+def _es_tabla(valor) -> bool:
+    return isinstance(valor, list) and all(isinstance(fila, dict) for fila in valor)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # Con indent (API navegable o Accept con indent=) se usa el renderer de DRF
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    media_type = "application/vnd.datapulse.columnar+json"
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if _es_tabla(data):
+            data = a_columnas(data)
+        elif isinstance(data, dict):
+            data = {
+                clave: a_columnas(valor) if clave in CLAVES_FILAS and _es_tabla(valor) else valor
+                for clave, valor in data.items()
+            }
+        return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,205 @@
+"""
+Riesgo cambiario de portafolios a partir del histórico de TipoCambio.
+
+Las posiciones se agrupan por moneda y se llevan a la moneda base con la última tasa
+del rango (como en ``api.valuacion``). Los retornos diarios de cada moneda contra la
+base salen de una matriz alineada de retornos logarítmicos contra USD que se cachea
+por rango de fechas y monedas: otros portafolios, confianzas u horizontes sobre el
+mismo rango no vuelven a leer TipoCambio. Todo el cálculo es matricial (NumPy).
+
+Solo se mide riesgo de tipo de cambio: no hay histórico de precios de los activos.
+"""
+import datetime
+from statistics import NormalDist
+
+import numpy as np
+
+from . import cache
+from .models import Posicion, TipoCambio
+from .valuacion import MONEDA_PIVOTE, tasas_a_usd
+
+
+DIAS_ANIO = 252
+MIN_OBSERVACIONES = 20
+VENTANA_DEFAULT = 365  # días hacia atrás si no se pasa ``desde``
+CONFIANZAS_DEFAULT = (0.95, 0.99)
+HORIZONTE_MAX = 250
+
+
+class RiesgoError(Exception):
+    pass
+
+
+def matriz_retornos(monedas, desde, hasta) -> dict:
+    """
+    ``{"fechas": datetime64[D] (T,), "monedas": [...], "retornos": float64 (T, M)}`` con los
+    retornos logarítmicos diarios moneda -> USD alineados por fecha. Las monedas sin
+    tasas en el rango no aparecen en ``monedas``.
+    """
+    monedas = tuple(sorted(set(monedas) - {MONEDA_PIVOTE}))
+    return cache.memo(
+        "retornos_fx", (cache.TIPOS_CAMBIO,), (monedas, desde, hasta),
+        lambda: _calcular_retornos(monedas, desde, hasta),
+    )
+
+
+def _calcular_retornos(monedas, desde, hasta) -> dict:
+    filas = list(
+        TipoCambio.objects.filter(
+            moneda_origen__in=monedas, moneda_destino=MONEDA_PIVOTE, fecha__gte=desde, fecha__lte=hasta, tasa__gt=0
+        ).order_by().values_list("moneda_origen", "fecha", "tasa")
+    )
+    if not filas:
+        return {"fechas": np.empty(0, dtype="datetime64[D]"), "monedas": [], "retornos": np.empty((0, 0))}
+
+    moneda, fecha, tasa = zip(*filas)
+    columnas, j = np.unique(np.array(moneda), return_inverse=True)
+    fechas, i = np.unique(np.array(fecha, dtype="datetime64[D]"), return_inverse=True)
+    precios = np.full((len(fechas), len(columnas)), np.nan)
+    precios[i, j] = np.log(np.array(tasa, dtype=float))
+
+    # Forward fill: calendarios distintos (feriados) no desalinean las columnas
+    ultimo = np.where(np.isnan(precios), 0, np.arange(len(fechas))[:, None])
+    np.maximum.accumulate(ultimo, axis=0, out=ultimo)
+    precios = precios[ultimo, np.arange(len(columnas))]
+
+    # Desde la primera fecha en que todas las monedas tienen precio
+    inicio = int(np.argmax(~np.isnan(precios).any(axis=1)))
+    return {
+        "fechas": fechas[inicio + 1:],
+        "monedas": columnas.tolist(),
+        "retornos": np.diff(precios[inicio:], axis=0),
+    }
+
+
+def _var_cvar(pnl: np.ndarray, mu: float, sigma: float, confianza: float, total: float) -> dict:
+    q = np.quantile(pnl, 1 - confianza)
+    historico = (-q, -pnl[pnl <= q].mean())
+    normal = NormalDist()
+    z = normal.inv_cdf(confianza)
+    parametrico = (z * sigma - mu, sigma * normal.pdf(z) / (1 - confianza) - mu)
+
+    def fila(var, cvar):
+        return {
+            "var": float(var),
+            "cvar": float(cvar),
+            "var_porcentual": float(var / total * 100),
+            "cvar_porcentual": float(cvar / total * 100),
+        }
+
+    return {"confianza": confianza, "historico": fila(*historico), "parametrico": fila(*parametrico)}
+
+
+def ventana(desde=None, hasta=None) -> tuple:
+    """
+    (desde, hasta) efectivos: por defecto los VENTANA_DEFAULT días hasta hoy.
+    """
+    hasta = hasta or datetime.date.today()
+    return desde or hasta - datetime.timedelta(days=VENTANA_DEFAULT), hasta
+
+
+def calcular_riesgo(portafolio, moneda_base: str = MONEDA_PIVOTE, desde=None, hasta=None,
+                    confianzas=CONFIANZAS_DEFAULT, horizonte: int = 1) -> dict:
+    """
+    Volatilidad, VaR / CVaR (histórico y paramétrico normal) a ``horizonte`` días y la
+    matriz de correlación de las monedas del portafolio contra ``moneda_base``.
+
+    El VaR histórico usa retornos de ``horizonte`` días con ventanas solapadas; el
+    paramétrico escala media y volatilidad diarias por ``horizonte`` y su raíz.
+    """
+    moneda_base = (moneda_base or MONEDA_PIVOTE).upper()
+    desde, hasta = ventana(desde, hasta)
+    if desde >= hasta:
+        raise RiesgoError("desde debe ser anterior a hasta.")
+
+    filas = list(
+        Posicion.objects.filter(portafolio=portafolio).order_by().values_list("moneda", "cantidad", "precio_unitario")
+    )
+    if not filas:
+        raise RiesgoError("El portafolio no tiene posiciones.")
+    moneda, cantidad, precio = (np.asarray(c) for c in zip(*filas))
+    monedas, idx_moneda = np.unique(np.char.upper(moneda.astype(str)), return_inverse=True)
+    valor_local = np.bincount(idx_moneda, weights=cantidad.astype(float) * precio.astype(float), minlength=len(monedas))
+
+    tasas = tasas_a_usd(set(monedas.tolist()) | {moneda_base}, fecha=hasta)
+    if moneda_base not in tasas:
+        raise RiesgoError(f"No hay tipo de cambio {moneda_base}/{MONEDA_PIVOTE} registrado.")
+    a_usd = np.array([tasas.get(m, np.nan) for m in monedas.tolist()], dtype=float)
+    exposicion = valor_local * a_usd / tasas[moneda_base]
+    con_tasa = ~np.isnan(exposicion)
+
+    datos = matriz_retornos(set(monedas[con_tasa].tolist()) | {moneda_base}, desde, hasta)
+    # USD (el pivote) no tiene filas: es una columna de ceros al final
+    columnas = {m: k for k, m in enumerate(datos["monedas"])}
+    columnas[MONEDA_PIVOTE] = len(datos["monedas"])
+    if moneda_base not in columnas:
+        raise RiesgoError(f"No hay histórico {moneda_base}/{MONEDA_PIVOTE} entre {desde} y {hasta}.")
+    con_historia = np.array([m in columnas for m in monedas.tolist()], dtype=bool)
+    usar = con_tasa & con_historia
+    if not usar.any():
+        raise RiesgoError("Ninguna moneda del portafolio tiene histórico en el rango.")
+
+    retornos = datos["retornos"]
+    if len(retornos) - horizonte + 1 < MIN_OBSERVACIONES:
+        raise RiesgoError(
+            f"Se necesitan al menos {MIN_OBSERVACIONES} observaciones de {horizonte} día(s); "
+            f"hay {max(len(retornos) - horizonte + 1, 0)}."
+        )
+    extendida = np.column_stack([retornos, np.zeros(len(retornos))])
+    cols = np.array([columnas[m] for m in monedas[usar].tolist()])
+    # log(m / base) = log(m / USD) - log(base / USD)
+    relativos = extendida[:, cols] - extendida[:, [columnas[moneda_base]]]
+    w = exposicion[usar]
+    total = float(w.sum())
+    if total <= 0:
+        raise RiesgoError("El valor del portafolio debe ser positivo.")
+
+    # Diario: media y covarianza de retornos simples
+    simples = np.expm1(relativos)
+    cov = np.atleast_2d(np.cov(simples, rowvar=False))
+    marginal = cov @ w
+    sigma = float(np.sqrt(max(w @ marginal, 0.0)))
+    mu = float(simples.mean(axis=0) @ w)
+
+    # Horizonte: retornos log acumulados en ventanas solapadas de ``horizonte`` días
+    acumulados = np.cumsum(np.vstack([np.zeros((1, relativos.shape[1])), relativos]), axis=0)
+    pnl = np.expm1(acumulados[horizonte:] - acumulados[:-horizonte]) @ w
+    raiz_h = np.sqrt(horizonte)
+
+    desvios = simples.std(axis=0, ddof=1)
+    varian = desvios > 0  # la propia moneda base no tiene riesgo cambiario
+    correlacion = np.atleast_2d(np.corrcoef(simples[:, varian], rowvar=False)) if varian.sum() else np.empty((0, 0))
+
+    return {
+        "portafolio": portafolio.pk,
+        "moneda_base": moneda_base,
+        "desde": desde,
+        "hasta": hasta,
+        "desde_efectivo": str(datos["fechas"][0]),
+        "observaciones": int(len(retornos)),
+        "horizonte_dias": horizonte,
+        "valor_total": total,
+        "volatilidad": {
+            "diaria_porcentual": sigma / total * 100,
+            "anual_porcentual": sigma / total * np.sqrt(DIAS_ANIO) * 100,
+            "horizonte_monto": sigma * raiz_h,
+        },
+        "var": [_var_cvar(pnl, mu * horizonte, sigma * raiz_h, c, total) for c in confianzas],
+        "monedas": [
+            {
+                "moneda": m,
+                "exposicion": float(w[k]),
+                "peso_porcentual": float(w[k] / total * 100),
+                "volatilidad_anual_porcentual": float(desvios[k] * np.sqrt(DIAS_ANIO) * 100),
+                # Contribución a la volatilidad del portafolio (suma 100)
+                "contribucion_porcentual": float(w[k] * marginal[k] / sigma**2 * 100) if sigma else 0.0,
+            }
+            for k, m in enumerate(monedas[usar].tolist())
+        ],
+        "correlacion": {
+            "monedas": monedas[usar][varian].tolist(),
+            "matriz": np.round(correlacion, 4).tolist(),
+        },
+        "monedas_sin_tasa": monedas[~con_tasa].tolist(),
+        "monedas_sin_historia": monedas[con_tasa & ~con_historia].tolist(),
+    }
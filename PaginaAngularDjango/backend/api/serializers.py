@@ -1,42 +1,116 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from .autenticacion import get_config as get_auth_config
 from .models import (
     Project, ContactMessage,
-    Pais, IndicadorEconomico, TipoCambio,
-    Portafolio, Posicion
+    Pais, IndicadorEconomico, TipoCambio, AgregadoRegional,
+    Portafolio, Posicion, Job
 )
-
-
-class ProjectSerializer(serializers.ModelSerializer):
+from .permissions import get_user_roles
+
+
+def _lista_param(request, nombre):
+    # Solo en lecturas: en escrituras recortar también quitaría campos de entrada
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return None
+    return {c.strip() for c in valor.split(",") if c.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=a,b`` / ``?exclude=c`` sobre los campos de primer nivel de la respuesta.
+    Los serializers anidados no se recortan.
+    """
+
+    def _es_raiz(self) -> bool:
+        # many=True deja un ListSerializer como raíz
+        return self.root is self or self.root is self.parent
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._es_raiz():
+            return fields
+        request = self.context.get("request")
+        incluir = _lista_param(request, "fields")
+        excluir = _lista_param(request, "exclude") or set()
+        return {
+            nombre: field
+            for nombre, field in fields.items()
+            if (incluir is None or nombre in incluir) and nombre not in excluir
+        }
+
+    def campos_modelo(self):
+        """
+        Rutas del modelo que necesita la respuesta recortada (para ``.only()``), o None
+        si no hay recorte o algún campo depende de algo que no se puede deducir.
+        """
+        request = self.context.get("request")
+        if _lista_param(request, "fields") is None and _lista_param(request, "exclude") is None:
+            return None
+
+        modelo = self.Meta.model
+        rutas = {modelo._meta.pk.name}
+        for field in self.fields.values():
+            if field.source == "*" or isinstance(field, serializers.SerializerMethodField):
+                return None
+            partes = field.source.split(".")
+            try:
+                model_field = modelo._meta.get_field(partes[0])
+            except FieldDoesNotExist:
+                if hasattr(modelo, partes[0]):
+                    return None  # property / método: puede leer cualquier campo
+                continue  # anotación del queryset
+            if not model_field.concrete or model_field.many_to_many:
+                continue  # relaciones inversas: van por prefetch
+            rutas.add("__".join(partes))
+            if len(partes) > 1:
+                rutas.add(partes[0])
+        return rutas
+
+
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = "__all__"
 
 
-class ContactMessageSerializer(serializers.ModelSerializer):
+class ContactMessageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ContactMessage
         fields = "__all__"
 
 
-class IndicadorEconomicoSerializer(serializers.ModelSerializer):
+class IndicadorEconomicoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = IndicadorEconomico
         fields = "__all__"
 
 
-class TipoCambioSerializer(serializers.ModelSerializer):
+class AgregadoRegionalSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = AgregadoRegional
+        exclude = ["id"]
+
+
+class TipoCambioSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TipoCambio
         fields = "__all__"
 
 
-class PaisSerializer(serializers.ModelSerializer):
+class PaisSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Pais
         fields = "__all__"
 
 
-class PaisDetailSerializer(serializers.ModelSerializer):
+class PaisDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     indicadores = IndicadorEconomicoSerializer(many=True, read_only=True)
 
     class Meta:
@@ -44,24 +118,32 @@ class PaisDetailSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class PosicionSerializer(serializers.ModelSerializer):
+class PosicionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    pais_nombre = serializers.CharField(source="pais.nombre", read_only=True)
+
     class Meta:
         model = Posicion
         fields = "__all__"
         read_only_fields = ("portafolio", "created_at")
 
 
-class PortafolioListSerializer(serializers.ModelSerializer):
-    pais_nombre = serializers.CharField(source="pais.nombre", read_only=True)
-    posiciones_count = serializers.IntegerField(source="posiciones.count", read_only=True)
+class PortafolioListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Viene anotado por PortafolioViewSet.get_queryset (evita un COUNT por fila)
+    posiciones_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Portafolio
+        fields = ("id", "nombre", "descripcion", "owner", "created_at", "posiciones_count")
 
+
+class PortafolioSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Sin posiciones ni conteos: para el feed de cambios (las posiciones van aparte)
     class Meta:
         model = Portafolio
-        fields = ("id", "nombre", "descripcion", "pais", "pais_nombre", "activo", "created_at", "updated_at", "posiciones_count")
+        fields = ("id", "nombre", "descripcion", "owner", "created_at", "updated_at")
 
 
-class PortafolioDetailSerializer(serializers.ModelSerializer):
-    pais_detalle = PaisSerializer(source="pais", read_only=True)
+class PortafolioDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     posiciones = PosicionSerializer(many=True, read_only=True)
 
     class Meta:
@@ -69,7 +151,46 @@ class PortafolioDetailSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class PortafolioCreateSerializer(serializers.ModelSerializer):
+class PortafolioCreateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Portafolio
-        fields = ("nombre", "descripcion", "pais", "activo")
\ No newline at end of file
+        fields = ("id", "nombre", "descripcion")
+
+class JobSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    usuario = serializers.CharField(source="usuario.username", read_only=True, default=None)
+    progreso = serializers.SerializerMethodField()
+    por_segundo = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        exclude = ["archivo", "archivo_sha256", "clave", "worker"]
+
+    def get_progreso(self, job):
+        # Fracción completada cuando se conoce el total (sync: lotes); None en las cargas
+        if job.estado == Job.Estado.COMPLETADO:
+            return 1.0
+        if not job.total:
+            return None
+        return round(job.procesados / job.total, 4)
+
+    def get_por_segundo(self, job):
+        # Throughput del intento actual (filas o lotes por segundo)
+        if job.iniciado is None or job.latido is None:
+            return None
+        segundos = (job.latido - job.iniciado).total_seconds()
+        return round(job.procesados / segundos, 1) if segundos > 0 else None
+
+
+class TokenConRolesSerializer(TokenObtainPairSerializer):
+    """
+    Login de /api/auth/login/: agrega el claim ``roles`` (grupos) para que el frontend arme
+    la UI sin pedir /api/auth/me/. Es informativo: los permisos usan los roles del servidor.
+    El access token que emite /api/auth/refresh/ copia los claims del refresh.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        if get_auth_config()["ROLES_EN_TOKEN"]:
+            token["roles"] = sorted(get_user_roles(user))
+        return token
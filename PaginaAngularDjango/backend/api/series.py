@@ -0,0 +1,119 @@
+"""
+Series de tiempo de TipoCambio agregadas con NumPy.
+
+Solo se leen las columnas (fecha, tasa) ordenadas por fecha; la agregación OHLC
+y el downsampling LTTB se hacen sobre arrays, nunca sobre instancias del ORM.
+"""
+import numpy as np
+
+from .models import TipoCambio
+
+
+FRECUENCIAS = ("diaria", "semanal", "mensual", "lttb")
+LTTB_PUNTOS_DEFAULT = 500
+LTTB_PUNTOS_MAX = 5000
+
+
+def cargar_serie(moneda_origen: str, moneda_destino: str = "USD", desde=None, hasta=None):
+    """
+    Devuelve (fechas datetime64[D], tasas float64) ordenadas por fecha.
+    """
+    qs = TipoCambio.objects.filter(moneda_origen=moneda_origen, moneda_destino=moneda_destino)
+    if desde is not None:
+        qs = qs.filter(fecha__gte=desde)
+    if hasta is not None:
+        qs = qs.filter(fecha__lte=hasta)
+    filas = list(qs.order_by("fecha").values_list("fecha", "tasa"))
+    if not filas:
+        return np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=float)
+    fechas, tasas = zip(*filas)
+    return np.array(fechas, dtype="datetime64[D]"), np.array(tasas, dtype=float)
+
+
+def _inicio_periodo(fechas: np.ndarray, frecuencia: str) -> np.ndarray:
+    if frecuencia == "diaria":
+        return fechas
+    if frecuencia == "semanal":
+        # 1970-01-01 fue jueves: desplazamos para que la semana empiece el lunes
+        dias = fechas.astype("int64")
+        return (dias - (dias + 3) % 7).astype("datetime64[D]")
+    if frecuencia == "mensual":
+        return fechas.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"Frecuencia no soportada: {frecuencia}")
+
+
+def agregar_ohlc(fechas: np.ndarray, tasas: np.ndarray, frecuencia: str) -> list:
+    """
+    Agrupa una serie ordenada por periodo y calcula apertura/máximo/mínimo/cierre/promedio.
+    """
+    if len(fechas) == 0:
+        return []
+    claves = _inicio_periodo(fechas, frecuencia)
+    cortes = np.flatnonzero(claves[1:] != claves[:-1]) + 1
+    inicios = np.concatenate(([0], cortes))
+    finales = np.concatenate((cortes, [len(tasas)])) - 1
+    conteos = finales - inicios + 1
+
+    apertura = tasas[inicios]
+    cierre = tasas[finales]
+    maximo = np.maximum.reduceat(tasas, inicios)
+    minimo = np.minimum.reduceat(tasas, inicios)
+    promedio = np.add.reduceat(tasas, inicios) / conteos
+
+    return [
+        {
+            "fecha": str(claves[inicios[i]]),
+            "apertura": float(apertura[i]),
+            "maximo": float(maximo[i]),
+            "minimo": float(minimo[i]),
+            "cierre": float(cierre[i]),
+            "promedio": float(promedio[i]),
+            "n": int(conteos[i]),
+        }
+        for i in range(len(inicios))
+    ]
+
+
+def cierres(fechas: np.ndarray, frecuencia: str) -> np.ndarray:
+    """
+    Índices del último punto de cada periodo de una serie ordenada.
+    """
+    if len(fechas) == 0:
+        return np.empty(0, dtype=np.int64)
+    claves = _inicio_periodo(fechas, frecuencia)
+    return np.append(np.flatnonzero(claves[1:] != claves[:-1]), len(fechas) - 1)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, puntos: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: índices de los ``puntos`` que mejor conservan la forma.
+    """
+    n = len(x)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+
+    x = x.astype(float)
+    indices = np.empty(puntos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+
+    # Buckets intermedios sobre los puntos 1..n-2
+    limites = np.linspace(1, n - 1, puntos - 1).astype(np.int64)
+    anterior = 0
+    for i in range(puntos - 2):
+        ini, fin = limites[i], limites[i + 1]
+        sig_ini, sig_fin = limites[i + 1], (limites[i + 2] if i + 2 < len(limites) else n)
+        prom_x = x[sig_ini:sig_fin].mean()
+        prom_y = y[sig_ini:sig_fin].mean()
+
+        areas = np.abs(
+            (x[anterior] - prom_x) * (y[ini:fin] - y[anterior])
+            - (x[anterior] - x[ini:fin]) * (prom_y - y[anterior])
+        )
+        anterior = ini + int(np.argmax(areas))
+        indices[i + 1] = anterior
+    return indices
+
+
+def serie_lttb(fechas: np.ndarray, tasas: np.ndarray, puntos: int) -> list:
+    idx = lttb(fechas.astype("int64"), tasas, puntos)
+    return [{"fecha": str(fechas[i]), "tasa": float(tasas[i])} for i in idx]
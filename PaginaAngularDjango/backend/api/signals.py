@@ -0,0 +1,268 @@
+import threading
+from itertools import groupby
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import agregados, autenticacion, cache, deltas, eventos, historico
+from .models import IndicadorEconomico, Pais, Portafolio, Posicion, TipoCambio
+from .permissions import invalidate_user_roles
+
+
+User = get_user_model()
+
+
+class _PorTransaccion:
+    """
+    Junta elementos durante la transacción en curso y llama a ``funcion(elementos)`` una
+    sola vez al confirmarla (enseguida si no hay transacción). Borrar un país con miles
+    de indicadores recalcula una vez, no una por fila. Si se revierte la transacción, o
+    el savepoint donde empezó el lote, el lote se descarta con ella.
+    """
+
+    def __init__(self, funcion):
+        self.funcion = funcion
+        self._local = threading.local()
+
+    def agregar(self, *elementos) -> None:
+        if not elementos:
+            return
+        conexion = transaction.get_connection()
+        if not conexion.in_atomic_block:
+            self.funcion(list(elementos))
+            return
+        lote = getattr(self._local, "lote", None)
+        if lote is None or not self._registrado(lote, conexion):
+            lote = self._local.lote = {"elementos": [], "cola": None}
+            lote["confirmar"] = lambda: self._confirmar(lote)
+            transaction.on_commit(lote["confirmar"])
+            lote["cola"] = conexion.run_on_commit
+        lote["elementos"].extend(elementos)
+
+    def _registrado(self, lote, conexion) -> bool:
+        # Django reemplaza la lista de callbacks al confirmar o revertir (también un savepoint)
+        if conexion.run_on_commit is lote["cola"]:
+            return True
+        lote["cola"] = conexion.run_on_commit
+        return any(funcion is lote["confirmar"] for _, funcion, _ in conexion.run_on_commit)
+
+    def _confirmar(self, lote) -> None:
+        if getattr(self._local, "lote", None) is lote:
+            self._local.lote = None
+        self.funcion(lote["elementos"])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def roles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # user.groups.add(...) -> instance es el usuario; group.user_set.add(...) -> instance es el grupo
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        invalidate_user_roles(instance)
+        autenticacion.invalidar_usuario(instance.pk)
+    elif pk_set:
+        for user_id in pk_set:
+            autenticacion.invalidar_usuario(user_id)
+    else:
+        # group.user_set.clear(): no se sabe a qué usuarios afectó
+        autenticacion.invalidar_todos()
+
+
+# Caché de usuarios del JWT: contraseña, is_active, is_superuser... y grupos renombrados o borrados
+# (borrar un grupo quita sus filas de la tabla intermedia sin m2m_changed)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def usuario_changed(sender, instance, **kwargs):
+    autenticacion.invalidar_usuario(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def grupo_changed(sender, **kwargs):
+    autenticacion.invalidar_todos()
+
+
+# Caché de respuestas: cualquier escritura individual (admin, shell, ...) invalida su recurso.
+# Las escrituras masivas (sync, importadores) no disparan señales e invalidan explícitamente.
+_RECURSOS = {
+    Pais: cache.PAISES,
+    IndicadorEconomico: cache.INDICADORES,
+    TipoCambio: cache.TIPOS_CAMBIO,
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidar_cache(sender, **kwargs):
+    recurso = _RECURSOS.get(sender)
+    if recurso is not None:
+        cache.invalidar(recurso)
+
+
+# Feed de cambios (api.deltas): las altas y modificaciones se ven por fecha; los borrados dejan lápida.
+@receiver(pre_delete)
+def recordar_borrado(sender, instance, origin=None, **kwargs):
+    deltas.recordar_borrado(sender, instance, origin)
+
+
+@receiver(post_delete)
+def registrar_borrado(sender, instance, origin=None, **kwargs):
+    deltas.registrar_borrados(origin)
+
+
+# Agregados regionales: mismas reglas que la caché, las escrituras masivas recalculan explícitamente.
+# Las señales juntan las claves y recalculan una vez por transacción.
+_agregados_indicadores = _PorTransaccion(agregados.recalcular)
+_agregados_paises = _PorTransaccion(agregados.recalcular_paises)
+
+
+@receiver(pre_save, sender=IndicadorEconomico)
+def recordar_clave_indicador(sender, instance, raw=False, **kwargs):
+    # Si cambia tipo o anio también hay que recalcular el par anterior
+    if raw or instance.pk is None:
+        return
+    instance._clave_agregado = (
+        IndicadorEconomico.objects.filter(pk=instance.pk).values_list("tipo", "anio").first()
+    )
+
+
+@receiver(post_save, sender=IndicadorEconomico)
+@receiver(post_delete, sender=IndicadorEconomico)
+def recalcular_agregados_indicador(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _agregados_indicadores.agregar((instance.tipo, instance.anio))
+    anterior = getattr(instance, "_clave_agregado", None)
+    if anterior:
+        _agregados_indicadores.agregar(anterior)
+
+
+@receiver(post_save, sender=Pais)
+def recalcular_agregados_pais(sender, instance, created, raw=False, **kwargs):
+    # Un país nuevo todavía no tiene indicadores; al borrarlo el CASCADE dispara las señales de arriba
+    if raw or created:
+        return
+    _agregados_paises.agregar(instance.codigo_iso)
+
+# Histórico de portafolios: una tasa solo toca sus días, una posición solo su portafolio.
+# Como los agregados, se juntan las claves y se recalcula una vez por transacción.
+_CLAVES_HISTORICO = {
+    TipoCambio: ("moneda_origen", "moneda_destino", "fecha"),
+    Posicion: ("portafolio",),
+}
+
+
+@receiver(pre_save, sender=TipoCambio)
+@receiver(pre_save, sender=Posicion)
+def recordar_clave_historico(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Si cambia la moneda, la fecha o el portafolio también hay que recalcular lo anterior
+    instance._clave_historico = None
+    if raw or instance.pk is None:
+        return
+    campos = _CLAVES_HISTORICO[sender]
+    if update_fields is not None and not (set(campos) | {f"{c}_id" for c in campos}) & set(update_fields):
+        return  # save(update_fields=[...]) sin campos de la clave: no puede haber cambiado
+    instance._clave_historico = sender.objects.filter(pk=instance.pk).values_list(*campos).first()
+
+
+def _recalcular_historico_tasas(claves):
+    # Una vez por moneda, desde la fecha más temprana tocada hasta la más tardía
+    fechas = {}
+    for origen, fecha in claves:
+        desde, hasta = fechas.get(origen, (fecha, fecha))
+        fechas[origen] = (min(desde, fecha), max(hasta, fecha))
+    for origen, (desde, hasta) in fechas.items():
+        historico.recalcular_moneda(origen, desde, hasta)
+
+
+_historico_tasas = _PorTransaccion(_recalcular_historico_tasas)
+
+
+@receiver(post_save, sender=TipoCambio)
+@receiver(post_delete, sender=TipoCambio)
+def recalcular_historico_tipo_cambio(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    claves = {(instance.moneda_origen, instance.moneda_destino, instance.fecha)}
+    anterior = getattr(instance, "_clave_historico", None)
+    if anterior:
+        claves.add(anterior)
+    _historico_tasas.agregar(
+        *((origen.upper(), fecha) for origen, destino, fecha in claves if destino == historico.MONEDA_PIVOTE)
+    )
+
+
+def _recalcular_historico_portafolios(portafolios):
+    # Una vez por transacción; los portafolios borrados (con sus posiciones en cascada) no
+    vigentes = list(Portafolio.objects.filter(pk__in=set(portafolios)).values_list("pk", flat=True))
+    if vigentes:
+        historico.recalcular(vigentes)
+
+
+_historico_portafolios = _PorTransaccion(_recalcular_historico_portafolios)
+
+
+@receiver(post_save, sender=Posicion)
+@receiver(post_delete, sender=Posicion)
+def recalcular_historico_posicion(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _historico_portafolios.agregar(instance.portafolio_id)
+    anterior = getattr(instance, "_clave_historico", None)
+    if anterior:
+        _historico_portafolios.agregar(anterior[0])
+
+
+# Feed SSE (api.eventos): deltas de las escrituras individuales; los importadores publican por lote.
+# Se publica un delta por tramo de filas consecutivas del mismo canal y tipo al confirmar.
+def _publicar(elementos):
+    """
+    elementos: ``(canal, fila, borrada)`` en orden, o ``(None, (pk, codigo_iso), None)`` de
+    los países borrados. Las filas de indicadores llevan el id del país: los códigos salen
+    de una sola consulta (los de países ya borrados, de su pre_delete).
+    """
+    codigos = dict(fila for canal, fila, _ in elementos if canal is None)
+    faltan = {fila[0] for canal, fila, _ in elementos if canal == eventos.INDICADORES} - codigos.keys()
+    if faltan:
+        codigos.update(Pais.objects.filter(pk__in=faltan).values_list("pk", "codigo_iso"))
+
+    filas_eventos = (e for e in elementos if e[0] is not None)
+    for (canal, borrada), tramo in groupby(filas_eventos, key=lambda e: (e[0], e[2])):
+        filas = [
+            [codigos.get(fila[0]), *fila[1:]] if canal == eventos.INDICADORES else fila
+            for _, fila, _ in tramo
+        ]
+        if borrada:
+            eventos.publicar(canal, [], borradas=[fila[:-1] for fila in filas])
+        else:
+            eventos.publicar(canal, filas)
+
+
+_eventos = _PorTransaccion(_publicar)
+
+
+@receiver(post_save, sender=TipoCambio)
+@receiver(post_delete, sender=TipoCambio)
+def publicar_tipo_cambio(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    fila = [instance.moneda_origen, instance.moneda_destino, instance.fecha, instance.tasa]
+    _eventos.agregar((eventos.TIPOS_CAMBIO, fila, "created" not in kwargs))
+
+
+@receiver(post_save, sender=IndicadorEconomico)
+@receiver(post_delete, sender=IndicadorEconomico)
+def publicar_indicador(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    fila = [instance.pais_id, instance.tipo, instance.anio, instance.valor]
+    _eventos.agregar((eventos.INDICADORES, fila, "created" not in kwargs))
+
+
+@receiver(pre_delete, sender=Pais)
+def recordar_codigo_pais(sender, instance, **kwargs):
+    # Sus indicadores borrados en cascada se publican cuando el país ya no existe
+    _eventos.agregar((None, (instance.pk, instance.codigo_iso), None))
@@ -0,0 +1,111 @@
+"""
+Generador de datos sintéticos para benchmarks (países, indicadores, tipos de cambio,
+portafolios y posiciones) a escala configurable. Usa bulk_create y no dispara señales:
+quien lo llame decide si recalcular agregados o invalidar cachés.
+"""
+import datetime
+import random
+from dataclasses import asdict, dataclass
+
+from django.db import connections
+
+from .models import IndicadorEconomico, Pais, Portafolio, Posicion, TipoCambio
+
+
+@dataclass
+class Escala:
+    paises: int = 40            # una moneda por país
+    fx_filas: int = 2_000_000   # total de filas de TipoCambio (series diarias por moneda)
+    anio_desde: int = 1960
+    anio_hasta: int = 2024
+    portafolios: int = 200
+    posiciones: int = 200_000
+    semilla: int = 42
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+LOTE = 20_000
+MAX_PAISES = 26 * 26  # códigos ISO de dos letras
+FX_INICIO = datetime.date(2000, 1, 1)
+
+
+def generar(escala: Escala, using: str = "default") -> dict:
+    """
+    Inserta los datos en la base ``using`` y devuelve un contexto con valores de
+    referencia (moneda, país, portafolio y rango de fechas "del medio") para consultas.
+    """
+    if not 1 <= escala.paises <= MAX_PAISES:
+        raise ValueError(f"paises debe estar entre 1 y {MAX_PAISES}")
+    rng = random.Random(escala.semilla)
+    codigos = [f"{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(escala.paises)]
+    monedas = [f"M{codigo}" for codigo in codigos]
+    regiones = Pais.Region.values
+
+    paises = Pais.objects.db_manager(using).bulk_create(
+        Pais(
+            codigo_iso=codigo,
+            nombre=f"Pais {codigo}",
+            moneda_codigo=moneda,
+            moneda_nombre=moneda,
+            region=regiones[i % len(regiones)],
+            latitud=0.0,
+            longitud=0.0,
+            poblacion=rng.randint(10**5, 10**8),
+            activo=i % 10 != 0,
+        )
+        for i, (codigo, moneda) in enumerate(zip(codigos, monedas))
+    )
+
+    # FX: una serie diaria por moneda hasta completar fx_filas
+    dias = max(1, escala.fx_filas // len(monedas))
+    fx = TipoCambio.objects.db_manager(using)
+    lote = []
+    for moneda in monedas:
+        tasa = rng.uniform(0.5, 5000)
+        for d in range(dias):
+            tasa *= 1 + rng.gauss(0, 0.01)
+            lote.append(TipoCambio(moneda_origen=moneda, tasa=tasa, fecha=FX_INICIO + datetime.timedelta(days=d)))
+            if len(lote) >= LOTE:
+                fx.bulk_create(lote)
+                lote = []
+    fx.bulk_create(lote)
+
+    IndicadorEconomico.objects.db_manager(using).bulk_create(
+        (
+            IndicadorEconomico(pais=p, tipo=tipo, valor=rng.random(), unidad="USD", anio=anio)
+            for p in paises
+            for tipo in IndicadorEconomico.Tipo.values
+            for anio in range(escala.anio_desde, escala.anio_hasta + 1)
+        ),
+        batch_size=LOTE,
+    )
+
+    portafolios = Portafolio.objects.db_manager(using).bulk_create(
+        Portafolio(nombre=f"Portafolio {i}") for i in range(max(1, escala.portafolios))
+    )
+    Posicion.objects.db_manager(using).bulk_create(
+        (
+            Posicion(
+                portafolio=rng.choice(portafolios),
+                pais=rng.choice(paises),
+                activo=f"Activo {i}",
+                moneda=rng.choice(monedas),
+                cantidad=rng.uniform(1, 1000),
+                precio_unitario=rng.uniform(1, 500),
+            )
+            for i in range(escala.posiciones)
+        ),
+        batch_size=LOTE,
+    )
+    if connections[using].vendor == "sqlite":
+        connections[using].cursor().execute("ANALYZE")
+
+    return {
+        "moneda": monedas[len(monedas) // 2],
+        "pais": paises[len(paises) // 2],
+        "portafolio": portafolios[len(portafolios) // 2],
+        "desde": FX_INICIO + datetime.timedelta(days=dias // 2),
+        "hasta": FX_INICIO + datetime.timedelta(days=dias // 2 + 365),
+    }
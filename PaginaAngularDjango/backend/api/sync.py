@@ -0,0 +1,307 @@
+"""
+Motor de sincronización de países contra RestCountries.
+
+- Descarga los códigos ISO en lotes concurrentes sobre un único ``httpx.AsyncClient``
+  que reutiliza las conexiones (el worker lo corre con ``async_to_sync``).
+- Usa requests condicionales (ETag / If-Modified-Since) guardadas en SyncEstado.
+- Cada Pais guarda un hash de su contenido: las filas sin cambios no se escriben.
+- Las filas nuevas o modificadas se escriben con un único bulk upsert en una transacción.
+- ``DATAPULSE_SYNC["FUENTES"]`` (opcional) reparte los lotes entre varias URLs base
+  y usa las demás como respaldo si una falla.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from urllib.parse import urlencode
+
+import httpx
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import agregados, cache
+from .models import Pais, SyncEstado
+
+
+DEFAULTS = {
+    "URL": "https://restcountries.com/v3.1/alpha",
+    "FUENTES": [],  # URLs base alternativas; vacío = solo URL
+    "ISO_CODES": ["CO", "BR", "MX", "AR", "CL", "PE", "EC", "BO", "PY", "UY"],
+    "BATCH_SIZE": 25,
+    "MAX_WORKERS": 4,
+    "TIMEOUT": 20,
+    "USER_AGENT": "DataPulseDev/1.0",
+}
+
+REGIONES = {
+    "ANDINA": {"CO", "PE", "EC", "BO", "VE"},
+    "CONO_SUR": {"AR", "CL", "PY", "UY", "BR"},
+    "CENTROAMERICA": {"MX", "GT", "HN", "SV", "NI", "CR", "PA", "BZ"},
+    "CARIBE": {"CU", "DO", "HT", "JM", "PR", "TT", "BS", "BB"},
+}
+
+CAMPOS = ("nombre", "moneda_codigo", "moneda_nombre", "region", "latitud", "longitud", "poblacion", "activo")
+
+
+class SyncError(Exception):
+    """
+    Falla al consultar la fuente externa (se responde 502).
+    """
+
+
+@dataclass
+class ResultadoSync:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    not_modified: int = 0
+    errors: list = field(default_factory=list)
+    duracion_ms: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def get_config(**overrides) -> dict:
+    config = {**DEFAULTS, **getattr(settings, "DATAPULSE_SYNC", {})}
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    return config
+
+
+def map_region(iso: str) -> str:
+    iso = iso.upper()
+    for region, codigos in REGIONES.items():
+        if iso in codigos:
+            return region
+    return Pais.Region.ANDINA
+
+
+def mapear_pais(item: dict) -> dict:
+    """
+    Convierte un item de RestCountries en los campos de Pais (incluye codigo_iso).
+    """
+    iso = (item.get("cca2") or "").upper()
+    if not iso:
+        raise ValueError("Item sin cca2")
+
+    currencies = item.get("currencies") or {}
+    moneda_codigo = ""
+    moneda_nombre = ""
+    if currencies:
+        moneda_codigo = list(currencies.keys())[0]
+        moneda_nombre = currencies[moneda_codigo].get("name", moneda_codigo)
+
+    latlng = item.get("latlng") or [0.0, 0.0]
+    return {
+        "codigo_iso": iso,
+        "nombre": (item.get("name") or {}).get("common", iso),
+        "moneda_codigo": moneda_codigo,
+        "moneda_nombre": moneda_nombre,
+        "region": map_region(iso),
+        "latitud": float(latlng[0]) if len(latlng) > 0 else 0.0,
+        "longitud": float(latlng[1]) if len(latlng) > 1 else 0.0,
+        "poblacion": int(item.get("population") or 0),
+        "activo": True,
+    }
+
+
+def hash_pais(datos: dict) -> str:
+    contenido = json.dumps({c: datos[c] for c in CAMPOS}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def validar_iso(iso) -> bool:
+    """
+    None (usar ISO_CODES) o una lista de códigos alpha-2.
+    """
+    return iso is None or (isinstance(iso, list) and all(isinstance(c, str) and len(c) == 2 for c in iso))
+
+
+def parametros_job(datos) -> dict:
+    """
+    Parámetros del job SYNC_PAISES a partir del body ``{"iso": [...], "forzar": bool}``,
+    normalizados para que pedidos equivalentes caigan en el mismo job. ValueError si no
+    son válidos.
+    """
+    if not isinstance(datos, dict):
+        raise ValueError("El body debe ser un objeto JSON.")
+    iso = datos.get("iso") or None
+    if not validar_iso(iso):
+        raise ValueError("iso debe ser una lista de códigos ISO alpha-2.")
+    return {"iso": sorted({c.upper() for c in iso}) if iso else None, "forzar": bool(datos.get("forzar"))}
+
+
+def _lotes(codigos, tamano):
+    codigos = sorted({c.upper() for c in codigos if c})
+    return [codigos[i:i + tamano] for i in range(0, len(codigos), tamano)]
+
+
+def _fuentes(config: dict) -> list:
+    return list(config.get("FUENTES") or [config["URL"]])
+
+
+def _plan(iso_codes, config: dict) -> list:
+    """
+    Por cada lote, las URLs a probar en orden. Los lotes se reparten entre las fuentes
+    (round-robin) y si una falla se reintenta el lote en la siguiente.
+    """
+    fuentes = _fuentes(config)
+    plan = []
+    for i, lote in enumerate(_lotes(iso_codes or config["ISO_CODES"], config["BATCH_SIZE"])):
+        query = urlencode({"codes": ",".join(c.lower() for c in lote)})
+        orden = fuentes[i % len(fuentes):] + fuentes[:i % len(fuentes)]
+        plan.append([f"{fuente}?{query}" for fuente in orden])
+    return plan
+
+
+def _headers(estado: SyncEstado | None, config: dict) -> dict:
+    headers = {"User-Agent": config["USER_AGENT"], "Accept": "application/json"}
+    if estado is not None:
+        if estado.etag:
+            headers["If-None-Match"] = estado.etag
+        if estado.last_modified:
+            headers["If-Modified-Since"] = estado.last_modified
+    return headers
+
+
+async def _descargar(client: httpx.AsyncClient, url: str, estado: SyncEstado | None, config: dict):
+    """
+    GET condicional. Devuelve (data | None si 304, etag, last_modified).
+    """
+    try:
+        resp = await client.get(url, headers=_headers(estado, config))
+    except httpx.HTTPError as e:
+        raise SyncError(f"RestCountries {type(e).__name__}: {str(e)}") from e
+    if resp.status_code == 304:
+        return None, None, None
+    if resp.status_code >= 400:
+        raise SyncError(f"RestCountries HTTPError: {resp.status_code}")
+    return resp.json(), resp.headers.get("ETag", ""), resp.headers.get("Last-Modified", "")
+
+
+async def _descargar_lote(client, candidatas, estados, config):
+    """
+    Prueba las fuentes del lote en orden. Devuelve (url usada, respuesta).
+    """
+    error = None
+    for url in candidatas:
+        try:
+            return url, await _descargar(client, url, estados.get(url), config)
+        except SyncError as e:
+            error = e
+    raise error
+
+
+async def _descargar_todo(plan, estados, config: dict, progreso=None) -> list:
+    """
+    Todos los lotes a la vez (repartidos entre las fuentes); el pool del cliente limita a
+    MAX_WORKERS conexiones por fuente. ``progreso`` toca la BD: corre en el hilo que llamó.
+    """
+    conexiones = max(1, config["MAX_WORKERS"]) * len(_fuentes(config))
+    limites = httpx.Limits(max_connections=conexiones, max_keepalive_connections=conexiones)
+    # Sin timeout de pool: los lotes que esperan conexión no cuentan contra TIMEOUT
+    timeout = httpx.Timeout(config["TIMEOUT"], pool=None)
+    terminados = 0
+
+    async def lote(client, urls):
+        nonlocal terminados
+        descarga = await _descargar_lote(client, urls, estados, config)
+        terminados += 1
+        if progreso is not None:
+            await sync_to_async(progreso)(terminados, len(plan))
+        return descarga
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limites) as client:
+        tareas = [asyncio.ensure_future(lote(client, urls)) for urls in plan]
+        try:
+            return await asyncio.gather(*tareas)
+        except BaseException:
+            for tarea in tareas:
+                tarea.cancel()
+            raise
+
+
+def _guardar(descargas, resultado: ResultadoSync, forzar: bool) -> None:
+    """
+    Mapea las descargas y escribe solo lo que cambió.
+    """
+    nuevos = {}
+    validadores = []
+    for url, (data, etag, last_modified) in descargas:
+        if data is None:
+            resultado.not_modified += 1
+            continue
+        validadores.append(SyncEstado(url=url, etag=etag or "", last_modified=last_modified or ""))
+        for item in data if isinstance(data, list) else [data]:
+            try:
+                datos = mapear_pais(item)
+            except Exception as e:
+                resultado.errors.append({"iso": item.get("cca2"), "error": str(e)})
+                continue
+            datos["hash_contenido"] = hash_pais(datos)
+            nuevos[datos["codigo_iso"]] = datos
+
+    # Una query para los hashes actuales, luego descartar lo que no cambió
+    actuales = dict(
+        Pais.objects.filter(codigo_iso__in=nuevos).values_list("codigo_iso", "hash_contenido")
+    )
+    cambios = []
+    actualizados = []
+    for iso, datos in nuevos.items():
+        if iso in actuales and actuales[iso] == datos["hash_contenido"] and not forzar:
+            resultado.unchanged += 1
+            continue
+        if iso in actuales:
+            resultado.updated += 1
+            actualizados.append(iso)
+        else:
+            resultado.created += 1
+        cambios.append(Pais(**datos))
+
+    with transaction.atomic():
+        if cambios:
+            Pais.objects.bulk_create(
+                cambios,
+                update_conflicts=True,
+                unique_fields=["codigo_iso"],
+                update_fields=[*CAMPOS, "hash_contenido", "fecha_actualizacion"],
+            )
+        if validadores:
+            ahora = timezone.now()
+            for estado in validadores:
+                estado.actualizado = ahora
+            SyncEstado.objects.bulk_create(
+                validadores,
+                update_conflicts=True,
+                unique_fields=["url"],
+                update_fields=["etag", "last_modified", "actualizado"],
+            )
+
+    if cambios:
+        cache.invalidar(cache.PAISES)
+    if actualizados:
+        # Población o región pueden haber cambiado: los países nuevos aún no tienen indicadores
+        agregados.recalcular_paises(actualizados)
+
+
+def sincronizar_paises(iso_codes=None, *, forzar: bool = False, progreso=None, **overrides) -> ResultadoSync:
+    """
+    Sincroniza los países indicados (por defecto DATAPULSE_SYNC["ISO_CODES"]).
+
+    ``forzar`` ignora los validadores HTTP guardados y los hashes de contenido.
+    ``progreso(lotes_descargados, total_lotes)`` se llama a medida que terminan las descargas.
+    """
+    inicio = time.perf_counter()
+    config = get_config(**overrides)
+    resultado = ResultadoSync()
+
+    plan = _plan(iso_codes, config)
+    estados = {} if forzar else SyncEstado.objects.in_bulk([u for urls in plan for u in urls], field_name="url")
+
+    descargas = async_to_sync(_descargar_todo)(plan, estados, config, progreso)
+    _guardar(descargas, resultado, forzar)
+    resultado.duracion_ms = round((time.perf_counter() - inicio) * 1000, 2)
+    return resultado
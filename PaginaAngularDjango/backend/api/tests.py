@@ -1,3 +1,1550 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import hashlib
+import importlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, Group, User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import agregados, autenticacion, cache, db, deltas, eventos, historico, jobs, riesgo
+from .exportar import leer_columnar, stream_columnar
+from .importers import importar_indicadores, importar_tipos_cambio, iter_json
+from .models import (
+    AgregadoRegional, Borrado, ContactMessage, EventoCambio, IndicadorEconomico, Job, Pais, Portafolio, Posicion, Project,
+    TipoCambio, ValorPortafolio,
+)
+from .middleware import LecturasReplicaMiddleware
+from .renderers import FastJSONRenderer
+from .serializers import PaisSerializer
+from .sinteticos import Escala, generar
+from .valuacion import valorar_portafolio
+from .metricas import metricas
+from .permissions import IsAdminRole, IsAnalystOrAdmin, IsViewerOrAbove, get_user_roles
+
+
+def crear_pais(iso="CO", moneda="COP", region=Pais.Region.ANDINA, **extra):
+    defaults = {
+        "nombre": iso,
+        "moneda_codigo": moneda,
+        "moneda_nombre": moneda,
+        "region": region,
+        "latitud": 0.0,
+        "longitud": 0.0,
+        "poblacion": 1000,
+    }
+    defaults.update(extra)
+    return Pais.objects.create(codigo_iso=iso, **defaults)
+
+
+def crear_usuario(username, *grupos):
+    user = User.objects.create_user(username, password="x")
+    for nombre in grupos:
+        user.groups.add(Group.objects.get_or_create(name=nombre)[0])
+    return user
+
+
+class RolesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("viewer", password="x")
+        self.user.groups.add(Group.objects.create(name="VIEWER"))
+        self.user = User.objects.get(pk=self.user.pk)
+
+    def _request(self, user):
+        request = RequestFactory().get("/api/paises/")
+        request.user = user
+        return request
+
+    def test_permisos_resuelven_grupos_una_sola_vez(self):
+        request = self._request(self.user)
+        with self.assertNumQueries(1):
+            self.assertTrue(IsViewerOrAbove().has_permission(request, None))
+            self.assertFalse(IsAnalystOrAdmin().has_permission(request, None))
+            self.assertFalse(IsAdminRole().has_permission(request, None))
+
+    def test_anonimo_no_consulta(self):
+        request = self._request(AnonymousUser())
+        with self.assertNumQueries(0):
+            self.assertFalse(IsViewerOrAbove().has_permission(request, None))
+
+    def test_cambio_de_grupos_invalida(self):
+        self.assertEqual(get_user_roles(self.user), {"VIEWER"})
+        self.user.groups.add(Group.objects.create(name="ADMIN"))
+        self.assertEqual(get_user_roles(self.user), {"VIEWER", "ADMIN"})
+        self.user.groups.clear()
+        self.assertEqual(get_user_roles(self.user), frozenset())
+
+
+class QueryCountTests(TestCase):
+    """
+    El número de queries de cada endpoint no debe crecer con el tamaño del resultado.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("admin", "ADMIN"))
+        self.co = crear_pais("CO", "COP")
+        self.portafolio = Portafolio.objects.create(nombre="P0")
+        self.n = 0
+
+    def _crecer(self):
+        # Agrega filas relacionadas a todo lo que exponen los endpoints
+        for _ in range(5):
+            self.n += 1
+            Project.objects.create(title=f"p{self.n}", description="d")
+            ContactMessage.objects.create(name="n", email="a@b.co", message="m")
+            IndicadorEconomico.objects.create(
+                pais=self.co, tipo="PIB", valor=1.0, unidad="USD", anio=1900 + self.n
+            )
+            TipoCambio.objects.create(
+                moneda_origen="COP", tasa=4000.0, fecha=datetime.date(2020, 1, 1) + datetime.timedelta(days=self.n)
+            )
+            pais = crear_pais(f"X{chr(64 + self.n)}", "USD")
+            Portafolio.objects.create(nombre=f"P{self.n}")
+            Posicion.objects.create(portafolio=self.portafolio, pais=pais, activo=f"A{self.n}")
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def test_queries_constantes_por_endpoint(self):
+        # Los roles ya quedan resueltos en el usuario forzado tras la primera request.
+        # Los endpoints con ETag suman las queries de agregados (1, o 2 en tipo-cambio).
+        # Los listados keyset no hacen COUNT.
+        esperado = {
+            "/api/projects/": 2,
+            "/api/contact-messages/": 1,
+            "/api/indicadores/": 1,
+            "/api/tipos-cambio/": 1,
+            "/api/paises/": 3,
+            "/api/paises/CO/": 3,
+            "/api/paises/CO/indicadores/": 3,
+            "/api/paises/CO/tipo-cambio/": 4,
+            "/api/portafolios/": 3,
+            f"/api/portafolios/{self.portafolio.pk}/": 3,
+            f"/api/portafolios/{self.portafolio.pk}/posiciones/": 2,
+            "/api/auth/me/": 0,
+        }
+        self.client.get("/api/auth/me/")
+        for _ in range(2):
+            self._crecer()
+            self.assertEqual({url: self._queries(url) for url in esperado}, esperado)
+
+
+class ValuacionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        co = crear_pais("CO", "COP", Pais.Region.ANDINA)
+        ar = crear_pais("AR", "ARS", Pais.Region.CONO_SUR)
+        self.portafolio = Portafolio.objects.create(nombre="LATAM")
+        Posicion.objects.create(portafolio=self.portafolio, pais=co, activo="A", moneda="COP",
+                                cantidad=10, precio_unitario=4000, tipo_activo="ACCION")
+        Posicion.objects.create(portafolio=self.portafolio, pais=ar, activo="B", moneda="ARS",
+                                cantidad=1, precio_unitario=1000, tipo_activo="BONO")
+        Posicion.objects.create(portafolio=self.portafolio, pais=co, activo="C", moneda="USD",
+                                cantidad=2, precio_unitario=5, tipo_activo="ETF")
+        hoy = datetime.date(2024, 1, 2)
+        TipoCambio.objects.create(moneda_origen="COP", tasa=0.0005, fecha=hoy - datetime.timedelta(days=1))
+        TipoCambio.objects.create(moneda_origen="COP", tasa=0.00025, fecha=hoy)
+        TipoCambio.objects.create(moneda_origen="ARS", tasa=0.001, fecha=hoy)
+        TipoCambio.objects.create(moneda_origen="EUR", tasa=2.0, fecha=hoy - datetime.timedelta(days=1))
+
+    def test_valuacion_en_usd(self):
+        url = f"/api/portafolios/{self.portafolio.pk}/valuacion/"
+        self.client.get(url)
+        # 2 de agregados para el ETag + portafolio + posiciones + tasas
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        data = response.json()
+        self.assertAlmostEqual(data["total"], 10 + 1 + 10)
+        self.assertEqual([g["clave"] for g in data["por_pais"]], ["CO", "AR"])
+        self.assertAlmostEqual(data["por_region"][0]["valor"], 20)
+        self.assertEqual(data["monedas_sin_tasa"], [])
+
+    def test_valuacion_en_otra_base_y_fecha(self):
+        url = f"/api/portafolios/{self.portafolio.pk}/valuacion/?moneda=eur&fecha=2024-01-01"
+        data = self.client.get(url).json()
+        # Al 2024-01-01 solo existe COP: ARS queda fuera
+        self.assertAlmostEqual(data["total"], (20 + 10) / 2.0)
+        self.assertEqual(data["monedas_sin_tasa"], ["ARS"])
+
+    def test_moneda_base_sin_tasa(self):
+        response = self.client.get(f"/api/portafolios/{self.portafolio.pk}/valuacion/?moneda=JPY")
+        self.assertEqual(response.status_code, 400)
+
+    def test_fecha_invalida(self):
+        for fecha in ("2024-02-30", "hoy"):
+            response = self.client.get(f"/api/portafolios/{self.portafolio.pk}/valuacion/?fecha={fecha}")
+            self.assertEqual(response.status_code, 400, fecha)
+
+
+class RiesgoTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        co = crear_pais("CO", "COP")
+        br = crear_pais("BR", "BRL", Pais.Region.CONO_SUR)
+        self.portafolio = Portafolio.objects.create(nombre="FX")
+        for pais, moneda, cantidad in ((co, "COP", 4_000_000), (br, "BRL", 500), (co, "USD", 100)):
+            Posicion.objects.create(portafolio=self.portafolio, pais=pais, activo=moneda, moneda=moneda,
+                                    cantidad=cantidad, precio_unitario=1)
+
+        rng = np.random.default_rng(7)
+        ruido = rng.normal(0, 0.01, size=(60, 2))
+        ruido[:, 1] += 0.5 * ruido[:, 0]  # BRL correlacionado con COP
+        self.precios = {
+            "COP": 0.00025 * np.exp(np.cumsum(ruido[:, 0])),
+            "BRL": 0.2 * np.exp(np.cumsum(ruido[:, 1])),
+        }
+        inicio = datetime.date(2024, 1, 1)
+        self.fechas = [inicio + datetime.timedelta(days=d) for d in range(60)]
+        TipoCambio.objects.bulk_create(
+            TipoCambio(moneda_origen=moneda, tasa=float(tasa), fecha=fecha)
+            for moneda, serie in self.precios.items()
+            for fecha, tasa in zip(self.fechas, serie)
+            if not (moneda == "BRL" and fecha.day == 10)  # hueco: se rellena con el día anterior
+        )
+        cache.invalidar(cache.TIPOS_CAMBIO)
+        self.url = f"/api/portafolios/{self.portafolio.pk}/riesgo/?desde=2024-01-01&hasta=2024-02-29"
+
+    def _pnl_referencia(self):
+        # Cálculo día a día, sin matrices
+        brl = self.precios["BRL"].copy()
+        for t, fecha in enumerate(self.fechas):
+            if fecha.day == 10:
+                brl[t] = brl[t - 1]
+        series = {"COP": self.precios["COP"], "BRL": brl}
+        exposicion = {m: cantidad * series[m][-1] for m, cantidad in (("COP", 4_000_000), ("BRL", 500))}
+        pnl = []
+        for t in range(1, 60):
+            pnl.append(sum(exposicion[m] * (series[m][t] / series[m][t - 1] - 1) for m in series))
+        return np.array(pnl), sum(exposicion.values()) + 100
+
+    def test_volatilidad_var_y_correlacion(self):
+        data = self.client.get(self.url + "&confianza=0.95").json()
+        pnl, total = self._pnl_referencia()
+        self.assertEqual(data["observaciones"], 59)
+        self.assertAlmostEqual(data["valor_total"], total)
+        self.assertAlmostEqual(data["volatilidad"]["diaria_porcentual"], pnl.std(ddof=1) / total * 100)
+        (var95,) = data["var"]
+        self.assertAlmostEqual(var95["historico"]["var"], -np.quantile(pnl, 0.05))
+        self.assertGreaterEqual(var95["historico"]["cvar"], var95["historico"]["var"])
+        self.assertGreater(var95["parametrico"]["cvar"], var95["parametrico"]["var"])
+        self.assertAlmostEqual(sum(m["contribucion_porcentual"] for m in data["monedas"]), 100)
+
+        correlacion = data["correlacion"]
+        self.assertEqual(correlacion["monedas"], ["BRL", "COP"])
+        self.assertEqual(correlacion["matriz"][0][0], 1.0)
+        self.assertGreater(correlacion["matriz"][0][1], 0.2)
+
+    def test_matriz_de_retornos_cacheada(self):
+        riesgo.calcular_riesgo(self.portafolio, desde=datetime.date(2024, 1, 1), hasta=datetime.date(2024, 2, 29))
+        # Solo posiciones y últimas tasas: la matriz sale de la caché
+        with self.assertNumQueries(2):
+            datos = riesgo.calcular_riesgo(
+                self.portafolio, desde=datetime.date(2024, 1, 1), hasta=datetime.date(2024, 2, 29),
+                confianzas=(0.99,), horizonte=5,
+            )
+        self.assertEqual(datos["horizonte_dias"], 5)
+
+    def test_ventana_por_defecto_cambia_el_etag(self):
+        url = f"/api/portafolios/{self.portafolio.pk}/riesgo/"
+
+        hoy = mock.Mock(return_value=datetime.date(2024, 2, 29))
+        reloj = mock.Mock(date=mock.Mock(today=hoy), timedelta=datetime.timedelta)
+        with mock.patch.object(riesgo, "datetime", reloj):
+            etag = self.client.get(url)["ETag"]
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            # Sin tasas ni posiciones nuevas, al día siguiente la ventana ya es otra
+            hoy.return_value = datetime.date(2024, 3, 1)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_otra_base_y_errores(self):
+        data = self.client.get(self.url + "&moneda=BRL").json()
+        # En base BRL la propia BRL no tiene riesgo y USD sí
+        self.assertEqual(data["correlacion"]["monedas"], ["COP", "USD"])
+        corto = f"/api/portafolios/{self.portafolio.pk}/riesgo/?desde=2024-01-01&hasta=2024-01-10"
+        self.assertEqual(self.client.get(corto).status_code, 400)
+        self.assertEqual(self.client.get(self.url + "&confianza=1.5").status_code, 400)
+        self.assertEqual(self.client.get(self.url + "&moneda=JPY").status_code, 400)
+        invalida = f"/api/portafolios/{self.portafolio.pk}/riesgo/?desde=2024-01-01&hasta=2024-02-30"
+        self.assertEqual(self.client.get(invalida).status_code, 400)
+
+
+class HistoricoPortafolioTests(TestCase):
+    def setUp(self):
+        co = crear_pais("CO", "COP")
+        self.br = crear_pais("BR", "BRL", Pais.Region.CONO_SUR)
+        self.portafolio = Portafolio.objects.create(nombre="Historico")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posiciones = {
+                moneda: Posicion.objects.create(portafolio=self.portafolio, pais=co, activo=moneda, moneda=moneda,
+                                                cantidad=cantidad, precio_unitario=2)
+                for moneda, cantidad in (("COP", 1000), ("BRL", 10), ("USD", 5))
+            }
+        self.dia = {d: datetime.date(2024, 1, d) for d in range(1, 8)}
+        # Cada tasa entra por las señales (y su commit): la tabla se arma de forma incremental
+        for d in range(1, 6):
+            self._tasa("COP", d, 0.0002 + d * 0.00001)
+        for d in (1, 3, 5):
+            self._tasa("BRL", d, 0.2 + d * 0.01)
+
+    def _tasa(self, moneda, dia, tasa):
+        with self.captureOnCommitCallbacks(execute=True):
+            TipoCambio.objects.create(moneda_origen=moneda, fecha=self.dia[dia], tasa=tasa)
+
+    def _valores(self):
+        return dict(ValorPortafolio.objects.filter(portafolio=self.portafolio).values_list("fecha", "valor"))
+
+    def _assert_como_valuacion(self):
+        valores = self._valores()
+        for fecha, valor in valores.items():
+            self.assertAlmostEqual(valor, valorar_portafolio(self.portafolio, fecha=fecha)["total"])
+        return valores
+
+    def test_incremental_igual_a_reconstruir(self):
+        valores = self._assert_como_valuacion()
+        self.assertEqual(sorted(valores), [self.dia[d] for d in range(1, 6)])
+        # Reconstruir desde cero no cambia nada
+        self.assertEqual(historico.recalcular(), 0)
+
+    def test_tasa_solo_recalcula_hasta_la_siguiente(self):
+        antes = self._valores()
+        TipoCambio.objects.filter(moneda_origen="BRL", fecha=self.dia[3]).update(tasa=0.5)  # sin señales
+        # BRL del día 3 rige los días 3 y 4; el 5 tiene su propia tasa
+        self.assertEqual(historico.recalcular_moneda("BRL", self.dia[3]), 2)
+        despues = self._assert_como_valuacion()
+        self.assertEqual({f for f in antes if antes[f] != despues[f]}, {self.dia[3], self.dia[4]})
+
+        self._tasa("COP", 7, 0.0003)
+        self.assertIn(self.dia[7], self._assert_como_valuacion())
+        with self.captureOnCommitCallbacks(execute=True):
+            TipoCambio.objects.get(moneda_origen="COP", fecha=self.dia[7]).delete()
+        self.assertNotIn(self.dia[7], self._valores())
+
+    def test_tasas_recalculan_una_vez_por_moneda(self):
+        with mock.patch.object(historico, "recalcular_moneda", wraps=historico.recalcular_moneda) as recalcular, \
+                self.captureOnCommitCallbacks(execute=True):
+            for fx in TipoCambio.objects.filter(fecha__in=[self.dia[2], self.dia[3], self.dia[4]]):
+                fx.tasa *= 2
+                fx.save()
+        self.assertEqual(
+            sorted(c.args for c in recalcular.call_args_list),
+            [("BRL", self.dia[3], self.dia[3]), ("COP", self.dia[2], self.dia[4])],
+        )
+        self._assert_como_valuacion()
+
+        # Sin campos de la clave en update_fields no hace falta leer la fila anterior
+        fx = TipoCambio.objects.get(moneda_origen="COP", fecha=self.dia[5])
+        fx.tasa = 0.0004
+        with self.assertNumQueries(1):
+            fx.save(update_fields=["tasa"])
+
+    def test_primera_tasa_de_una_moneda_recorta_el_inicio(self):
+        Posicion.objects.create(portafolio=self.portafolio, pais=self.br, activo="ARS", moneda="ars",
+                                cantidad=100, precio_unitario=1)
+        # ARS sin tasas no cuenta; con su primera tasa la serie empieza ese día
+        self.assertEqual(len(self._assert_como_valuacion()), 5)
+        self._tasa("ARS", 4, 0.001)
+        self.assertEqual(sorted(self._assert_como_valuacion()), [self.dia[4], self.dia[5]])
+
+    def test_posiciones_y_portafolios_independientes(self):
+        # Las posiciones recalculan su portafolio al confirmar la transacción
+        otro = Portafolio.objects.create(nombre="Otro")
+        with self.captureOnCommitCallbacks(execute=True):
+            Posicion.objects.create(portafolio=otro, pais=self.br, activo="BRL", moneda="BRL", cantidad=1)
+        valores_otro = dict(otro.historico.values_list("fecha", "valor"))
+
+        self.posiciones["COP"].cantidad = 2000
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posiciones["COP"].save()
+        self._assert_como_valuacion()
+        self.assertEqual(dict(otro.historico.values_list("fecha", "valor")), valores_otro)
+
+        self.posiciones["BRL"].portafolio = otro
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posiciones["BRL"].save()
+        self._assert_como_valuacion()
+        self.assertEqual(len(otro.historico.all()), 3)
+        self.assertNotEqual(dict(otro.historico.values_list("fecha", "valor")), valores_otro)
+
+        # Un solo recálculo por transacción, y ninguno para un portafolio que se borra
+        with mock.patch.object(historico, "recalcular", wraps=historico.recalcular) as recalcular, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.portafolio.posiciones.all().delete()
+        recalcular.assert_called_once_with([self.portafolio.pk])
+        self.assertEqual(self._valores(), {})
+        with mock.patch.object(historico, "recalcular") as recalcular, self.captureOnCommitCallbacks(execute=True):
+            otro.delete()
+        recalcular.assert_not_called()
+
+    def test_portafolio_solo_en_usd(self):
+        # Sin monedas cotizadas: valor constante desde el día de sus posiciones, no una serie vacía
+        dolares = Portafolio.objects.create(nombre="Dólares")
+        with self.captureOnCommitCallbacks(execute=True):
+            Posicion.objects.create(portafolio=dolares, pais=self.br, activo="T-Bill", moneda="usd",
+                                    cantidad=10, precio_unitario=3)
+        self.assertEqual(dict(dolares.historico.values_list("fecha", "valor")), {timezone.localdate(): 30.0})
+        self.assertEqual(historico.recalcular([dolares.pk]), 0)
+
+        # Con una moneda cotizada pasa a las fechas de sus tasas
+        with self.captureOnCommitCallbacks(execute=True):
+            Posicion.objects.create(portafolio=dolares, pais=self.br, activo="BRL", moneda="BRL", cantidad=1)
+        self.assertEqual(sorted(dolares.historico.values_list("fecha", flat=True)), [self.dia[d] for d in (1, 3, 5)])
+
+    def test_importador_recalcula_las_ventanas(self):
+        texto = "moneda_origen,moneda_destino,fecha,tasa\nBRL,USD,2024-01-02,0.4\nCOP,USD,2024-01-06,0.0003\n"
+        reporte = importar_tipos_cambio(io.BytesIO(texto.encode()), "csv")
+        # BRL del día 2 rige solo ese día (el 3 tiene tasa); COP agrega el día 6
+        self.assertEqual(reporte.valores_portafolio_recalculados, 2)
+        self.assertIn(self.dia[6], self._assert_como_valuacion())
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        url = f"/api/portafolios/{self.portafolio.pk}/historico/"
+
+        data = client.get(url, {"desde": "2024-01-02", "hasta": "2024-01-04"}).json()
+        self.assertEqual([p["fecha"] for p in data["serie"]], ["2024-01-02", "2024-01-03", "2024-01-04"])
+
+        brl = client.get(url, {"moneda": "BRL"}).json()
+        usd = self._valores()
+        self.assertAlmostEqual(brl["serie"][1]["valor"], usd[self.dia[2]] / 0.21)
+
+        mensual = client.get(url, {"frecuencia": "mensual"}).json()
+        self.assertEqual(mensual["serie"], [{"fecha": "2024-01-05", "valor": usd[self.dia[5]]}])
+        self.assertEqual(client.get(url, {"frecuencia": "anual"}).status_code, 400)
+        self.assertEqual(client.get(url, {"moneda": "JPY"}).status_code, 400)
+        self.assertEqual(client.get(url, {"desde": "2024-02-30"}).status_code, 400)
+
+
+class SerieTipoCambioTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        crear_pais("CO", "COP")
+        inicio = datetime.date(2024, 1, 1)  # lunes
+        TipoCambio.objects.bulk_create(
+            TipoCambio(moneda_origen="COP", tasa=float(i + 1), fecha=inicio + datetime.timedelta(days=i))
+            for i in range(60)
+        )
+
+    def test_semanal_ohlc(self):
+        data = self.client.get("/api/paises/CO/tipo-cambio/serie/?frecuencia=semanal").json()
+        primera = data["serie"][0]
+        self.assertEqual(primera["fecha"], "2024-01-01")
+        self.assertEqual((primera["apertura"], primera["cierre"], primera["n"]), (1.0, 7.0, 7))
+        self.assertEqual((primera["minimo"], primera["maximo"], primera["promedio"]), (1.0, 7.0, 4.0))
+        self.assertEqual(data["puntos"], 9)
+
+    def test_mensual_con_rango(self):
+        url = "/api/paises/CO/tipo-cambio/serie/?frecuencia=mensual&desde=2024-01-15&hasta=2024-02-10"
+        serie = self.client.get(url).json()["serie"]
+        self.assertEqual([p["fecha"] for p in serie], ["2024-01-01", "2024-02-01"])
+        self.assertEqual(serie[0]["apertura"], 15.0)
+        self.assertEqual(serie[1]["cierre"], 41.0)
+
+    def test_lttb_conserva_extremos(self):
+        serie = self.client.get("/api/paises/CO/tipo-cambio/serie/?frecuencia=lttb&puntos=10").json()["serie"]
+        self.assertEqual(len(serie), 10)
+        self.assertEqual(serie[0]["fecha"], "2024-01-01")
+        self.assertEqual(serie[-1]["tasa"], 60.0)
+
+    def test_frecuencia_invalida(self):
+        response = self.client.get("/api/paises/CO/tipo-cambio/serie/?frecuencia=anual")
+        self.assertEqual(response.status_code, 400)
+
+    def test_fechas_invalidas(self):
+        for query in ("desde=2024-13-01", "hasta=2024-02-30", "desde=enero"):
+            response = self.client.get(f"/api/paises/CO/tipo-cambio/serie/?{query}")
+            self.assertEqual(response.status_code, 400, query)
+
+
+class _RestCountriesStub(BaseHTTPRequestHandler):
+    """
+    Servidor local que imita /v3.1/alpha?codes=... con soporte de ETag.
+    """
+    paises = {}
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        codes = parse_qs(urlparse(self.path).query)["codes"][0].upper().split(",")
+        body = json.dumps([self.paises[c] for c in codes if c in self.paises]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _item_restcountries(iso, nombre, poblacion=100):
+    return {
+        "cca2": iso,
+        "name": {"common": nombre},
+        "currencies": {"XXX": {"name": "Moneda"}},
+        "latlng": [1.0, 2.0],
+        "population": poblacion,
+    }
+
+
+class SyncPaisesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(("127.0.0.1", 0), _RestCountriesStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _RestCountriesStub.paises = {
+            "CO": _item_restcountries("CO", "Colombia"),
+            "BR": _item_restcountries("BR", "Brasil"),
+            "GT": _item_restcountries("GT", "Guatemala"),
+        }
+        _RestCountriesStub.etag = '"v1"'
+        _RestCountriesStub.requests = []
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("admin", "ADMIN"))
+        url = f"http://127.0.0.1:{self.server.server_port}/v3.1/alpha"
+        self.settings_override = self.settings(
+            DATAPULSE_SYNC={"URL": url, "ISO_CODES": ["CO", "BR", "GT"], "BATCH_SIZE": 2}
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def _sync(self, data=None):
+        response = self.client.post("/api/sync/paises/", data or {}, format="json")
+        self.assertEqual(response.status_code, 202)
+        jobs.trabajar("test", una_vez=True)
+        return self.client.get(response["Location"]).json()
+
+    def test_sync_incremental(self):
+        job = self._sync()
+        self.assertEqual(job["estado"], "COMPLETADO")
+        data = job["resultado"]
+        self.assertEqual((data["created"], data["updated"], data["unchanged"]), (3, 0, 0))
+        self.assertEqual((job["procesados"], job["total"]), (2, 2))
+        self.assertEqual(Pais.objects.get(codigo_iso="GT").region, "CENTROAMERICA")
+
+        # Mismo ETag -> 304 en ambos lotes, nada que escribir
+        data = self._sync()["resultado"]
+        self.assertEqual(data["not_modified"], 2)
+        self.assertEqual(_RestCountriesStub.requests[-1].get("If-None-Match"), '"v1"')
+
+        # Nuevo ETag con un solo país cambiado
+        _RestCountriesStub.etag = '"v2"'
+        _RestCountriesStub.paises["BR"] = _item_restcountries("BR", "Brasil", poblacion=200)
+        data = self._sync()["resultado"]
+        self.assertEqual((data["created"], data["updated"], data["unchanged"]), (0, 1, 2))
+        self.assertEqual(Pais.objects.get(codigo_iso="BR").poblacion, 200)
+
+    def test_sync_lista_iso_en_body(self):
+        data = self._sync({"iso": ["co"]})["resultado"]
+        self.assertEqual(data["created"], 1)
+        self.assertEqual(list(Pais.objects.values_list("codigo_iso", flat=True)), ["CO"])
+
+    def test_sync_body_invalido(self):
+        for data in (["CO"], "CO", {"iso": "CO"}, {"iso": ["COL"]}):
+            response = self.client.post("/api/sync/paises/", data, format="json")
+            self.assertEqual(response.status_code, 400, data)
+            self.assertIn("detail", response.json())
+        self.assertFalse(Job.objects.exists())
+
+    def test_sync_fuente_caida_reintenta_con_backoff(self):
+        self.settings_override.disable()
+        with self.settings(DATAPULSE_SYNC={"URL": "http://127.0.0.1:9/v3.1/alpha", "TIMEOUT": 1},
+                           DATAPULSE_JOBS={"MAX_INTENTOS": 2, "BACKOFF_S": 0}), self.assertLogs("api.jobs", "WARNING"):
+            job = self._sync()
+            self.assertEqual((job["estado"], job["intentos"]), ("FALLIDO", 2))
+        self.settings_override.enable()
+        self.assertEqual([e["intento"] for e in job["errores"]], [1, 2])
+        self.assertIn("SyncError", job["errores"][0]["error"])
+
+    def test_backoff_entre_intentos(self):
+        with self.settings(DATAPULSE_JOBS={"BACKOFF_S": 60}):
+            job, _ = jobs.encolar(Job.Tipo.SYNC_PAISES, {"iso": None, "forzar": False})
+            with self.settings(DATAPULSE_SYNC={"URL": "http://127.0.0.1:9/v3.1/alpha", "TIMEOUT": 1}), \
+                    self.assertLogs("api.jobs", "WARNING"):
+                self.assertEqual(jobs.trabajar("test", una_vez=True), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.estado, job.intentos), ("PENDIENTE", 1))
+        self.assertGreater(job.disponible_desde, job.iniciado)
+        # Hasta que pase el backoff nadie lo toma
+        self.assertIsNone(jobs.tomar("otro"))
+
+    def test_deduplicacion(self):
+        primero = self.client.post("/api/sync/paises/", {"iso": ["CO", "BR"]}, format="json").json()
+        segundo = self.client.post("/api/sync/paises/", {"iso": ["br", "co"]}, format="json").json()
+        self.assertEqual((primero["id"], primero["duplicado"]), (segundo["id"], False))
+        self.assertTrue(segundo["duplicado"])
+        self.assertEqual(Job.objects.count(), 1)
+
+        # Terminado el job, un nuevo pedido vuelve a encolar
+        jobs.trabajar("test", una_vez=True)
+        tercero = self.client.post("/api/sync/paises/", {"iso": ["CO", "BR"]}, format="json").json()
+        self.assertNotEqual(tercero["id"], primero["id"])
+
+    def test_job_abandonado_se_retoma(self):
+        job, _ = jobs.encolar(Job.Tipo.SYNC_PAISES, {"iso": ["CO"], "forzar": False})
+        self.assertIsNotNone(jobs.tomar("caido"))
+        self.assertIsNone(jobs.tomar("otro"))
+        Job.objects.filter(pk=job.pk).update(latido=job.creado - datetime.timedelta(hours=1))
+        retomado = jobs.tomar("otro")
+        self.assertEqual((retomado.pk, retomado.intentos), (job.pk, 2))
+        jobs.ejecutar(retomado)
+        self.assertEqual(Job.objects.get(pk=job.pk).estado, "COMPLETADO")
+
+    def test_jobs_solo_admin(self):
+        self.client.post("/api/sync/paises/", {}, format="json")
+        self.assertEqual(self.client.get("/api/jobs/?estado=PENDIENTE").json()["count"], 1)
+        self.client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        self.assertEqual(self.client.get("/api/jobs/").status_code, 403)
+
+
+class VistasAsyncTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(("127.0.0.1", 0), _RestCountriesStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        co = crear_pais("CO", "COP")
+        crear_pais("BR", "BRL", region=Pais.Region.CONO_SUR)
+        IndicadorEconomico.objects.create(pais=co, tipo="PIB", valor=1, unidad="USD", anio=2023)
+        TipoCambio.objects.create(moneda_origen="COP", tasa=0.00025, fecha=datetime.date(2024, 1, 1))
+        TipoCambio.objects.create(moneda_origen="COP", tasa=0.00026, fecha=datetime.date(2024, 1, 2))
+        self.viewer = {"Authorization": f"Bearer {AccessToken.for_user(crear_usuario('viewer', 'VIEWER'))}"}
+        self.admin = {"Authorization": f"Bearer {AccessToken.for_user(crear_usuario('admin', 'ADMIN'))}"}
+        _RestCountriesStub.paises = {"CO": _item_restcountries("CO", "Colombia", poblacion=5)}
+        _RestCountriesStub.etag = '"v1"'
+        _RestCountriesStub.requests = []
+
+    async def test_lecturas(self):
+        self.assertEqual((await self.async_client.get("/api/async/paises/")).status_code, 401)
+        resp = await self.async_client.get("/api/async/paises/?region=ANDINA", headers=self.viewer)
+        self.assertEqual([p["codigo_iso"] for p in resp.json()], ["CO"])
+
+        data = (await self.async_client.get("/api/async/paises/CO/", headers=self.viewer)).json()
+        self.assertEqual(data["indicadores"][0]["tipo"], "PIB")
+        self.assertEqual((await self.async_client.get("/api/async/paises/ZZ/", headers=self.viewer)).status_code, 404)
+
+        data = (await self.async_client.get("/api/async/paises/CO/tipo-cambio/", headers=self.viewer)).json()
+        self.assertEqual(data["fecha"], "2024-01-02")
+        resp = await self.async_client.get("/api/async/tipos-cambio/?moneda_origen=COP&limite=1", headers=self.viewer)
+        self.assertEqual([fx["fecha"] for fx in resp.json()], ["2024-01-02"])
+        resp = await self.async_client.get("/api/async/tipos-cambio/?hasta=2024-02-30", headers=self.viewer)
+        self.assertEqual(resp.status_code, 400)
+
+    async def test_sync_varias_fuentes(self):
+        buena = f"http://127.0.0.1:{self.server.server_port}/v3.1/alpha"
+        config = {"FUENTES": ["http://127.0.0.1:9/v3.1/alpha", buena], "ISO_CODES": ["CO"], "TIMEOUT": 1}
+        with self.settings(DATAPULSE_SYNC=config):
+            resp = await self.async_client.post("/api/async/sync/paises/", {}, content_type="application/json",
+                                                headers=self.viewer)
+            self.assertEqual(resp.status_code, 403)
+            resp = await self.async_client.post("/api/async/sync/paises/", {"iso": ["co"]},
+                                                content_type="application/json", headers=self.admin)
+            # Encola el mismo job que /api/sync/paises/: un pedido equivalente es duplicado
+            self.assertEqual(resp.status_code, 202)
+            job = resp.json()
+            self.assertEqual(resp["Location"], job["url"])
+            self.assertEqual(job["parametros"], {"iso": ["CO"], "forzar": False})
+            resp = await self.async_client.post("/api/sync/paises/", {"iso": ["CO"]},
+                                                content_type="application/json", headers=self.admin)
+            self.assertEqual((resp.status_code, resp.json()["id"], resp.json()["duplicado"]), (202, job["id"], True))
+            resp = await self.async_client.post("/api/async/sync/paises/", ["CO"],
+                                                content_type="application/json", headers=self.admin)
+            self.assertEqual(resp.status_code, 400)
+
+            await sync_to_async(jobs.trabajar)("test", una_vez=True)
+        job = await Job.objects.aget(pk=job["id"])
+        self.assertEqual((job.estado, job.resultado["updated"]), (Job.Estado.COMPLETADO, 1))
+        self.assertEqual((await Pais.objects.aget(codigo_iso="CO")).poblacion, 5)
+        self.assertEqual(len(_RestCountriesStub.requests), 1)
+
+
+@override_settings(DATAPULSE_EVENTOS={"KEEPALIVE_S": 1, "DURACION_MAX_S": 10})
+class EventosSSETests(TestCase):
+    def setUp(self):
+        eventos.bus.reiniciar()  # los ids de la tabla vuelven atrás con el rollback de cada test
+        self.viewer = {"Authorization": f"Bearer {AccessToken.for_user(crear_usuario('viewer', 'VIEWER'))}"}
+
+    def _crear_fx(self, tasa, dia):
+        with self.captureOnCommitCallbacks(execute=True):
+            TipoCambio.objects.create(moneda_origen="COP", tasa=tasa, fecha=datetime.date(2024, 1, dia))
+
+    async def _siguiente_evento(self, stream):
+        while (bloque := await anext(stream)).startswith(b":"):
+            pass  # keepalive
+        return bloque
+
+    async def test_stream_y_reanudar(self):
+        resp = await self.async_client.get("/api/eventos/?canales=tipos_cambio", headers=self.viewer)
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        stream = aiter(resp.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+
+        await sync_to_async(self._crear_fx)(4000.0, 1)
+        bloque = await self._siguiente_evento(stream)
+        primero = bloque.split(b"\n")[0].removeprefix(b"id: ").decode()
+        datos = json.loads(bloque.split(b"data: ")[1])
+        self.assertEqual(datos["filas"], [["COP", "USD", "2024-01-01", 4000.0]])
+        await stream.aclose()
+
+        # Lo publicado mientras el cliente estaba desconectado llega al reanudar
+        await sync_to_async(self._crear_fx)(4100.0, 2)
+        resp = await self.async_client.get(
+            "/api/eventos/", headers={**self.viewer, "Last-Event-ID": primero}
+        )
+        stream = aiter(resp.streaming_content)
+        await anext(stream)
+        datos = json.loads((await self._siguiente_evento(stream)).split(b"data: ")[1])
+        self.assertEqual(datos["filas"][0][2:], ["2024-01-02", 4100.0])
+        await stream.aclose()
+
+    async def test_eventos_de_otro_proceso(self):
+        # Una fila escrita por el worker u otro servidor (sin aviso en este proceso) llega por el sondeo
+        with self.settings(DATAPULSE_EVENTOS={"POLL_S": 0.05}):
+            resp = await self.async_client.get("/api/eventos/?canales=indicadores", headers=self.viewer)
+            stream = aiter(resp.streaming_content)
+            await anext(stream)
+            cuerpo = json.dumps({"canal": "indicadores", "columnas": [], "filas": [["CO", "PIB", 2024, 1.0]]})
+            evento = await EventoCambio.objects.acreate(canal=eventos.INDICADORES, cuerpo=cuerpo)
+            bloque = await self._siguiente_evento(stream)
+            await stream.aclose()
+        self.assertTrue(bloque.startswith(b"id: %d\nevent: indicadores\n" % evento.pk))
+
+    async def test_id_desconocido_pide_reset(self):
+        resp = await self.async_client.get(
+            f"/api/eventos/?token={self.viewer['Authorization'].split()[1]}", headers={"Last-Event-ID": "otra-7"}
+        )
+        stream = aiter(resp.streaming_content)
+        await anext(stream)
+        self.assertIn(b"event: reset", await anext(stream))
+        await stream.aclose()
+
+    async def test_validaciones(self):
+        self.assertEqual((await self.async_client.get("/api/eventos/")).status_code, 401)
+        resp = await self.async_client.get("/api/eventos/?canales=paises", headers=self.viewer)
+        self.assertEqual(resp.status_code, 400)
+
+    def test_importador_publica_un_evento_por_lote(self):
+        antes = EventoCambio.objects.count()
+        texto = "moneda_origen,moneda_destino,fecha,tasa\n" + "".join(
+            f"BRL,USD,2024-01-{d:02d},5\n" for d in range(1, 6)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            importar_tipos_cambio(io.BytesIO(texto.encode()), "csv", chunk_size=2)
+        self.assertEqual(EventoCambio.objects.count() - antes, 3)
+
+    def test_cliente_lento_se_corta(self):
+        suscripcion = eventos.Suscripcion(None, [eventos.TIPOS_CAMBIO], maximo=1)
+        evento = eventos.Evento(1, eventos.TIPOS_CAMBIO, b"")
+        suscripcion._entregar(evento)
+        suscripcion._entregar(evento)
+        self.assertIsNone(async_to_sync(suscripcion.siguientes)(0))
+
+
+class ImportarIndicadoresTests(TestCase):
+    def setUp(self):
+        crear_pais("CO", "COP")
+        crear_pais("BR", "BRL")
+
+    def test_csv_propio_upsert(self):
+        IndicadorEconomico.objects.create(
+            pais=Pais.objects.get(codigo_iso="CO"), tipo="PIB", valor=1.0, unidad="USD", anio=2020
+        )
+        csv_texto = (
+            "codigo_iso,tipo,unidad,anio,valor\n"
+            "CO,PIB,USD,2020,10\n"
+            "CO,PIB,USD,2021,11\n"
+            "BR,INFLACION,PORCENTAJE,2021,4.5\n"
+            "XX,PIB,USD,2021,1\n"
+            "BR,PIB,USD,abc,1\n"
+        )
+        reporte = importar_indicadores(io.BytesIO(csv_texto.encode()), "csv", chunk_size=2)
+        self.assertEqual(
+            (reporte.leidas, reporte.insertadas, reporte.actualizadas, reporte.rechazadas, reporte.lotes),
+            (5, 2, 1, 2, 3),
+        )
+        self.assertEqual(IndicadorEconomico.objects.get(pais__codigo_iso="CO", anio=2020).valor, 10.0)
+
+    def test_json_world_bank(self):
+        registros = [
+            {"page": 1, "pages": 1, "per_page": 50, "total": 3},
+            [
+                {"indicator": {"id": "NY.GDP.MKTP.CD"}, "country": {"id": "CO"}, "countryiso3code": "COL",
+                 "date": "2022", "value": 3.4e11},
+                {"indicator": {"id": "FP.CPI.TOTL.ZG"}, "country": {"id": "BR"}, "countryiso3code": "BRA",
+                 "date": "2022", "value": 9.3},
+                {"indicator": {"id": "FP.CPI.TOTL.ZG"}, "country": {"id": "BR"}, "countryiso3code": "BRA",
+                 "date": "2023", "value": None},
+            ],
+        ]
+        stream = io.BytesIO(json.dumps(registros).encode())
+        reporte = importar_indicadores(stream, "json")
+        self.assertEqual((reporte.insertadas, reporte.rechazadas), (2, 1))
+        pib = IndicadorEconomico.objects.get(pais__codigo_iso="CO")
+        self.assertEqual((pib.tipo, pib.unidad, pib.fuente), ("PIB", "USD", "WORLD_BANK"))
+
+    def test_json_lines_en_buffer_pequeno(self):
+        lineas = "\n".join(
+            json.dumps({"codigo_iso": "CO", "tipo": "DESEMPLEO", "unidad": "PORCENTAJE", "anio": 2000 + i, "valor": i})
+            for i in range(50)
+        )
+        filas = list(iter_json(io.StringIO(lineas), tamano_buffer=64))
+        self.assertEqual(len(filas), 50)
+
+    def test_csv_ancho_world_bank(self):
+        csv_texto = (
+            '"Data Source","World Development Indicators",\n\n'
+            '"Last Updated Date","2024-06-28",\n\n'
+            '"Country Name","Country Code","Indicator Name","Indicator Code","2019","2020",\n'
+            '"Colombia","COL","Unemployment","SL.UEM.TOTL.ZS","9.9","15.0",\n'
+            '"Aruba","ABW","Unemployment","SL.UEM.TOTL.ZS","","",\n'
+        )
+        reporte = importar_indicadores(io.BytesIO(csv_texto.encode()), "csv")
+        self.assertEqual((reporte.insertadas, reporte.rechazadas), (2, 0))
+
+    def test_endpoint_admin(self):
+        client = APIClient()
+        client.force_authenticate(crear_usuario("analista", "ANALISTA"))
+        contenido = b"codigo_iso,tipo,unidad,anio,valor\nCO,PIB,USD,2020,1\n"
+        archivo = SimpleUploadedFile("ind.csv", contenido)
+        self.assertEqual(client.post("/api/importar/indicadores/", {"archivo": archivo}).status_code, 403)
+
+        client.force_authenticate(crear_usuario("admin", "ADMIN"))
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            archivo.seek(0)
+            response = client.post("/api/importar/indicadores/", {"archivo": archivo})
+            self.assertEqual(response.status_code, 202)
+            # El archivo espera al worker en el storage, no en la fila del job
+            pendiente = Job.objects.get()
+            self.assertEqual(pendiente.archivo_sha256, hashlib.sha256(contenido).hexdigest())
+            ruta = Path(media) / pendiente.archivo.name
+            self.assertEqual(ruta.read_bytes(), contenido)
+            archivo.seek(0)
+            self.assertTrue(client.post("/api/importar/indicadores/", {"archivo": archivo}).json()["duplicado"])
+            self.assertEqual(len(list(ruta.parent.iterdir())), 1)
+
+            jobs.trabajar("test", una_vez=True)
+            self.assertFalse(ruta.exists())
+        job = client.get(response["Location"]).json()
+        self.assertEqual((job["estado"], job["resultado"]["insertadas"], job["procesados"]), ("COMPLETADO", 1, 1))
+        self.assertFalse(Job.objects.get().archivo)
+
+    def test_endpoint_formato_invalido(self):
+        client = APIClient()
+        client.force_authenticate(crear_usuario("admin", "ADMIN"))
+        archivo = SimpleUploadedFile("ind.csv", b"x")
+        response = client.post("/api/importar/indicadores/", {"archivo": archivo, "formato": "xml"})
+        self.assertEqual(response.status_code, 400)
+        archivo.seek(0)
+        response = client.post("/api/importar/indicadores/", {"archivo": archivo, "fuente": "OTRA"})
+        self.assertEqual(response.json(), {"detail": "Fuente desconocida: OTRA"})
+        self.assertFalse(Job.objects.exists())
+
+
+class ImportarTiposCambioTests(TestCase):
+    def _importar(self, filas):
+        texto = "moneda_origen,moneda_destino,fecha,tasa\n" + "".join(f"{f}\n" for f in filas)
+        return importar_tipos_cambio(io.BytesIO(texto.encode()), "csv", chunk_size=2)
+
+    def _variaciones(self):
+        return list(
+            TipoCambio.objects.filter(moneda_origen="COP").order_by("fecha").values_list("variacion_porcentual", flat=True)
+        )
+
+    def test_variacion_porcentual(self):
+        reporte = self._importar([
+            "COP,USD,2024-01-01,100",
+            "COP,USD,2024-01-03,121",
+            "COP,USD,2024-01-02,110",
+            "BRL,USD,2024-01-01,5",
+            "BRL,USD,2024-01-01,abc",
+        ])
+        self.assertEqual((reporte.insertadas, reporte.rechazadas), (4, 1))
+        self.assertEqual(self._variaciones()[0], None)
+        self.assertAlmostEqual(self._variaciones()[1], 10.0)
+        self.assertAlmostEqual(self._variaciones()[2], 10.0)
+
+    def test_dato_tardio_recalcula_solo_la_ventana(self):
+        self._importar([f"COP,USD,2024-01-{d:02d},{100 + d}" for d in range(1, 11) if d != 5])
+        with CaptureQueriesContext(connection) as ctx:
+            reporte = self._importar(["COP,USD,2024-01-05,50"])
+        # Cambian el día 5 y el 6 (que ahora compara contra el 5)
+        self.assertEqual((reporte.insertadas, reporte.variaciones_recalculadas), (1, 2))
+        self.assertAlmostEqual(self._variaciones()[4], (50 / 104 - 1) * 100)
+        self.assertAlmostEqual(self._variaciones()[5], (106 / 50 - 1) * 100)
+        self.assertLess(len(ctx.captured_queries), 15)
+
+
+@override_settings(DATAPULSE_DELTAS={"SOLAPE_S": 0})
+class DeltasTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        self.co = crear_pais("CO", "COP")
+        crear_pais("BR", "BRL", Pais.Region.CONO_SUR)
+        crear_pais("XX", "XXX", activo=False)
+
+    def _cambios(self, recurso, since=None, **params):
+        if since:
+            params["since"] = since
+        resp = self.client.get(f"/api/cambios/{recurso}/", params)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()
+
+    def test_copia_inicial_y_deltas(self):
+        inicial = self._cambios("paises")
+        self.assertEqual(sorted(p["codigo_iso"] for p in inicial["cambios"]), ["BR", "CO"])
+        self.assertEqual((inicial["borrados"], inicial["mas"], inicial["clave"]), ([], False, "codigo_iso"))
+        self.assertEqual(self._cambios("paises", inicial["since"])["cambios"], [])
+
+        self.co.poblacion = 5
+        self.co.save()
+        Pais.objects.filter(codigo_iso="BR").update(activo=False)  # sin auto_now: no se ve
+        br = Pais.objects.get(codigo_iso="BR")
+        br.save()
+        delta = self._cambios("paises", inicial["since"])
+        self.assertEqual([(p["codigo_iso"], p["poblacion"]) for p in delta["cambios"]], [("CO", 5)])
+        self.assertEqual(delta["borrados"], ["BR"])
+
+    def test_borrados_con_lapidas(self):
+        portafolio = Portafolio.objects.create(nombre="P")
+        posicion = Posicion.objects.create(portafolio=portafolio, pais=self.co, activo="A")
+        marcas = {r: self._cambios(r)["since"] for r in ("portafolios", "posiciones")}
+
+        pk = portafolio.pk
+        portafolio.delete()  # las posiciones caen en cascada
+        self.assertEqual(self._cambios("portafolios", marcas["portafolios"])["borrados"], [str(pk)])
+        self.assertEqual(self._cambios("posiciones", marcas["posiciones"])["borrados"], [str(posicion.pk)])
+
+        # Un país borrado y vuelto a crear no se informa como borrado
+        marca = self._cambios("paises")["since"]
+        Pais.objects.filter(codigo_iso="BR").delete()
+        crear_pais("BR", "BRL", Pais.Region.CONO_SUR)
+        delta = self._cambios("paises", marca)
+        self.assertEqual(([p["codigo_iso"] for p in delta["cambios"]], delta["borrados"]), (["BR"], []))
+
+    def test_paginas_con_el_mismo_momento(self):
+        TipoCambio.objects.bulk_create(
+            TipoCambio(moneda_origen="COP", fecha=datetime.date(2024, 1, d), tasa=1) for d in range(1, 8)
+        )
+        # Todas con el mismo fecha_actualizacion, como deja recalcular_variaciones
+        ahora = timezone.now()
+        TipoCambio.objects.update(fecha_actualizacion=ahora)
+        vistos, since, paginas = [], None, 0
+        while True:
+            pagina = self._cambios("tipos_cambio", since, limite=3)
+            vistos += [fx["id"] for fx in pagina["cambios"]]
+            since, paginas = pagina["since"], paginas + 1
+            if not pagina["mas"]:
+                break
+        self.assertEqual(paginas, 3)
+        self.assertEqual(sorted(vistos), sorted(TipoCambio.objects.values_list("pk", flat=True)))
+
+    def test_solape_y_errores(self):
+        with self.settings(DATAPULSE_DELTAS={"SOLAPE_S": 60}):
+            inicial = self._cambios("paises")
+            # Lo escrito en el último minuto se vuelve a mandar (puede haber transacciones en vuelo)
+            self.assertEqual(len(self._cambios("paises", inicial["since"])["cambios"]), 2)
+
+        self.assertEqual(self.client.get("/api/cambios/paises/", {"since": "x"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/cambios/usuarios/").status_code, 404)
+        vieja = timezone.now() - datetime.timedelta(days=90)
+        since = deltas.codificar({"c": (vieja, 0), "b": (vieja, 0)})
+        self.assertEqual(self.client.get("/api/cambios/paises/", {"since": since}).status_code, 410)
+
+        Borrado.objects.create(recurso="paises", clave="ZZ")
+        Borrado.objects.update(borrado=vieja)
+        self.assertEqual(deltas.purgar(), 1)
+
+
+class CacheRespuestasTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        self.co = crear_pais("CO", "COP")
+
+    def test_lista_cacheada_e_invalidada_por_senal(self):
+        self.client.get("/api/paises/")
+        # Solo queda la query de agregados del ETag
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/paises/").json()["count"], 1)
+
+        crear_pais("BR", "BRL")
+        self.assertEqual(self.client.get("/api/paises/").json()["count"], 2)
+
+    def test_importador_invalida_indicadores(self):
+        url = "/api/paises/CO/indicadores/"
+        self.assertEqual(self.client.get(url).json(), [])
+        importar_indicadores(io.BytesIO(b"codigo_iso,tipo,unidad,anio,valor\nCO,PIB,USD,2020,1\n"), "csv")
+        self.assertEqual(len(self.client.get(url).json()), 1)
+
+    def test_versiones_en_cache_de_archivos(self):
+        with tempfile.TemporaryDirectory() as tmp, self.settings(
+            CACHES={**settings.CACHES, "archivos": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tmp,
+            }},
+            DATAPULSE_CACHE={"ALIAS": "archivos"},
+        ):
+            vistas = {tuple(cache.versiones(cache.PAISES))}
+            cache.invalidar(cache.PAISES)
+            vistas.add(tuple(cache.versiones(cache.PAISES)))
+            # La versión no vence con el TIMEOUT por defecto del backend
+            with mock.patch("django.core.cache.backends.filebased.time.time", return_value=time.time() + 86400):
+                self.assertIn(tuple(cache.versiones(cache.PAISES)), vistas)
+            # Descartada por la caché, la siguiente no repite ninguna anterior
+            caches["archivos"].delete("datapulse:v:paises")
+            vistas.add(tuple(cache.versiones(cache.PAISES)))
+            cache.invalidar(cache.PAISES)
+            vistas.add(tuple(cache.versiones(cache.PAISES)))
+            self.assertEqual(len(vistas), 4)
+
+    def test_cache_respeta_permisos(self):
+        self.client.get("/api/paises/")
+        sin_rol = APIClient()
+        sin_rol.force_authenticate(crear_usuario("nadie"))
+        self.assertEqual(sin_rol.get("/api/paises/").status_code, 403)
+
+
+class GetCondicionalTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        self.co = crear_pais("CO", "COP")
+        self.portafolio = Portafolio.objects.create(nombre="P")
+
+    def test_etag_304_y_cambio(self):
+        for url in ["/api/paises/", "/api/paises/CO/indicadores/", f"/api/portafolios/{self.portafolio.pk}/"]:
+            response = self.client.get(url)
+            etag = response["ETag"]
+            self.assertNotIn("Last-Modified", response)
+
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.content, b"")
+
+        # Un cambio en los datos invalida el ETag
+        etag = self.client.get("/api/paises/CO/indicadores/")["ETag"]
+        IndicadorEconomico.objects.create(pais=self.co, tipo="PIB", valor=1.0, unidad="USD", anio=2020)
+        self.assertEqual(self.client.get("/api/paises/CO/indicadores/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_borrado_invalida_etag(self):
+        # Borrar no mueve el MAX de las fechas: If-Modified-Since solo daría 304 con datos viejos
+        crear_pais("PE", "PEN")
+        etag = self.client.get("/api/paises/")["ETag"]
+        Pais.objects.filter(codigo_iso="PE").delete()
+        futuro = "Fri, 01 Jan 2100 00:00:00 GMT"
+        response = self.client.get("/api/paises/", HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=futuro)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/api/paises/", HTTP_IF_MODIFIED_SINCE=futuro).status_code, 200)
+
+    def test_etag_de_valuacion_solo_mira_sus_monedas(self):
+        Posicion.objects.create(portafolio=self.portafolio, pais=self.co, activo="X", moneda="cop", cantidad=1)
+        TipoCambio.objects.create(moneda_origen="COP", tasa=0.00025, fecha=datetime.date(2024, 1, 1))
+        url = f"/api/portafolios/{self.portafolio.pk}/valuacion/"
+        etag = self.client.get(url)["ETag"]
+        TipoCambio.objects.create(moneda_origen="BRL", tasa=0.2, fecha=datetime.date(2024, 1, 1))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url + "?moneda=BRL", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        TipoCambio.objects.filter(moneda_origen="COP").delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_distinto_por_query_params(self):
+        a = self.client.get("/api/paises/")["ETag"]
+        b = self.client.get("/api/paises/?region=ANDINA")["ETag"]
+        self.assertNotEqual(a, b)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("admin", "ADMIN"))
+        inicio = datetime.date(2024, 1, 1)
+        # Dos pares por fecha: empates en -fecha que el cursor debe resolver por pk
+        TipoCambio.objects.bulk_create(
+            TipoCambio(moneda_origen=moneda, tasa=1.0, fecha=inicio + datetime.timedelta(days=i))
+            for i in range(12)
+            for moneda in ("COP", "BRL")
+        )
+
+    def _recorrer(self, url):
+        vistos, paginas = [], 0
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.client.get(url).json()
+            self.assertNotIn("COUNT", " ".join(q["sql"] for q in ctx.captured_queries))
+            vistos += [r["id"] for r in data["results"]]
+            url, paginas = data["next"], paginas + 1
+        return vistos, paginas, data
+
+    def test_recorre_todo_sin_repetir(self):
+        vistos, paginas, _ = self._recorrer("/api/tipos-cambio/?page_size=5")
+        esperado = list(TipoCambio.objects.order_by("-fecha", "-pk").values_list("id", flat=True))
+        self.assertEqual(vistos, esperado)
+        self.assertEqual(paginas, 5)
+
+    def test_pagina_anterior(self):
+        primera = self.client.get("/api/tipos-cambio/?page_size=5").json()
+        segunda = self.client.get(primera["next"]).json()
+        self.assertEqual(self.client.get(segunda["previous"]).json()["results"], primera["results"])
+        self.assertIsNone(primera["previous"])
+
+    def test_filtros_y_tope_de_page_size(self):
+        data = self.client.get("/api/tipos-cambio/?moneda_origen=cop&page_size=100000").json()
+        self.assertEqual(data["page_size"], 500)
+        self.assertEqual(len(data["results"]), 12)
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get("/api/tipos-cambio/?cursor=xyz").status_code, 404)
+        for valores in (["xx", 1], [None, 1], ["2024-01-01", None]):
+            cursor = base64.urlsafe_b64encode(json.dumps({"v": valores}).encode()).decode()
+            response = self.client.get(f"/api/tipos-cambio/?cursor={cursor}")
+            self.assertEqual(response.status_code, 404, valores)
+
+    def test_posiciones_de_portafolio(self):
+        portafolio = Portafolio.objects.create(nombre="P")
+        pais = crear_pais("CO", "COP")
+        for i in range(7):
+            Posicion.objects.create(portafolio=portafolio, pais=pais, activo=f"A{i}")
+        vistos, paginas, _ = self._recorrer(f"/api/portafolios/{portafolio.pk}/posiciones/?page_size=3")
+        self.assertEqual((len(vistos), paginas), (7, 3))
+
+
+class PaisesBulkTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        for i, (iso, moneda) in enumerate([("CO", "COP"), ("BR", "BRL"), ("MX", "MXN")]):
+            pais = crear_pais(iso, moneda)
+            for anio in (2020, 2021):
+                IndicadorEconomico.objects.create(pais=pais, tipo="PIB", valor=float(i), unidad="USD", anio=anio)
+            for dia in (1, 2, 3):
+                TipoCambio.objects.create(moneda_origen=moneda, tasa=float(dia), fecha=datetime.date(2024, 1, dia))
+
+    def test_bulk_queries_constantes(self):
+        self.client.get("/api/auth/me/")
+        with self.assertNumQueries(3):
+            data = self.client.get("/api/paises/bulk/?iso=co,BR,MX,ZZ").json()
+        self.assertEqual(sorted(data["paises"]), ["BR", "CO", "MX"])
+        self.assertEqual(data["faltantes"], ["ZZ"])
+        co = data["paises"]["CO"]
+        self.assertEqual([i["anio"] for i in co["indicadores"]], [2021, 2020])
+        self.assertEqual((co["fx"]["tasa"], co["fx"]["fecha"]), (3.0, "2024-01-03"))
+
+    def test_bulk_include_parcial_y_validacion(self):
+        data = self.client.get("/api/paises/bulk/?iso=CO&include=fx").json()
+        self.assertNotIn("indicadores", data["paises"]["CO"])
+        self.assertEqual(self.client.get("/api/paises/bulk/").status_code, 400)
+        self.assertEqual(self.client.get("/api/paises/bulk/?iso=CO&include=otro").status_code, 400)
+
+
+class AgregadosRegionalesTests(TestCase):
+    def setUp(self):
+        self.co = crear_pais("CO", "COP", "ANDINA", poblacion=50)
+        self.pe = crear_pais("PE", "PEN", "ANDINA", poblacion=30)
+        self.ar = crear_pais("AR", "ARS", "CONO_SUR", poblacion=20)
+        # Las señales recalculan al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            for pais, valor in ((self.co, 10.0), (self.pe, 2.0), (self.ar, 6.0)):
+                IndicadorEconomico.objects.create(
+                    pais=pais, tipo="INFLACION", valor=valor, unidad="PORCENTAJE", anio=2022
+                )
+
+    def agregado(self, region, anio=2022):
+        return AgregadoRegional.objects.get(region=region, tipo="INFLACION", anio=anio)
+
+    def test_estadisticas_por_region_y_latam(self):
+        andina = self.agregado("ANDINA")
+        self.assertEqual((andina.paises, andina.promedio, andina.mediana), (2, 6.0, 6.0))
+        self.assertAlmostEqual(andina.promedio_ponderado, (10 * 50 + 2 * 30) / 80)
+        self.assertEqual([r["codigo_iso"] for r in andina.ranking], ["CO", "PE"])
+        latam = self.agregado("LATAM")
+        self.assertEqual((latam.paises, latam.minimo, latam.maximo, latam.mediana), (3, 2.0, 10.0, 6.0))
+
+    def test_mantenimiento_incremental(self):
+        indicador = IndicadorEconomico.objects.get(pais=self.pe)
+        indicador.anio = 2021
+        with self.captureOnCommitCallbacks(execute=True):
+            indicador.save()
+        self.assertEqual(self.agregado("ANDINA").paises, 1)
+        self.assertEqual(self.agregado("ANDINA", 2021).paises, 1)
+
+        self.ar.activo = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ar.save()
+        self.assertFalse(AgregadoRegional.objects.filter(region="CONO_SUR").exists())
+
+        csv_texto = "codigo_iso,tipo,unidad,anio,valor\nPE,INFLACION,PORCENTAJE,2022,4\n"
+        importar_indicadores(io.BytesIO(csv_texto.encode()), "csv")
+        self.assertEqual(self.agregado("ANDINA").ranking[1], {"codigo_iso": "PE", "valor": 4.0, "posicion": 2})
+
+        IndicadorEconomico.objects.filter(anio=2021).delete()
+        self.assertEqual(agregados.recalcular(), 2)
+        self.assertFalse(AgregadoRegional.objects.filter(anio=2021).exists())
+
+    def test_borrar_pais_recalcula_una_vez(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for anio in range(2000, 2020):
+                IndicadorEconomico.objects.create(pais=self.co, tipo="PIB", valor=anio, unidad="USD", anio=anio)
+        self.assertEqual(AgregadoRegional.objects.filter(tipo="PIB").count(), 40)
+        # Las consultas no dependen de cuántos indicadores tenga el país
+        with CaptureQueriesContext(connection) as ctx, mock.patch.object(eventos, "publicar") as publicar, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.co.delete()
+        self.assertLess(len(ctx.captured_queries), 20)
+
+        self.assertEqual(Borrado.objects.filter(recurso="indicadores").count(), 21)
+        self.assertTrue(Borrado.objects.filter(recurso="paises", clave="CO").exists())
+        self.assertFalse(AgregadoRegional.objects.filter(tipo="PIB").exists())
+        self.assertEqual((self.agregado("ANDINA").paises, self.agregado("LATAM").paises), (1, 2))
+        publicar.assert_called_once()
+        borradas = publicar.call_args.kwargs["borradas"]
+        self.assertEqual((len(borradas), {fila[0] for fila in borradas}), (21, {"CO"}))
+
+    def test_endpoint_regiones(self):
+        client = APIClient()
+        client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        data = client.get("/api/regiones/?tipo=INFLACION&region=latam").json()
+        self.assertEqual([r["region"] for r in data["results"]], ["LATAM"])
+        self.assertEqual(data["results"][0]["promedio"], 6.0)
+
+
+class SparseFieldsYRenderersTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        self.co = crear_pais("CO", "COP")
+        for dia in (1, 2):
+            TipoCambio.objects.create(moneda_origen="COP", tasa=float(dia), fecha=datetime.date(2024, 1, dia))
+
+    def test_fields_y_exclude_recortan_respuesta_y_sql(self):
+        self.client.get("/api/auth/me/")
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get("/api/tipos-cambio/?fields=fecha,tasa").json()
+        self.assertEqual(data["results"][0], {"fecha": "2024-01-02", "tasa": 2.0})
+        self.assertNotIn("fuente", ctx.captured_queries[-1]["sql"])
+
+        pais = self.client.get("/api/paises/CO/?exclude=indicadores,hash_contenido").json()
+        self.assertNotIn("indicadores", pais)
+        self.assertIn("nombre", pais)
+
+        portafolio = Portafolio.objects.create(nombre="P")
+        Posicion.objects.create(portafolio=portafolio, pais=self.co, activo="X", moneda="COP")
+        with self.assertNumQueries(2):
+            data = self.client.get(f"/api/portafolios/{portafolio.pk}/posiciones/?fields=activo,pais_nombre").json()
+        self.assertEqual(data["results"], [{"activo": "X", "pais_nombre": "CO"}])
+
+    def test_fields_no_afecta_escrituras(self):
+        analista = crear_usuario("analista", "ANALISTA")
+        self.client.force_authenticate(analista)
+        resp = self.client.post("/api/portafolios/?fields=id", {"nombre": "P", "descripcion": "d"}, format="json")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(Portafolio.objects.get().descripcion, "d")
+
+    def test_formato_columnar(self):
+        data = self.client.get("/api/tipos-cambio/?format=columnar&fields=fecha,tasa").json()
+        self.assertEqual(data["results"], {"fecha": ["2024-01-02", "2024-01-01"], "tasa": [2.0, 1.0]})
+        serie = self.client.get("/api/paises/CO/tipo-cambio/serie/?format=columnar&frecuencia=diaria").json()
+        self.assertEqual(serie["serie"]["cierre"], [1.0, 2.0])
+
+    def test_renderer_igual_a_drf(self):
+        data = {"fecha": datetime.datetime(2024, 1, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+                "dia": datetime.date(2024, 1, 1), "texto": "año", "n": [1, 2.5, None]}
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(
+            super(FastJSONRenderer, FastJSONRenderer()).render(data)
+        ))
+
+
+class ExportacionesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        co = crear_pais("CO", "COP")
+        br = crear_pais("BR", "BRL", "CONO_SUR")
+        for anio in range(2000, 2010):
+            IndicadorEconomico.objects.create(pais=co, tipo="PIB", valor=anio, unidad="USD", anio=anio)
+            IndicadorEconomico.objects.create(pais=br, tipo="PIB", valor=anio, unidad="USD", anio=anio)
+        for dia in range(1, 4):
+            TipoCambio.objects.create(moneda_origen="COP", tasa=dia / 4000, fecha=datetime.date(2024, 1, dia))
+        self.portafolio = Portafolio.objects.create(nombre="P")
+        Posicion.objects.create(portafolio=self.portafolio, pais=co, activo="A, B", moneda="COP", cantidad=2)
+
+    def descargar(self, url):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return b"".join(resp.streaming_content)
+
+    def test_csv_reutiliza_filtros(self):
+        crudo = self.descargar("/api/indicadores/exportar/?region=ANDINA&desde=2005").decode()
+        filas = list(csv.reader(io.StringIO(crudo)))
+        self.assertEqual(filas[0], ["codigo_iso", "region", "tipo", "anio", "valor", "unidad", "fuente"])
+        self.assertEqual([f[3] for f in filas[1:]], ["2009", "2008", "2007", "2006", "2005"])
+
+        posiciones = self.descargar(f"/api/portafolios/{self.portafolio.pk}/posiciones/exportar/").decode()
+        self.assertEqual(list(csv.reader(io.StringIO(posiciones)))[1][0], "A, B")
+
+    async def test_streaming_async_bajo_asgi(self):
+        # Con un iterador síncrono Django juntaría toda la exportación en memoria
+        viewer = {"Authorization": f"Bearer {AccessToken.for_user(await User.objects.aget(username='viewer'))}"}
+        resp = await self.async_client.get("/api/tipos-cambio/exportar/?moneda_origen=COP", headers=viewer)
+        self.assertTrue(resp.is_async)
+        crudo = b"".join([bloque async for bloque in resp.streaming_content]).decode()
+        self.assertEqual(len(list(csv.reader(io.StringIO(crudo)))), 4)
+
+    def test_columnar_por_lotes(self):
+        crudo = b"".join(stream_columnar(IndicadorEconomico.objects.order_by("pk"), "indicadores", chunk_size=8))
+        grupos = list(leer_columnar(io.BytesIO(crudo)))
+        self.assertEqual([len(g["anio"]) for g in grupos], [8, 8, 4])
+
+        crudo = self.descargar("/api/tipos-cambio/exportar/?formato=columnar&desde=2024-01-02")
+        (grupo,) = leer_columnar(io.BytesIO(crudo))
+        self.assertEqual(grupo["fecha"].dtype, np.dtype("datetime64[D]"))
+        self.assertEqual(grupo["fecha"].astype(str).tolist(), ["2024-01-02", "2024-01-03"])
+        np.testing.assert_allclose(grupo["tasa"], [2 / 4000, 3 / 4000])
+
+    def test_fechas_invalidas(self):
+        for url in ("/api/tipos-cambio/", "/api/tipos-cambio/exportar/"):
+            for fecha in ("2024-02-30", "2024-13-01", "ayer"):
+                resp = self.client.get(url, {"desde": fecha})
+                self.assertEqual(resp.status_code, 400, (url, fecha))
+                self.assertEqual(resp.json(), {"detail": "desde debe ser una fecha válida YYYY-MM-DD."})
+
+    def test_formato_invalido_y_comando(self):
+        self.assertEqual(self.client.get("/api/indicadores/exportar/?formato=xls").status_code, 400)
+        with tempfile.TemporaryDirectory() as tmp:
+            salida = f"{tmp}/fx.csv"
+            call_command("exportar", "tipos-cambio", "--salida", salida, "--moneda-origen", "cop", stderr=io.StringIO())
+            with open(salida, encoding="utf-8") as f:
+                self.assertEqual(len(f.read().splitlines()), 4)
+
+
+class InstrumentacionTests(TestCase):
+    def setUp(self):
+        metricas.reiniciar()
+        self.client = APIClient()
+        crear_pais("CO", "COP")
+
+    def test_server_timing_y_prometheus(self):
+        self.client.force_authenticate(crear_usuario("viewer", "VIEWER"))
+        resp = self.client.get("/api/paises/")
+        self.assertRegex(resp["Server-Timing"], r'db;dur=[\d.]+;desc="\d+ queries", render;dur=')
+        (fila,) = [f for (endpoint, metodo), f in metricas.resumen().items() if endpoint == "PaisViewSet.list"]
+        self.assertEqual(fila["requests"], 1)
+
+        # render incluye serializer.data (con many=True), no solo Response.render()
+        original = PaisSerializer.to_representation
+
+        def lento(serializer, instancia):
+            time.sleep(0.05)
+            return original(serializer, instancia)
+
+        with mock.patch.object(PaisSerializer, "to_representation", lento):
+            resp = self.client.get("/api/paises/?region=ANDINA")
+        render = float(re.search(r"render;dur=([\d.]+)", resp["Server-Timing"]).group(1))
+        self.assertGreaterEqual(render, 50)
+        self.assertGreater(fila["queries"], 0)
+        self.assertGreater(fila["bytes"], 0)
+
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+        self.client.force_authenticate(crear_usuario("admin", "ADMIN"))
+        texto = self.client.get("/api/metrics/").content.decode()
+        self.assertIn('datapulse_requests_total{endpoint="PaisViewSet.list",method="GET"} 2', texto)
+        self.assertIn('datapulse_request_duration_ms{endpoint="PaisViewSet.list",method="GET",quantile="0.99"}', texto)
+
+    @override_settings(DATAPULSE_METRICS={"SAMPLE_RATE": 0.0})
+    def test_sin_muestreo(self):
+        self.assertNotIn("Server-Timing", self.client.get("/api/projects/"))
+        self.assertEqual(metricas.resumen(), {})
+
+
+class DatosSinteticosTests(TestCase):
+    def test_generar_escala(self):
+        escala = Escala(paises=5, fx_filas=50, anio_desde=2020, anio_hasta=2021, portafolios=2, posiciones=30)
+        contexto = generar(escala)
+        self.assertEqual(Pais.objects.count(), 5)
+        self.assertEqual(TipoCambio.objects.count(), 50)
+        self.assertEqual(IndicadorEconomico.objects.count(), 5 * len(IndicadorEconomico.Tipo.values) * 2)
+        self.assertEqual(Posicion.objects.count(), 30)
+        self.assertTrue(TipoCambio.objects.filter(moneda_origen=contexto["moneda"], fecha=contexto["desde"]).exists())
+        with self.assertRaises(ValueError):
+            generar(Escala(paises=0))
+
+
+class ConexionesTests(TestCase):
+    def test_pragmas_al_conectar(self):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+
+        with tempfile.TemporaryDirectory() as tmp:
+            conexion = DatabaseWrapper(
+                {
+                    **connection.settings_dict,
+                    "NAME": str(Path(tmp) / "pragmas.sqlite3"),
+                    "PRAGMAS": {"journal_mode": "WAL", "synchronous": "NORMAL", "cache_size": -2048},
+                },
+                alias="pragmas",
+            )
+            try:
+                with conexion.cursor() as cursor:
+                    leidos = {}
+                    for nombre in ("journal_mode", "synchronous", "cache_size"):
+                        cursor.execute(f"PRAGMA {nombre}")
+                        leidos[nombre] = cursor.fetchone()[0]
+            finally:
+                conexion.close()
+        self.assertEqual(leidos, {"journal_mode": "wal", "synchronous": 1, "cache_size": -2048})
+
+    @override_settings(DATAPULSE_DB={"PRIMARIO": "primario", "REPLICA": "default"})
+    def test_router_lecturas_de_requests_de_solo_lectura_a_replica(self):
+        router = db.RouterReplica()
+        self.assertEqual(router.db_for_read(Pais), "primario")
+        with db.lecturas_en_replica():
+            self.assertEqual(router.db_for_read(Pais), "default")
+            self.assertEqual(router.db_for_write(Pais), "primario")
+        self.assertFalse(router.allow_migrate("default", "api"))
+        self.assertIsNone(router.allow_migrate("primario", "api"))
+
+    @override_settings(DATAPULSE_DB={"PRIMARIO": "default", "REPLICA": "no_existe"})
+    def test_router_sin_replica_usa_el_primario(self):
+        with db.lecturas_en_replica():
+            self.assertEqual(db.RouterReplica().db_for_read(Pais), "default")
+
+    def test_middleware_marca_solo_metodos_de_lectura(self):
+        vistos = []
+
+        def vista(request):
+            vistos.append(db.en_replica())
+            return None
+
+        middleware = LecturasReplicaMiddleware(vista)
+        middleware(RequestFactory().get("/api/paises/"))
+        middleware(RequestFactory().post("/api/portafolios/"))
+        self.assertEqual(vistos, [True, False])
+        self.assertFalse(db.en_replica())
+
+        async def vista_async(request):
+            vistos.append(db.en_replica())
+
+        async_to_sync(LecturasReplicaMiddleware(vista_async))(RequestFactory().head("/api/paises/"))
+        self.assertEqual(vistos[-1], True)
+
+    def test_perfil_produccion(self):
+        entorno = {"DJANGO_SECRET_KEY": "x", "DATAPULSE_DB_REPLICA": "/tmp/replica.sqlite3"}
+        with mock.patch.dict(os.environ, entorno):
+            from config import settings_produccion
+            perfil = importlib.reload(settings_produccion)
+        self.assertFalse(perfil.DEBUG)
+        self.assertEqual(perfil.DATABASES["default"]["PRAGMAS"]["journal_mode"], "WAL")
+        self.assertGreater(perfil.DATABASES["default"]["CONN_MAX_AGE"], 0)
+        self.assertEqual(perfil.DATABASES["replica"]["PRAGMAS"]["query_only"], "ON")
+        self.assertNotIn("journal_mode", perfil.DATABASES["replica"]["PRAGMAS"])
+        self.assertEqual(perfil.DATABASE_ROUTERS, ["api.db.RouterReplica"])
+        self.assertIn("api.middleware.LecturasReplicaMiddleware", perfil.MIDDLEWARE)
+
+
+class AutenticacionCacheTests(TestCase):
+    def setUp(self):
+        autenticacion.usuarios.limpiar()
+        self.user = crear_usuario("ana", "VIEWER")
+        self.client = APIClient()
+        self._login(self.user)
+
+    def _login(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+    def test_usuario_y_roles_cacheados(self):
+        self.assertEqual(self.client.get("/api/auth/me/").json()["groups"], ["VIEWER"])
+        with self.assertNumQueries(0):
+            resp = self.client.get("/api/auth/me/")
+        self.assertEqual(resp.json()["username"], "ana")
+        self.assertEqual(resp.json()["groups"], ["VIEWER"])
+
+    @override_settings(DATAPULSE_AUTH={"TTL_S": 0})
+    def test_vence_con_el_ttl(self):
+        self.client.get("/api/auth/me/")
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/api/auth/me/")
+        self.assertGreater(len(ctx.captured_queries), 0)
+
+    def test_cambios_de_grupos_invalidan(self):
+        self.client.get("/api/auth/me/")
+        admin = Group.objects.create(name="ADMIN")
+        self.user.groups.add(admin)
+        self.assertEqual(self.client.get("/api/auth/me/").json()["groups"], ["ADMIN", "VIEWER"])
+        admin.user_set.remove(self.user)
+        self.assertEqual(self.client.get("/api/auth/me/").json()["groups"], ["VIEWER"])
+        Group.objects.filter(name="VIEWER").delete()
+        self.assertEqual(self.client.get("/api/auth/me/").json()["groups"], [])
+
+    def test_cambio_de_contrasena_revoca_tokens(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        self.user.set_password("nueva")
+        self.user.save()
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+        self._login(self.user)
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+
+    def test_usuario_inactivo(self):
+        self.client.get("/api/auth/me/")
+        User.objects.filter(pk=self.user.pk).update(is_active=False)  # sin señales: sigue en caché
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+
+    def test_login_con_roles(self):
+        resp = APIClient().post("/api/auth/login/", {"username": "ana", "password": "x"}, format="json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(AccessToken(resp.json()["access"])["roles"], ["VIEWER"])
+        with override_settings(DATAPULSE_AUTH={"ROLES_EN_TOKEN": False}):
+            resp = APIClient().post("/api/auth/login/", {"username": "ana", "password": "x"}, format="json")
+        self.assertNotIn("roles", AccessToken(resp.json()["access"]).payload)
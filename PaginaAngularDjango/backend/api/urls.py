@@ -1,8 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     ProjectViewSet, ContactMessageViewSet, PaisViewSet,
-    SyncPaisesView, MeView, PortafolioViewSet
+    SyncPaisesView, MeView, MetricsView, CambiosView, PortafolioViewSet,
+    ImportarIndicadoresView, ImportarTiposCambioView,
+    IndicadorEconomicoViewSet, TipoCambioViewSet, AgregadoRegionalViewSet, JobViewSet,
 )
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
@@ -10,12 +13,27 @@ router = DefaultRouter()
 router.register(r"projects", ProjectViewSet, basename="project")
 router.register(r"contact-messages", ContactMessageViewSet, basename="contactmessage")
 router.register(r"paises", PaisViewSet, basename="pais")
+router.register(r"indicadores", IndicadorEconomicoViewSet, basename="indicador")
+router.register(r"tipos-cambio", TipoCambioViewSet, basename="tipocambio")
+router.register(r"regiones", AgregadoRegionalViewSet, basename="agregadoregional")
 router.register(r"portafolios", PortafolioViewSet, basename="portafolio")  # ✅ ESTA LÍNEA
+router.register(r"jobs", JobViewSet, basename="job")
 
 urlpatterns = [
     path("", include(router.urls)),
     path("sync/paises/", SyncPaisesView.as_view(), name="sync-paises"),
+    path("importar/indicadores/", ImportarIndicadoresView.as_view(), name="importar-indicadores"),
+    path("importar/tipos-cambio/", ImportarTiposCambioView.as_view(), name="importar-tipos-cambio"),
     path("auth/login/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("auth/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("auth/me/", MeView.as_view(), name="auth-me"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path("cambios/<str:recurso>/", CambiosView.as_view(), name="cambios"),
+    # Versiones async (ASGI) de las lecturas de países / FX y del sync
+    path("async/paises/", async_views.paises, name="async-paises"),
+    path("async/paises/<str:codigo_iso>/", async_views.pais, name="async-pais"),
+    path("async/paises/<str:codigo_iso>/tipo-cambio/", async_views.pais_tipo_cambio, name="async-pais-tipo-cambio"),
+    path("async/tipos-cambio/", async_views.tipos_cambio, name="async-tipos-cambio"),
+    path("async/sync/paises/", async_views.sync_paises, name="async-sync-paises"),
+    path("eventos/", async_views.eventos_stream, name="eventos"),
 ]
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Valuación de portafolios en una moneda base.
+
+Convención de TipoCambio: 1 unidad de ``moneda_origen`` equivale a ``tasa``
+unidades de ``moneda_destino``. Todas las monedas se llevan a USD con su tasa
+más reciente y desde ahí a la moneda base.
+"""
+import numpy as np
+from django.db.models import OuterRef, Subquery
+
+from .models import Posicion, TipoCambio
+
+
+MONEDA_PIVOTE = "USD"
+
+
+class ValuacionError(Exception):
+    pass
+
+
+def tasas_a_usd(monedas, fecha=None) -> dict:
+    """
+    Última tasa moneda -> USD de cada moneda (a la fecha dada, si se pasa), en una sola query.
+    """
+    monedas = {m for m in monedas if m and m != MONEDA_PIVOTE}
+    tasas = {MONEDA_PIVOTE: 1.0}
+    if not monedas:
+        return tasas
+
+    ultimas = TipoCambio.objects.filter(
+        moneda_origen=OuterRef("moneda_origen"),
+        moneda_destino=MONEDA_PIVOTE,
+    )
+    base = TipoCambio.objects.filter(moneda_origen__in=monedas, moneda_destino=MONEDA_PIVOTE)
+    if fecha is not None:
+        ultimas = ultimas.filter(fecha__lte=fecha)
+        base = base.filter(fecha__lte=fecha)
+
+    filas = base.filter(
+        fecha=Subquery(ultimas.order_by("-fecha").values("fecha")[:1])
+    ).order_by().values_list("moneda_origen", "tasa")
+
+    tasas.update({moneda: tasa for moneda, tasa in filas if tasa})
+    return tasas
+
+
+def _agrupar(claves: np.ndarray, valores: np.ndarray, total: float) -> list:
+    unicas, inversa = np.unique(claves, return_inverse=True)
+    sumas = np.bincount(inversa, weights=valores, minlength=len(unicas))
+    orden = np.argsort(-sumas, kind="stable")
+    return [
+        {
+            "clave": str(unicas[i]),
+            "valor": float(sumas[i]),
+            "peso_porcentual": float(sumas[i] / total * 100) if total else 0.0,
+        }
+        for i in orden
+    ]
+
+
+def valorar_portafolio(portafolio, moneda_base: str = MONEDA_PIVOTE, fecha=None) -> dict:
+    """
+    Valora todas las posiciones del portafolio en ``moneda_base``.
+
+    Hace dos queries (posiciones y tasas) y el resto se calcula sobre arrays de NumPy.
+    Las posiciones cuya moneda no tiene tasa quedan fuera de los totales y se reportan
+    en ``monedas_sin_tasa``.
+    """
+    moneda_base = (moneda_base or MONEDA_PIVOTE).upper()
+
+    filas = list(
+        Posicion.objects.filter(portafolio=portafolio)
+        .order_by()
+        .values_list("cantidad", "precio_unitario", "moneda", "tipo_activo", "pais__codigo_iso", "pais__region")
+    )
+    if filas:
+        cantidad, precio, moneda, tipo_activo, pais, region = (np.asarray(c) for c in zip(*filas))
+    else:
+        cantidad = precio = np.empty(0, dtype=float)
+        moneda = tipo_activo = pais = region = np.empty(0, dtype=str)
+    moneda = np.char.upper(moneda.astype(str))
+
+    monedas, idx_moneda = np.unique(moneda, return_inverse=True)
+    tasas = tasas_a_usd(set(monedas.tolist()) | {moneda_base}, fecha=fecha)
+    if moneda_base not in tasas:
+        raise ValuacionError(f"No hay tipo de cambio {moneda_base}/{MONEDA_PIVOTE} registrado.")
+
+    # factor moneda -> base = (moneda -> USD) / (base -> USD); NaN si falta la tasa
+    a_usd = np.array([tasas.get(m, np.nan) for m in monedas.tolist()], dtype=float)
+    factor = a_usd / tasas[moneda_base]
+
+    valor = cantidad.astype(float) * precio.astype(float) * factor[idx_moneda]
+    valido = ~np.isnan(valor)
+    total = float(valor[valido].sum())
+
+    return {
+        "portafolio": portafolio.pk,
+        "moneda_base": moneda_base,
+        "fecha": fecha,
+        "total": total,
+        "posiciones": int(len(valor)),
+        "posiciones_valoradas": int(valido.sum()),
+        "por_pais": _agrupar(pais[valido], valor[valido], total),
+        "por_region": _agrupar(region[valido], valor[valido], total),
+        "por_tipo_activo": _agrupar(tipo_activo[valido], valor[valido], total),
+        "tipos_cambio": {
+            m: float(a_usd[i] / tasas[moneda_base])
+            for i, m in enumerate(monedas.tolist())
+            if not np.isnan(a_usd[i])
+        },
+        "monedas_sin_tasa": sorted(m for i, m in enumerate(monedas.tolist()) if np.isnan(a_usd[i])),
+    }
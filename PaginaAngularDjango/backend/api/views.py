@@ -1,22 +1,35 @@
-import json
-from urllib.request import Request, urlopen
-from urllib.error import URLError, HTTPError
-
+from django.db.models import Count, F, Max, Prefetch, Q, Window
+from django.db.models.functions import RowNumber, Upper
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-
-from .permissions import IsAdminRole, IsViewerOrAbove, IsAnalystOrAdmin
+from rest_framework.settings import api_settings
+
+from . import deltas, jobs
+from .cache import INDICADORES, PAISES, REGIONES, TIPOS_CAMBIO, cache_response
+from .conditional import conditional_response
+from .exportar import FORMATOS as FORMATOS_EXPORTACION, en_hilo, exportar
+from .metricas import SerializacionMedidaMixin, medido, metricas
+from .filtros import filtrar_indicadores, filtrar_tipos_cambio, parametro_fecha
+from .pagination import KeysetPagination
+from .renderers import ColumnarJSONRenderer
+from .permissions import IsAdminRole, IsViewerOrAbove, IsAnalystOrAdmin, get_user_roles
 from .models import (
     Project,
     ContactMessage,
     Pais,
     IndicadorEconomico,
     TipoCambio,
+    AgregadoRegional,
     Portafolio,
     Posicion,
+    ValorPortafolio,
+    Job,
 )
 from .serializers import (
     ProjectSerializer,
@@ -24,23 +37,166 @@ from .serializers import (
     PaisSerializer,
     PaisDetailSerializer,
     IndicadorEconomicoSerializer,
+    AgregadoRegionalSerializer,
     TipoCambioSerializer,
     PortafolioListSerializer,
     PortafolioDetailSerializer,
     PortafolioCreateSerializer,
     PosicionSerializer,
+    JobSerializer,
+)
+from .importers import FORMATOS as FORMATOS_IMPORTACION, formato_desde_nombre
+from .series import (
+    FRECUENCIAS,
+    LTTB_PUNTOS_DEFAULT,
+    LTTB_PUNTOS_MAX,
+    agregar_ohlc,
+    cargar_serie,
+    serie_lttb,
 )
+from .sync import parametros_job
+from .riesgo import CONFIANZAS_DEFAULT, HORIZONTE_MAX, RiesgoError, calcular_riesgo, ventana
+from .historico import FRECUENCIAS as FRECUENCIAS_HISTORICO, HistoricoError, serie as serie_historica
+from .valuacion import MONEDA_PIVOTE, ValuacionError, valorar_portafolio
+
+
+# ---- Agregados para el ETag (ver api/conditional.py) ----
+
+def _agregados_paises(view, request, **kwargs):
+    return view.filter_queryset(view.get_queryset()).order_by().aggregate(
+        ultima=Max("fecha_actualizacion"), total=Count("pk")
+    )
+
+
+def _agregados_pais_indicadores(view, request, codigo_iso=None, **kwargs):
+    return Pais.objects.filter(activo=True, codigo_iso=codigo_iso).aggregate(
+        pais=Max("fecha_actualizacion"),
+        indicadores_ultima=Max("indicadores__fecha_actualizacion"),
+        indicadores_total=Count("indicadores"),
+    )
+
+
+def _agregados_pais_tipo_cambio(view, request, codigo_iso=None, **kwargs):
+    pais = Pais.objects.filter(activo=True, codigo_iso=codigo_iso)
+    agregados = TipoCambio.objects.filter(
+        moneda_origen__in=pais.values("moneda_codigo"), moneda_destino="USD"
+    ).aggregate(ultima=Max("fecha_actualizacion"), total=Count("pk"))
+    agregados.update(pais.aggregate(pais=Max("fecha_actualizacion")))
+    return agregados
+
+
+def _agregados_portafolios(view, request, **kwargs):
+    return Portafolio.objects.aggregate(
+        ultima=Max("updated_at"),
+        total=Count("pk", distinct=True),
+        posiciones_total=Count("posiciones"),
+        posiciones_ultima=Max("posiciones__updated_at"),
+    )
+
+
+def _agregados_portafolio(view, request, pk=None, **kwargs):
+    return Portafolio.objects.filter(pk=pk).aggregate(
+        ultima=Max("updated_at"),
+        posiciones_total=Count("posiciones"),
+        posiciones_ultima=Max("posiciones__updated_at"),
+        paises_ultima=Max("posiciones__pais__fecha_actualizacion"),
+    )
+
+
+def _agregados_fx(monedas, base: str):
+    # Solo las tasas -> USD que lee la respuesta: las de otras monedas no cambian el ETag
+    return TipoCambio.objects.filter(
+        Q(moneda_origen__in=monedas) | Q(moneda_origen=base.upper()), moneda_destino=MONEDA_PIVOTE
+    ).aggregate(fx_ultima=Max("fecha_actualizacion"), fx_total=Count("pk"))
+
+
+def _agregados_valuacion(view, request, pk=None, **kwargs):
+    agregados = _agregados_portafolio(view, request, pk=pk, **kwargs)
+    monedas = Posicion.objects.filter(portafolio=pk).values(moneda_upper=Upper("moneda"))
+    agregados.update(_agregados_fx(monedas, request.query_params.get("moneda", MONEDA_PIVOTE)))
+    return agregados
+
+
+def _agregados_riesgo(view, request, pk=None, **kwargs):
+    # La ventana por defecto termina hoy: cambia cada día aunque no cambien tasas ni posiciones
+    agregados = _agregados_valuacion(view, request, pk=pk, **kwargs)
+    fechas = (parametro_fecha(request.query_params, nombre) for nombre in ("desde", "hasta"))
+    agregados["ventana"] = ventana(*fechas)
+    return agregados
+
+
+def _agregados_historico(view, request, pk=None, **kwargs):
+    # Las filas cambian con cada tasa o posición que las afecta; las tasas, por la moneda base
+    agregados = ValorPortafolio.objects.filter(portafolio=pk).aggregate(
+        ultima=Max("actualizado"), total=Count("pk")
+    )
+    agregados.update(_agregados_fx([], request.query_params.get("moneda", MONEDA_PIVOTE)))
+    return agregados
+
+
+# Endpoints de series: además del JSON normal admiten ?format=columnar
+RENDERERS_SERIES = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarJSONRenderer]
+
+
+def aplicar_campos(qs, serializer, extra=()):
+    """
+    Lleva ``?fields=`` / ``?exclude=`` al SQL con ``.only()``. ``extra`` son campos que la
+    vista necesita aunque no se serialicen (p. ej. los del cursor keyset).
+    """
+    rutas = serializer.campos_modelo()
+    if rutas is None:
+        return qs
+    select_related = qs.query.select_related
+    if isinstance(select_related, dict):
+        rutas |= set(select_related)
+    else:
+        # Sin select_related no se pueden diferir campos de una relación: basta con la FK
+        rutas = {r for r in rutas if "__" not in r}
+    return qs.only(*rutas, *(c.lstrip("-") for c in extra))
+
+
+def respuesta_exportacion(request, qs, recurso: str, nombre: str):
+    """
+    Descarga en streaming (?formato=csv|columnar) del queryset ya filtrado.
+    """
+    formato = request.query_params.get("formato", "csv")
+    if formato not in FORMATOS_EXPORTACION:
+        return Response(
+            {"detail": f"formato admite: {', '.join(FORMATOS_EXPORTACION)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    content_type, extension = FORMATOS_EXPORTACION[formato]
+    contenido = exportar(qs, recurso, formato)
+    if hasattr(request, "scope"):
+        contenido = en_hilo(contenido)  # ASGI: si no, Django la arma entera antes de mandarla
+    response = StreamingHttpResponse(contenido, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{nombre}.{extension}"'
+    return response
+
+
+class SparseFieldsViewMixin:
+    """
+    Aplica ``aplicar_campos`` al queryset de list/retrieve.
+    """
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action in ("list", "retrieve"):
+            qs = aplicar_campos(qs, self.get_serializer(), getattr(self, "keyset_ordering", ()))
+        return qs
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(SerializacionMedidaMixin, SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [permissions.AllowAny]
 
 
-class ContactMessageViewSet(viewsets.ModelViewSet):
+class ContactMessageViewSet(SerializacionMedidaMixin, SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = ContactMessage.objects.all()
     serializer_class = ContactMessageSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-created_at",)
 
     def get_permissions(self):
         # El formulario (Angular) debe poder crear sin login
@@ -50,7 +206,7 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
         return [IsAdminRole()]
 
 
-class PaisViewSet(viewsets.ReadOnlyModelViewSet):
+class PaisViewSet(SerializacionMedidaMixin, SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Pais.objects.filter(activo=True)
     serializer_class = PaisSerializer
     permission_classes = [IsViewerOrAbove]
@@ -61,6 +217,8 @@ class PaisViewSet(viewsets.ReadOnlyModelViewSet):
         region = self.request.query_params.get("region")
         if region:
             qs = qs.filter(region=region)
+        if self.action == "retrieve" and "indicadores" in self.get_serializer().fields:
+            qs = qs.prefetch_related("indicadores")
         return qs
 
     def get_serializer_class(self):
@@ -68,14 +226,86 @@ class PaisViewSet(viewsets.ReadOnlyModelViewSet):
             return PaisDetailSerializer
         return PaisSerializer
 
+    @conditional_response(_agregados_paises)
+    @cache_response(PAISES)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(_agregados_pais_indicadores)
+    @cache_response(PAISES, INDICADORES)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    BULK_MAX_PAISES = 50
+    BULK_INCLUDES = {"indicadores", "fx"}
+
+    @action(detail=False, methods=["get"], url_path="bulk")
+    @cache_response(PAISES, INDICADORES, TIPOS_CAMBIO)
+    def bulk(self, request):
+        """
+        GET /api/paises/bulk/?iso=CO,BR,MX&include=indicadores,fx
+        Una query por bloque (países, indicadores, última tasa por moneda) sin importar cuántos países.
+        """
+        codigos = [c.strip().upper() for c in request.query_params.get("iso", "").split(",") if c.strip()]
+        if not codigos or len(codigos) > self.BULK_MAX_PAISES:
+            return Response(
+                {"detail": f"iso debe tener entre 1 y {self.BULK_MAX_PAISES} códigos separados por coma."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        include = {i.strip() for i in request.query_params.get("include", "indicadores,fx").split(",") if i.strip()}
+        if include - self.BULK_INCLUDES:
+            return Response(
+                {"detail": f"include admite: {', '.join(sorted(self.BULK_INCLUDES))}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        paises = list(self.get_queryset().filter(codigo_iso__in=codigos))
+        data = {p.codigo_iso: {"pais": PaisSerializer(p).data} for p in paises}
+        por_id = {p.id: p.codigo_iso for p in paises}
+
+        if "indicadores" in include:
+            for iso in data:
+                data[iso]["indicadores"] = []
+            filas = (
+                IndicadorEconomico.objects.filter(pais_id__in=por_id)
+                .order_by("pais_id", "-anio", "tipo")
+                .values_list("pais_id", "tipo", "anio", "valor", "unidad")
+            )
+            for pais_id, tipo, anio, valor, unidad in filas:
+                data[por_id[pais_id]]["indicadores"].append(
+                    {"tipo": tipo, "anio": anio, "valor": valor, "unidad": unidad}
+                )
+
+        if "fx" in include:
+            # Última tasa por moneda con ROW_NUMBER() OVER (PARTITION BY moneda ORDER BY fecha DESC)
+            ultimas = {
+                fx["moneda_origen"]: fx
+                for fx in TipoCambio.objects.filter(
+                    moneda_origen__in={p.moneda_codigo for p in paises}, moneda_destino="USD"
+                )
+                .annotate(
+                    fila=Window(RowNumber(), partition_by=[F("moneda_origen")], order_by=F("fecha").desc())
+                )
+                .filter(fila=1)
+                .values("moneda_origen", "moneda_destino", "tasa", "fecha", "variacion_porcentual")
+            }
+            for p in paises:
+                data[p.codigo_iso]["fx"] = ultimas.get(p.moneda_codigo)
+
+        return Response({"paises": data, "faltantes": sorted(set(codigos) - data.keys())})
+
     @action(detail=True, methods=["get"], url_path="indicadores")
+    @conditional_response(_agregados_pais_indicadores)
+    @cache_response(PAISES, INDICADORES)
     def indicadores(self, request, codigo_iso=None):
         pais = self.get_object()
         qs = IndicadorEconomico.objects.filter(pais=pais).order_by("-anio")
-        serializer = IndicadorEconomicoSerializer(qs, many=True)
+        serializer = medido(IndicadorEconomicoSerializer(qs, many=True))
         return Response(serializer.data)
 
     @action(detail=True, methods=["get"], url_path="tipo-cambio")
+    @conditional_response(_agregados_pais_tipo_cambio)
+    @cache_response(PAISES, TIPOS_CAMBIO)
     def tipo_cambio(self, request, codigo_iso=None):
         pais = self.get_object()
         fx = (
@@ -88,118 +318,271 @@ class PaisViewSet(viewsets.ReadOnlyModelViewSet):
         )
         if not fx:
             return Response({"detail": "No hay tipo de cambio registrado."}, status=404)
-        serializer = TipoCambioSerializer(fx)
+        serializer = medido(TipoCambioSerializer(fx))
         return Response(serializer.data)
 
+    @action(detail=True, methods=["get"], url_path="tipo-cambio/serie", renderer_classes=RENDERERS_SERIES)
+    @conditional_response(_agregados_pais_tipo_cambio)
+    @cache_response(PAISES, TIPOS_CAMBIO)
+    def tipo_cambio_serie(self, request, codigo_iso=None):
+        """
+        GET /api/paises/{iso}/tipo-cambio/serie/?desde=&hasta=&frecuencia=diaria|semanal|mensual|lttb&puntos=
+        """
+        pais = self.get_object()
+        params = request.query_params
+
+        frecuencia = params.get("frecuencia", "diaria")
+        if frecuencia not in FRECUENCIAS:
+            return Response(
+                {"detail": f"frecuencia debe ser una de: {', '.join(FRECUENCIAS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rango = {nombre: parametro_fecha(params, nombre) for nombre in ("desde", "hasta")}
+        fechas, tasas = cargar_serie(pais.moneda_codigo, "USD", **rango)
+
+        if frecuencia == "lttb":
+            try:
+                puntos = int(params.get("puntos", LTTB_PUNTOS_DEFAULT))
+            except ValueError:
+                return Response({"detail": "puntos debe ser un entero."}, status=status.HTTP_400_BAD_REQUEST)
+            serie = serie_lttb(fechas, tasas, max(3, min(puntos, LTTB_PUNTOS_MAX)))
+        else:
+            serie = agregar_ohlc(fechas, tasas, frecuencia)
+
+        return Response(
+            {
+                "moneda_origen": pais.moneda_codigo,
+                "moneda_destino": "USD",
+                "frecuencia": frecuencia,
+                "desde": rango["desde"],
+                "hasta": rango["hasta"],
+                "puntos": len(serie),
+                "serie": serie,
+            }
+        )
+
+
+class IndicadorEconomicoViewSet(SerializacionMedidaMixin, SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    GET /api/indicadores/?pais=CO&region=ANDINA&tipo=PIB&desde=2000&hasta=2020&page_size=100&cursor=...
+    """
+    queryset = IndicadorEconomico.objects.all()
+    serializer_class = IndicadorEconomicoSerializer
+    permission_classes = [IsViewerOrAbove]
+    pagination_class = KeysetPagination
+    renderer_classes = RENDERERS_SERIES
+    keyset_ordering = ("-anio",)
+
+    def get_queryset(self):
+        return filtrar_indicadores(super().get_queryset(), self.request.query_params)
+
+    @action(detail=False, methods=["get"], url_path="exportar")
+    def exportar(self, request):
+        """
+        GET /api/indicadores/exportar/?formato=csv|columnar&pais=&region=&tipo=&desde=&hasta=
+        """
+        qs = self.get_queryset().order_by("-anio", "-pk")
+        return respuesta_exportacion(request, qs, "indicadores", "indicadores")
+
+
+class AgregadoRegionalViewSet(SerializacionMedidaMixin, SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    GET /api/regiones/?region=ANDINA&tipo=PIB&anio=2020&desde=2000&hasta=2020&cursor=...
+    region admite los valores de Pais.Region y LATAM. Lee la tabla materializada.
+    """
+    queryset = AgregadoRegional.objects.all()
+    serializer_class = AgregadoRegionalSerializer
+    permission_classes = [IsViewerOrAbove]
+    pagination_class = KeysetPagination
+    renderer_classes = RENDERERS_SERIES
+    keyset_ordering = ("-anio",)
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        params = self.request.query_params
+        if params.get("region"):
+            qs = qs.filter(region=params["region"].upper())
+        if params.get("tipo"):
+            qs = qs.filter(tipo=params["tipo"])
+        if params.get("anio", "").isdigit():
+            qs = qs.filter(anio=int(params["anio"]))
+        if params.get("desde", "").isdigit():
+            qs = qs.filter(anio__gte=int(params["desde"]))
+        if params.get("hasta", "").isdigit():
+            qs = qs.filter(anio__lte=int(params["hasta"]))
+        return qs
+
+    @cache_response(REGIONES)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class TipoCambioViewSet(SerializacionMedidaMixin, SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    GET /api/tipos-cambio/?moneda_origen=COP&moneda_destino=USD&desde=YYYY-MM-DD&hasta=YYYY-MM-DD&cursor=...
+    """
+    queryset = TipoCambio.objects.all()
+    serializer_class = TipoCambioSerializer
+    permission_classes = [IsViewerOrAbove]
+    pagination_class = KeysetPagination
+    renderer_classes = RENDERERS_SERIES
+    keyset_ordering = ("-fecha",)
+
+    def get_queryset(self):
+        return filtrar_tipos_cambio(super().get_queryset(), self.request.query_params)
+
+    @action(detail=False, methods=["get"], url_path="exportar")
+    def exportar(self, request):
+        """
+        GET /api/tipos-cambio/exportar/?formato=csv|columnar&moneda_origen=&moneda_destino=&desde=&hasta=
+        """
+        qs = self.get_queryset().order_by("moneda_origen", "moneda_destino", "fecha")
+        return respuesta_exportacion(request, qs, "tipos_cambio", "tipos_cambio")
+
+
+def respuesta_job(request, job, creado: bool):
+    """
+    202 con el estado del job y su URL de seguimiento (también si era un duplicado).
+    """
+    url = reverse("job-detail", args=[job.pk], request=request)
+    return Response(
+        {**JobSerializer(job).data, "duplicado": not creado, "url": url},
+        status=status.HTTP_202_ACCEPTED,
+        headers={"Location": url},
+    )
+
 
 class SyncPaisesView(APIView):
     """
-    Admin-only (por grupo ADMIN): sincroniza países desde RestCountries.
-    POST /api/sync/paises/
+    Admin-only (por grupo ADMIN): encola la sincronización de países desde RestCountries.
+    POST /api/sync/paises/  body opcional: {"iso": ["CO", "BR"], "forzar": false}
+    Responde 202 con el job; el avance se consulta en /api/jobs/{id}/.
+    """
+    permission_classes = [IsAdminRole]
+
+    def post(self, request):
+        try:
+            parametros = parametros_job(request.data)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        job, creado = jobs.encolar(Job.Tipo.SYNC_PAISES, parametros, usuario=request.user)
+        return respuesta_job(request, job, creado)
+
+
+class _ImportarArchivoView(APIView):
+    """
+    Base admin-only para las cargas masivas: recibe un archivo multipart y encola el job
+    (202). El mismo archivo con los mismos parámetros no se encola dos veces a la vez.
     """
     permission_classes = [IsAdminRole]
+    parser_classes = [MultiPartParser]
+    tipo_job = None
+    fuente_default = None
+    fuentes = None  # valores admitidos en el campo "fuente" del multipart; None = texto libre
 
-    ISO_CODES = ["CO", "BR", "MX", "AR", "CL", "PE", "EC", "BO", "PY", "UY"]
-
-    ANDINA = {"CO", "PE", "EC", "BO"}
-    CONO_SUR = {"AR", "CL", "PY", "UY", "BR"}
-    CENTROAMERICA = {"MX"}
-    CARIBE = set()
-
-    def _map_region(self, iso: str) -> str:
-        iso = iso.upper()
-        if iso in self.ANDINA:
-            return "ANDINA"
-        if iso in self.CONO_SUR:
-            return "CONO_SUR"
-        if iso in self.CENTROAMERICA:
-            return "CENTROAMERICA"
-        if iso in self.CARIBE:
-            return "CARIBE"
-        return "ANDINA"
+    def fuente(self, request) -> str:
+        fuente = request.data.get("fuente") or self.fuente_default
+        if self.fuentes is not None and fuente not in self.fuentes:
+            raise ValueError(f"Fuente desconocida: {fuente}")
+        return fuente
 
     def post(self, request):
-        codes = ",".join([c.lower() for c in self.ISO_CODES])
-        url = f"https://restcountries.com/v3.1/alpha?codes={codes}"
+        archivo = request.FILES.get("archivo")
+        if archivo is None:
+            return Response({"detail": "Falta el archivo."}, status=status.HTTP_400_BAD_REQUEST)
 
+        formato = request.data.get("formato") or formato_desde_nombre(archivo.name)
+        if formato not in FORMATOS_IMPORTACION:
+            return Response({"detail": f"Formato no soportado: {formato}"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            req = Request(url, headers={"User-Agent": "DataPulseDev/1.0"})
-            with urlopen(req, timeout=20) as resp:
-                data = json.loads(resp.read().decode("utf-8"))
-        except HTTPError as e:
-            return Response(
-                {"detail": f"RestCountries HTTPError: {e.code}"},
-                status=status.HTTP_502_BAD_GATEWAY,
-            )
-        except URLError as e:
+            fuente = self.fuente(request)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Las cargas grandes ya llegan a un temporal en disco (TemporaryFileUploadHandler)
+        job, creado = jobs.encolar(
+            self.tipo_job, {"formato": formato, "fuente": fuente}, archivo=archivo, usuario=request.user
+        )
+        return respuesta_job(request, job, creado)
+
+
+class ImportarIndicadoresView(_ImportarArchivoView):
+    """
+    Carga masiva de indicadores (CSV / JSON / JSON Lines, propio o del Banco Mundial).
+    POST /api/importar/indicadores/  multipart: archivo, formato (opcional), fuente (opcional)
+    """
+    tipo_job = Job.Tipo.IMPORTAR_INDICADORES
+    fuente_default = IndicadorEconomico.Fuente.WORLD_BANK
+    fuentes = IndicadorEconomico.Fuente.values
+
+
+class ImportarTiposCambioView(_ImportarArchivoView):
+    """
+    Carga masiva de tasas diarias; recalcula variacion_porcentual en la ventana afectada.
+    POST /api/importar/tipos-cambio/  multipart: archivo, formato (opcional), fuente (opcional)
+    """
+    tipo_job = Job.Tipo.IMPORTAR_TIPOS_CAMBIO
+    fuente_default = "MANUAL"
+
+
+class JobViewSet(SerializacionMedidaMixin, SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Admin-only: estado, progreso, throughput y errores de los jobs en segundo plano.
+    GET /api/jobs/?estado=&tipo=   GET /api/jobs/{id}/
+    """
+    queryset = Job.objects.select_related("usuario")
+    serializer_class = JobSerializer
+    permission_classes = [IsAdminRole]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        params = self.request.query_params
+        if params.get("estado"):
+            qs = qs.filter(estado=params["estado"])
+        if params.get("tipo"):
+            qs = qs.filter(tipo=params["tipo"])
+        return qs
+
+
+class CambiosView(APIView):
+    """
+    GET /api/cambios/{recurso}/?since=&limite=
+    Filas creadas / modificadas y claves borradas desde la marca ``since`` (todo si no se
+    pasa). Recursos: paises, indicadores, tipos_cambio, portafolios, posiciones.
+    """
+    permission_classes = [IsViewerOrAbove]
+
+    def get(self, request, recurso):
+        if recurso not in deltas.RECURSOS:
             return Response(
-                {"detail": f"RestCountries URLError: {str(e)}"},
-                status=status.HTTP_502_BAD_GATEWAY,
+                {"detail": f"recurso debe ser uno de: {', '.join(deltas.RECURSOS)}."},
+                status=status.HTTP_404_NOT_FOUND,
             )
-        except Exception as e:
-            return Response(
-                {"detail": f"Error inesperado: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        try:
+            limite = int(request.query_params["limite"]) if request.query_params.get("limite") else None
+        except ValueError:
+            return Response({"detail": "limite debe ser un entero."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            data = deltas.cambios(
+                recurso, request.query_params.get("since"), limite, context={"request": request}
             )
+        except deltas.MarcaInvalida as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except deltas.MarcaVencida as e:
+            return Response({"detail": str(e)}, status=status.HTTP_410_GONE)
+        return Response(data)
 
-        created = 0
-        updated = 0
-        errors = []
 
-        for item in data:
-            try:
-                iso = (item.get("cca2") or "").upper()
-                if not iso:
-                    continue
-
-                nombre = (item.get("name") or {}).get("common", iso)
-
-                currencies = item.get("currencies") or {}
-                moneda_codigo = ""
-                moneda_nombre = ""
-                if currencies:
-                    moneda_codigo = list(currencies.keys())[0]
-                    moneda_nombre = currencies[moneda_codigo].get("name", moneda_codigo)
-
-                latlng = item.get("latlng") or [0.0, 0.0]
-                latitud = float(latlng[0]) if len(latlng) > 0 else 0.0
-                longitud = float(latlng[1]) if len(latlng) > 1 else 0.0
-
-                poblacion = int(item.get("population") or 0)
-
-                region = self._map_region(iso)
-
-                _, was_created = Pais.objects.update_or_create(
-                    codigo_iso=iso,
-                    defaults={
-                        "nombre": nombre,
-                        "moneda_codigo": moneda_codigo,
-                        "moneda_nombre": moneda_nombre,
-                        "region": region,
-                        "latitud": latitud,
-                        "longitud": longitud,
-                        "poblacion": poblacion,
-                        "activo": True,
-                    },
-                )
-
-                if was_created:
-                    created += 1
-                else:
-                    updated += 1
-
-            except Exception as e:
-                errors.append({"iso": item.get("cca2"), "error": str(e)})
+class MetricsView(APIView):
+    """
+    Admin-only: métricas de requests del proceso en formato de texto de Prometheus.
+    GET /api/metrics/
+    """
+    permission_classes = [IsAdminRole]
 
-        return Response(
-            {
-                "detail": "Sync completado",
-                "created": created,
-                "updated": updated,
-                "errors": errors,
-            },
-            status=status.HTTP_200_OK,
-        )
+    def get(self, request):
+        return HttpResponse(metricas.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 class MeView(APIView):
@@ -207,7 +590,7 @@ class MeView(APIView):
 
     def get(self, request):
         user = request.user
-        groups = list(user.groups.values_list("name", flat=True))
+        groups = sorted(get_user_roles(user))
         return Response(
             {
                 "id": user.id,
@@ -219,16 +602,35 @@ class MeView(APIView):
         )
 
 
-class PortafolioViewSet(viewsets.ModelViewSet):
+class PortafolioViewSet(SerializacionMedidaMixin, SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Portafolio.objects.all()
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action == "list":
+            # Las queries con GROUP BY no heredan Meta.ordering
+            return qs.annotate(posiciones_count=Count("posiciones")).order_by("-created_at")
+        if self.action == "retrieve" and "posiciones" in self.get_serializer().fields:
+            return qs.prefetch_related(
+                Prefetch("posiciones", queryset=Posicion.objects.select_related("pais"))
+            )
+        return qs
+
     def get_permissions(self):
         # Leer: VIEWER o superior
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "valuacion", "riesgo", "historico", "posiciones", "exportar_posiciones"]:
             return [IsViewerOrAbove()]
         # Escribir: ANALISTA o superior
         return [IsAnalystOrAdmin()]
 
+    @conditional_response(_agregados_portafolios)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(_agregados_portafolio)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_serializer_class(self):
         # List: liviano
         if self.action == "list":
@@ -239,4 +641,102 @@ class PortafolioViewSet(viewsets.ModelViewSet):
             return PortafolioCreateSerializer
 
         # Retrieve: detalle con posiciones
-        return PortafolioDetailSerializer
\ No newline at end of file
+        return PortafolioDetailSerializer
+
+    @action(detail=True, methods=["get"], url_path="posiciones")
+    def posiciones(self, request, pk=None):
+        """
+        GET /api/portafolios/{id}/posiciones/?page_size=&cursor=  (keyset sobre -created_at)
+        """
+        portafolio = self.get_object()
+        paginator = KeysetPagination()
+        paginator.ordering = ("-created_at",)
+        serializer = PosicionSerializer(context=self.get_serializer_context())
+        qs = aplicar_campos(
+            Posicion.objects.filter(portafolio=portafolio).select_related("pais"), serializer, paginator.ordering
+        )
+        page = paginator.paginate_queryset(qs, request)
+        return paginator.get_paginated_response(
+            medido(PosicionSerializer(page, many=True, context=self.get_serializer_context())).data
+        )
+
+    @action(detail=True, methods=["get"], url_path="posiciones/exportar")
+    def exportar_posiciones(self, request, pk=None):
+        """
+        GET /api/portafolios/{id}/posiciones/exportar/?formato=csv|columnar
+        """
+        portafolio = self.get_object()
+        qs = Posicion.objects.filter(portafolio=portafolio).order_by("-created_at", "-pk")
+        return respuesta_exportacion(request, qs, "posiciones", f"portafolio_{portafolio.pk}_posiciones")
+
+    @action(detail=True, methods=["get"], url_path="valuacion")
+    @conditional_response(_agregados_valuacion)
+    def valuacion(self, request, pk=None):
+        """
+        GET /api/portafolios/{id}/valuacion/?moneda=USD&fecha=YYYY-MM-DD
+        """
+        portafolio = self.get_object()
+        moneda = request.query_params.get("moneda", "USD")
+
+        fecha = parametro_fecha(request.query_params, "fecha")
+        try:
+            data = valorar_portafolio(portafolio, moneda_base=moneda, fecha=fecha)
+        except ValuacionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+    @action(detail=True, methods=["get"], url_path="historico", renderer_classes=RENDERERS_SERIES)
+    @conditional_response(_agregados_historico)
+    def historico(self, request, pk=None):
+        """
+        GET /api/portafolios/{id}/historico/?moneda=USD&desde=&hasta=&frecuencia=diaria|semanal|mensual
+        Valor diario de las posiciones actuales (tabla ValorPortafolio, ver api.historico).
+        """
+        portafolio = self.get_object()
+        params = request.query_params
+
+        frecuencia = params.get("frecuencia", "diaria")
+        if frecuencia not in FRECUENCIAS_HISTORICO:
+            return Response(
+                {"detail": f"frecuencia debe ser una de: {', '.join(FRECUENCIAS_HISTORICO)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rango = {nombre: parametro_fecha(params, nombre) for nombre in ("desde", "hasta")}
+        try:
+            data = serie_historica(portafolio, params.get("moneda", "USD"), frecuencia=frecuencia, **rango)
+        except HistoricoError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+    @action(detail=True, methods=["get"], url_path="riesgo")
+    @conditional_response(_agregados_riesgo)
+    def riesgo(self, request, pk=None):
+        """
+        GET /api/portafolios/{id}/riesgo/?moneda=USD&desde=&hasta=&confianza=0.95,0.99&horizonte=1
+        Riesgo cambiario: volatilidad, VaR / CVaR y correlación de las monedas del portafolio.
+        """
+        portafolio = self.get_object()
+        params = request.query_params
+
+        fechas = {nombre: parametro_fecha(params, nombre) for nombre in ("desde", "hasta")}
+        try:
+            confianzas = tuple(float(c) for c in params["confianza"].split(",")) if params.get("confianza") \
+                else CONFIANZAS_DEFAULT
+            horizonte = int(params.get("horizonte", 1))
+        except ValueError:
+            return Response({"detail": "confianza y horizonte deben ser numéricos."}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(0.5 <= c < 1 for c in confianzas) or not 1 <= horizonte <= HORIZONTE_MAX:
+            return Response(
+                {"detail": f"confianza debe estar en [0.5, 1) y horizonte entre 1 y {HORIZONTE_MAX}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            data = calcular_riesgo(
+                portafolio, moneda_base=params.get("moneda", "USD"), confianzas=confianzas, horizonte=horizonte,
+                **fechas,
+            )
+        except RiesgoError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
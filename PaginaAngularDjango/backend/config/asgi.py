@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
+
+Las vistas de api/async_views.py (/api/async/...) solo ganan concurrencia bajo un
+servidor ASGI, p. ej.: uvicorn config.asgi:application --workers 2
 """
 
 import os
@@ -1,6 +1,8 @@
 from pathlib import Path
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -35,6 +37,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.InstrumentacionMiddleware',
      'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -112,13 +115,21 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Archivos de las cargas masivas mientras esperan al worker (api/jobs.py, MEDIA_ROOT/tmp/jobs/).
+# El worker y los servidores web tienen que ver el mismo directorio.
+MEDIA_ROOT = BASE_DIR / 'media'
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.autenticacion.JWTCacheAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
 }
@@ -128,9 +139,90 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:4200",
 ]
 
+# GET condicional desde Angular: enviar validadores y leer los de la respuesta
+CORS_ALLOW_HEADERS = (*default_headers, "if-none-match", "if-modified-since")
+CORS_EXPOSE_HEADERS = ["ETag", "Last-Modified"]
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": False,
+    # Claim con el hash de la contraseña: cambiarla revoca los tokens emitidos. Los tokens
+    # emitidos antes de activarlo no traen el claim y se rechazan: todos deben volver a loguearse
+    "CHECK_REVOKE_TOKEN": True,
+    "TOKEN_OBTAIN_SERIALIZER": "api.serializers.TokenConRolesSerializer",
+}
+
+# Usuario y roles del JWT cacheados en memoria del proceso (api/autenticacion.py). Se invalida
+# por señales en este proceso; en los demás workers un cambio tarda hasta TTL_S en verse.
+DATAPULSE_AUTH = {
+    "ENABLED": True,
+    "TTL_S": 60,
+    "ROLES_EN_TOKEN": True,
+}
+
+# Sync de países (api/sync.py). ISO_CODES es la lista por defecto cuando el POST no envía "iso".
+DATAPULSE_SYNC = {
+    "URL": "https://restcountries.com/v3.1/alpha",
+    "ISO_CODES": ["CO", "BR", "MX", "AR", "CL", "PE", "EC", "BO", "PY", "UY"],
+    "BATCH_SIZE": 25,
+    "MAX_WORKERS": 4,
+    "TIMEOUT": 20,
+}
+
+# Cola de jobs en la BD (api/jobs.py): sync de países y cargas masivas responden 202 y los
+# ejecuta `manage.py worker`. EAGER=True los corre dentro del request (desarrollo sin worker).
+# El worker invalida la caché en su propio proceso: con LocMemCache los servidores web no se
+# enteran hasta el TIMEOUT, así que en producción conviene una caché compartida.
+DATAPULSE_JOBS = {
+    "MAX_INTENTOS": 3,
+    "BACKOFF_S": 30,
+    "BACKOFF_MAX_S": 900,
+    "TIMEOUT_S": 600,
+    "EAGER": False,
+}
+
+# Feed SSE de /api/eventos/ (api/eventos.py). Solo funciona bajo ASGI. Los eventos van a la
+# tabla EventoCambio (también los del worker y los de otros workers de uvicorn); cada proceso
+# web la consulta cada POLL_S como mucho. `manage.py purgar_borrados` borra los de más de RETENCION_H.
+DATAPULSE_EVENTOS = {
+    "ENABLED": True,
+    "BUFFER": 1000,
+    "POLL_S": 1,
+    "RETENCION_H": 24,
+    "KEEPALIVE_S": 15,
+    "DURACION_MAX_S": 300,
+}
+
+# Feed de cambios /api/cambios/<recurso>/?since= (api/deltas.py) para la copia local del frontend.
+# Las lápidas de borrados se purgan con `manage.py purgar_borrados` pasada la retención.
+DATAPULSE_DELTAS = {
+    "LIMITE": 1000,
+    "SOLAPE_S": 5,
+    "RETENCION_DIAS": 30,
+}
+
+# Caché de respuestas de solo lectura (api/cache.py). LocMemCache es por proceso: con varios
+# workers usar FileBasedCache para que la invalidación llegue a todos.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "datapulse",
+    }
+}
+
+DATAPULSE_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": 300,
+    "ENABLED": True,
+}
+
+# Instrumentación por request (api.middleware) expuesta en /api/metrics/.
+# Las métricas son por proceso; en producción conviene bajar SAMPLE_RATE.
+DATAPULSE_METRICS = {
+    "ENABLED": True,
+    "SAMPLE_RATE": 1.0,
+    "WINDOW": 1024,
+    "SERVER_TIMING": True,
 }
@@ -0,0 +1,84 @@
+"""
+Perfil de producción: ``DJANGO_SETTINGS_MODULE=config.settings_produccion``.
+
+Hereda config/settings.py y cambia lo que depende del despliegue: secretos por variables
+de entorno, conexiones persistentes, PRAGMAs de SQLite y, si se define
+``DATAPULSE_DB_REPLICA``, un alias de réplica para las lecturas de la API.
+``manage.py benchmark_concurrencia`` compara este perfil con el de desarrollo.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, MIDDLEWARE
+
+DEBUG = False
+
+# Vacía, Django se niega a arrancar: no hay clave por defecto en producción
+SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "")
+
+ALLOWED_HOSTS = [h.strip() for h in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",") if h.strip()]
+
+# WAL: los lectores no bloquean al escritor (sync de países, importaciones) ni al revés.
+# Con WAL, synchronous=NORMAL no corrompe la base; solo puede perder la última transacción
+# si se corta la luz. cache_size negativo es en KiB, por conexión.
+PRAGMAS_SQLITE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 20_000,
+}
+
+# CONN_MAX_AGE reutiliza la conexión entre requests del mismo hilo (WSGI). Bajo ASGI las
+# vistas sync corren en hilos distintos y las conexiones no se reutilizan igual: el ahorro
+# es menor, pero los PRAGMAs se aplican siempre al conectar.
+DATABASES = {
+    "default": {
+        **DATABASES["default"],
+        "NAME": os.environ.get("DJANGO_DB_PATH", DATABASES["default"]["NAME"]),
+        "CONN_MAX_AGE": int(os.environ.get("DJANGO_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+        # IMMEDIATE: la transacción toma el lock de escritura al empezar y espera
+        # busy_timeout, en vez de fallar con "database is locked" al querer escribir
+        "OPTIONS": {"timeout": 20, "transaction_mode": "IMMEDIATE"},
+        "PRAGMAS": PRAGMAS_SQLITE,
+    },
+}
+
+# Réplica opcional para las lecturas de los requests GET (api/db.py). Con SQLite puede ser
+# el mismo archivo: otra conexión en solo lectura, que en WAL lee sin esperar al escritor.
+DATAPULSE_DB = {
+    "PRIMARIO": "default",
+    "REPLICA": "replica",
+}
+
+ROUTERS_REPLICA = ["api.db.RouterReplica"]
+MIDDLEWARE_REPLICA = [MIDDLEWARE[0], "api.middleware.LecturasReplicaMiddleware", *MIDDLEWARE[1:]]
+
+
+def replica(primario: dict, nombre) -> dict:
+    return {
+        **primario,
+        "NAME": nombre,
+        "OPTIONS": {"timeout": 20},
+        "PRAGMAS": {
+            **{k: v for k, v in PRAGMAS_SQLITE.items() if k != "journal_mode"},
+            "query_only": "ON",
+        },
+        "TEST": {"MIRROR": "default"},
+    }
+
+
+if os.environ.get("DATAPULSE_DB_REPLICA"):
+    DATABASES["replica"] = replica(DATABASES["default"], os.environ["DATAPULSE_DB_REPLICA"])
+    DATABASE_ROUTERS = ROUTERS_REPLICA
+    MIDDLEWARE = MIDDLEWARE_REPLICA
+
+# Con varios workers la caché tiene que ser compartida para que la invalidación llegue a todos
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("DATAPULSE_CACHE_DIR", "/var/tmp/datapulse_cache"),
+    }
+}
@@ -1,8 +1,8 @@
-import { Component, OnInit } from '@angular/core';
+import { Component, OnDestroy, OnInit } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { ActivatedRoute, RouterModule } from '@angular/router';
-import { forkJoin } from 'rxjs';
-import { ApiService, Pais, IndicadorEconomico, TipoCambio } from '../../services/api.service';
+import { forkJoin, Subscription } from 'rxjs';
+import { ApiService, EventoCambio, Pais, IndicadorEconomico, TipoCambio } from '../../services/api.service';
 
 @Component({
   selector: 'app-pais-detail',
@@ -11,7 +11,7 @@ import { ApiService, Pais, IndicadorEconomico, TipoCambio } from '../../services
   templateUrl: './pais-detail.html',
   styleUrl: './pais-detail.css',
 })
-export class PaisDetailComponent implements OnInit {
+export class PaisDetailComponent implements OnInit, OnDestroy {
   codigoISO = '';
 
   loading = true;
@@ -21,11 +21,55 @@ export class PaisDetailComponent implements OnInit {
   indicadores: IndicadorEconomico[] = [];
   tipoCambio: TipoCambio | null = null;
 
+  private eventos?: Subscription;
+
   constructor(private route: ActivatedRoute, private api: ApiService) {}
 
   ngOnInit(): void {
     this.codigoISO = (this.route.snapshot.paramMap.get('codigo') || '').toUpperCase();
     this.load();
+    // Cambios en vivo en lugar de volver a consultar
+    this.eventos = this.api.eventos().subscribe((evento) => {
+      if (evento === 'reset') this.load();
+      else this.aplicar(evento);
+    });
+  }
+
+  ngOnDestroy(): void {
+    this.eventos?.unsubscribe();
+  }
+
+  private aplicar(evento: EventoCambio): void {
+    if (evento.canal === 'tipos_cambio') {
+      const fx = this.tipoCambio;
+      if (!fx) return;
+      for (const [origen, destino, fecha, tasa] of evento.filas) {
+        if (origen === fx.moneda_origen && destino === fx.moneda_destino && fecha >= fx.fecha) {
+          // La variación la recalcula el backend: se deja vacía hasta la próxima carga
+          const variacion = fecha === fx.fecha ? fx.variacion_porcentual : null;
+          this.tipoCambio = { ...fx, fecha, tasa, variacion_porcentual: variacion };
+        }
+      }
+      return;
+    }
+    let cambio = false;
+    for (const [iso, tipo, anio, valor] of evento.filas) {
+      if (iso !== this.codigoISO) continue;
+      const actual = this.indicadores.find((i) => i.tipo === tipo && i.anio === anio);
+      if (actual) {
+        actual.valor = valor;
+        cambio = true;
+      } else {
+        // Falta unidad / fuente: se recarga la lista completa
+        this.load();
+        return;
+      }
+    }
+    for (const [iso, tipo, anio] of evento.borradas || []) {
+      if (iso !== this.codigoISO) continue;
+      this.indicadores = this.indicadores.filter((i) => !(i.tipo === tipo && i.anio === anio));
+    }
+    if (cambio) this.indicadores = [...this.indicadores];
   }
 
   load(): void {
@@ -12,9 +12,12 @@ import { ApiService, Pais, Region } from '../../services/api.service';
   styleUrl: './paises.css',
 })
 export class PaisesComponent implements OnInit {
-  // data
+  private readonly pageSize = 20;
+
+  // data: copia local completa (api.sincronizar), filtrada y paginada en el cliente
   paises: Pais[] = [];
   filtered: Pais[] = [];
+  visibles: Pais[] = [];
 
   // ui state
   loading = true;
@@ -24,74 +27,72 @@ export class PaisesComponent implements OnInit {
   region: Region | '' = '';
   search = '';
 
-  // pagination (DRF)
+  // pagination
   page = 1;
   count = 0;
-  next: string | null = null;
-  previous: string | null = null;
 
   constructor(private api: ApiService) {}
 
   ngOnInit(): void {
-    this.load(1);
+    this.load();
   }
 
-  load(page = 1): void {
+  load(): void {
     this.loading = true;
     this.error = '';
 
-    this.api
-      .getPaises({
-        region: this.region === '' ? undefined : (this.region as Region),
-        page,
-      })
-      .subscribe({
-        next: (res) => {
-          this.paises = res.results;
-          this.count = res.count;
-          this.next = res.next;
-          this.previous = res.previous;
-          this.page = page;
-
-          this.applyFilters();
-          this.loading = false;
-        },
-        error: () => {
-          this.error = 'No se pudieron cargar los países.';
-          this.loading = false;
-        },
-      });
+    this.api.sincronizar<Pais>('paises').subscribe({
+      next: (paises) => {
+        this.paises = paises.sort((a, b) => a.nombre.localeCompare(b.nombre));
+        this.applyFilters();
+        this.loading = false;
+      },
+      error: () => {
+        this.error = 'No se pudieron cargar los países.';
+        this.loading = false;
+      },
+    });
   }
 
   applyFilters(): void {
     const q = this.search.trim().toLowerCase();
 
-    if (!q) {
-      this.filtered = [...this.paises];
-      return;
-    }
-
     this.filtered = this.paises.filter((p) => {
+      if (this.region && p.region !== this.region) return false;
       return (
+        !q ||
         p.nombre.toLowerCase().includes(q) ||
         p.codigo_iso.toLowerCase().includes(q) ||
         p.moneda_codigo.toLowerCase().includes(q)
       );
     });
+    this.count = this.filtered.length;
+    this.goTo(1);
   }
 
   onRegionChange(value: Region | ''): void {
     this.region = value;
-    this.load(1);
+    this.applyFilters();
+  }
+
+  get hasPrev(): boolean {
+    return this.page > 1;
+  }
+
+  get hasNext(): boolean {
+    return this.page * this.pageSize < this.count;
   }
 
   goPrev(): void {
-    if (!this.previous) return;
-    this.load(this.page - 1);
+    if (this.hasPrev) this.goTo(this.page - 1);
   }
 
   goNext(): void {
-    if (!this.next) return;
-    this.load(this.page + 1);
+    if (this.hasNext) this.goTo(this.page + 1);
+  }
+
+  private goTo(page: number): void {
+    this.page = page;
+    this.visibles = this.filtered.slice((page - 1) * this.pageSize, page * this.pageSize);
   }
-}
\ No newline at end of file
+}
@@ -31,9 +31,10 @@ export class PortafoliosComponent implements OnInit {
       this.canCreate = this.auth.hasAnyRole(['ADMIN', 'ANALISTA']);
     }
 
-    this.api.getPortafolios().subscribe({
-      next: (res) => {
-        this.items = res.results ?? [];
+    // Copia local: en cada visita solo se bajan los portafolios que cambiaron
+    this.api.sincronizar<Portafolio>('portafolios').subscribe({
+      next: (items) => {
+        this.items = items.sort((a, b) => (b.created_at ?? '').localeCompare(a.created_at ?? ''));
         this.loading = false;
       },
       error: () => {
@@ -1,7 +1,7 @@
 import { Component } from '@angular/core';
 import { CommonModule } from '@angular/common';
-import { finalize } from 'rxjs';
-import { ApiService } from '../../services/api.service';
+import { finalize, switchMap } from 'rxjs';
+import { ApiService, Job } from '../../services/api.service';
 
 @Component({
   selector: 'app-sync',
@@ -13,20 +13,26 @@ import { ApiService } from '../../services/api.service';
 export class SyncComponent {
   loading = false;
   error = '';
-  result: any = null;
+  job: Job | null = null;
 
   constructor(private api: ApiService) {}
 
   runSync(): void {
     this.loading = true;
     this.error = '';
-    this.result = null;
+    this.job = null;
 
     this.api
       .syncPaises()
-      .pipe(finalize(() => (this.loading = false)))
+      .pipe(
+        switchMap((job) => this.api.seguirJob(job.id)),
+        finalize(() => (this.loading = false))
+      )
       .subscribe({
-        next: (res) => (this.result = res),
+        next: (job) => {
+          this.job = job;
+          if (job.estado === 'FALLIDO') this.error = 'El sync falló después de reintentar.';
+        },
         error: (err) => {
           if (err?.status === 403) this.error = 'No tienes permisos (solo ADMIN).';
           else this.error = 'No se pudo sincronizar.';
@@ -1,16 +1,24 @@
 import { Injectable } from '@angular/core';
-import { HttpClient, HttpParams } from '@angular/common/http';
-import { Observable } from 'rxjs';
+import { HttpClient, HttpErrorResponse, HttpHeaders, HttpParams } from '@angular/common/http';
+import { Observable, of, throwError, timer } from 'rxjs';
+import { catchError, map, switchMap, takeWhile } from 'rxjs/operators';
 import { environment } from '../../environments/environment';
+import { AuthService } from './auth.service';
 
 // ---- DRF pagination ----
-export interface PaginatedResponse<T> {
-  count: number;
+// Paginación keyset (indicadores, tipos de cambio, posiciones, mensajes): sin count,
+// next/previous son URLs con ?cursor= que se siguen con getPage().
+export interface CursorPaginatedResponse<T> {
   next: string | null;
   previous: string | null;
+  page_size: number;
   results: T[];
 }
 
+export interface PaginatedResponse<T> extends Omit<CursorPaginatedResponse<T>, 'page_size'> {
+  count: number;
+}
+
 // ---- Models ----
 export interface Project {
   id: number;
@@ -60,10 +68,122 @@ export interface TipoCambio {
   moneda_destino: string;
   tasa: number;
   fecha: string;
-  variacion_porcentual: number;
+  variacion_porcentual: number | null;
   fuente: string;
 }
 
+export interface AgregadoRegional {
+  region: Region | 'LATAM';
+  tipo: string;
+  anio: number;
+  paises: number;
+  promedio: number;
+  promedio_ponderado: number | null;
+  mediana: number;
+  minimo: number;
+  maximo: number;
+  ranking: { codigo_iso: string; valor: number; posicion: number }[];
+  actualizado: string;
+}
+
+export type FormatoExportacion = 'csv' | 'columnar';
+
+export type FrecuenciaSerie = 'diaria' | 'semanal' | 'mensual' | 'lttb';
+
+export interface PuntoOHLC {
+  fecha: string;
+  apertura: number;
+  maximo: number;
+  minimo: number;
+  cierre: number;
+  promedio: number;
+  n: number;
+}
+
+export interface PuntoLTTB {
+  fecha: string;
+  tasa: number;
+}
+
+export interface SerieTipoCambio {
+  moneda_origen: string;
+  moneda_destino: string;
+  frecuencia: FrecuenciaSerie;
+  desde: string | null;
+  hasta: string | null;
+  puntos: number;
+  serie: (PuntoOHLC | PuntoLTTB)[];
+}
+
+export type PaisesBulkInclude = 'indicadores' | 'fx';
+
+export interface PaisBulk {
+  pais: Pais;
+  indicadores?: Pick<IndicadorEconomico, 'tipo' | 'anio' | 'valor' | 'unidad'>[];
+  fx?: Pick<TipoCambio, 'moneda_origen' | 'moneda_destino' | 'tasa' | 'fecha' | 'variacion_porcentual'> | null;
+}
+
+export interface PaisesBulkResponse {
+  paises: Record<string, PaisBulk>;
+  faltantes: string[];
+}
+
+// ---- Feed SSE /api/eventos/ ----
+export type CanalEvento = 'tipos_cambio' | 'indicadores';
+
+// filas según columnas: tipos_cambio [moneda_origen, moneda_destino, fecha, tasa],
+// indicadores [codigo_iso, tipo, anio, valor]; borradas sin la última columna
+export interface EventoCambio {
+  canal: CanalEvento;
+  columnas: string[];
+  filas: any[][];
+  borradas?: any[][];
+}
+
+// ---- Feed de cambios /api/cambios/<recurso>/ (copia local) ----
+export type RecursoDelta = 'paises' | 'indicadores' | 'tipos_cambio' | 'portafolios' | 'posiciones';
+
+// borrados: claves (campo `clave`) a quitar de la copia; se aplican antes que los cambios
+export interface DeltaResponse<T> {
+  recurso: RecursoDelta;
+  clave: string;
+  cambios: T[];
+  borrados: string[];
+  since: string;
+  mas: boolean;
+}
+
+interface CopiaLocal<T> {
+  since: string;
+  filas: Record<string, T>;
+}
+
+// ---- Jobs en segundo plano (sync / cargas masivas) ----
+export type EstadoJob = 'PENDIENTE' | 'EN_CURSO' | 'COMPLETADO' | 'FALLIDO';
+
+export interface Job {
+  id: number;
+  tipo: 'SYNC_PAISES' | 'IMPORTAR_INDICADORES' | 'IMPORTAR_TIPOS_CAMBIO';
+  estado: EstadoJob;
+  parametros: Record<string, any>;
+  usuario: string | null;
+  intentos: number;
+  max_intentos: number;
+  disponible_desde: string;
+  procesados: number;
+  total: number | null;
+  progreso: number | null;  // 0..1 si se conoce el total
+  por_segundo: number | null;
+  resultado: Record<string, any> | null;
+  errores: any[];
+  creado: string;
+  iniciado: string | null;
+  terminado: string | null;
+  // solo en la respuesta 202
+  duplicado?: boolean;
+  url?: string;
+}
+
 // ---- Portafolios ----
 export interface Portafolio {
   id: number;
@@ -73,6 +193,82 @@ export interface Portafolio {
   updated_at?: string;
 }
 
+export interface ValuacionGrupo {
+  clave: string;
+  valor: number;
+  peso_porcentual: number;
+}
+
+export interface PortafolioValuacion {
+  portafolio: number;
+  moneda_base: string;
+  fecha: string | null;
+  total: number;
+  posiciones: number;
+  posiciones_valoradas: number;
+  por_pais: ValuacionGrupo[];
+  por_region: ValuacionGrupo[];
+  por_tipo_activo: ValuacionGrupo[];
+  tipos_cambio: Record<string, number>;
+  monedas_sin_tasa: string[];
+}
+
+export interface PortafolioHistorico {
+  portafolio: number;
+  moneda_base: string;
+  frecuencia: 'diaria' | 'semanal' | 'mensual';
+  desde: string | null;
+  hasta: string | null;
+  puntos: number;
+  serie: { fecha: string; valor: number }[];
+}
+
+export interface RiesgoVaR {
+  var: number;
+  cvar: number;
+  var_porcentual: number;
+  cvar_porcentual: number;
+}
+
+export interface PortafolioRiesgo {
+  portafolio: number;
+  moneda_base: string;
+  desde: string;
+  hasta: string;
+  desde_efectivo: string;
+  observaciones: number;
+  horizonte_dias: number;
+  valor_total: number;
+  volatilidad: { diaria_porcentual: number; anual_porcentual: number; horizonte_monto: number };
+  var: { confianza: number; historico: RiesgoVaR; parametrico: RiesgoVaR }[];
+  monedas: {
+    moneda: string;
+    exposicion: number;
+    peso_porcentual: number;
+    volatilidad_anual_porcentual: number;
+    contribucion_porcentual: number;
+  }[];
+  correlacion: { monedas: string[]; matriz: number[][] };
+  monedas_sin_tasa: string[];
+  monedas_sin_historia: string[];
+}
+
+export interface Posicion {
+  id: number;
+  portafolio: number;
+  pais: number;
+  pais_nombre: string;
+  activo: string;
+  ticker: string;
+  tipo_activo: string;
+  moneda: string;
+  cantidad: number;
+  precio_unitario: number;
+  peso_porcentual: number | null;
+  created_at: string;
+  updated_at: string;
+}
+
 export interface PortafolioCreate {
   nombre: string;
   descripcion: string;
@@ -82,7 +278,110 @@ export interface PortafolioCreate {
 export class ApiService {
   private readonly baseUrl = environment.apiUrl;
 
-  constructor(private http: HttpClient) {}
+  // Último ETag y cuerpo por URL: se reenvía como If-None-Match y un 304 devuelve el cuerpo guardado.
+  // LRU: el Map conserva el orden de inserción y se descartan las URLs usadas hace más tiempo.
+  private static readonly MAX_VALIDATORS = 100;
+  private readonly validators = new Map<string, { etag: string; body: unknown }>();
+
+  // Copias locales por recurso (también en localStorage para sobrevivir recargas)
+  private readonly copias = new Map<RecursoDelta, CopiaLocal<unknown>>();
+
+  constructor(private http: HttpClient, private auth: AuthService) {}
+
+  private getConditional<T>(url: string, params?: HttpParams): Observable<T> {
+    const key = params?.keys().length ? `${url}?${params.toString()}` : url;
+    const cached = this.validators.get(key);
+    const headers = cached ? new HttpHeaders({ 'If-None-Match': cached.etag }) : undefined;
+
+    return this.http.get<T>(url, { params, headers, observe: 'response' }).pipe(
+      map((res) => {
+        const etag = res.headers.get('ETag');
+        if (etag) this.recordarValidador(key, { etag, body: res.body });
+        return res.body as T;
+      }),
+      catchError((err: unknown) => {
+        if (err instanceof HttpErrorResponse && err.status === 304 && cached) {
+          this.recordarValidador(key, cached);
+          return of(cached.body as T);
+        }
+        return throwError(() => err);
+      })
+    );
+  }
+
+  private recordarValidador(key: string, validador: { etag: string; body: unknown }): void {
+    this.validators.delete(key);
+    this.validators.set(key, validador);
+    while (this.validators.size > ApiService.MAX_VALIDATORS) {
+      this.validators.delete(this.validators.keys().next().value as string);
+    }
+  }
+
+  // ---- Copia local con deltas ----
+  // La primera vez baja todo; después solo lo creado, modificado o borrado desde la última marca.
+  sincronizar<T>(recurso: RecursoDelta): Observable<T[]> {
+    const copia = this.leerCopia<T>(recurso);
+
+    return this.bajarCambios<T>(recurso, copia).pipe(
+      map((nueva) => {
+        this.guardarCopia(recurso, nueva);
+        return Object.values(nueva.filas);
+      }),
+      catchError((err: unknown) => {
+        // 410: la marca es más vieja que la retención de borrados, se empieza de cero
+        if (err instanceof HttpErrorResponse && err.status === 410 && copia) {
+          this.borrarCopia(recurso);
+          return this.sincronizar<T>(recurso);
+        }
+        return throwError(() => err);
+      })
+    );
+  }
+
+  private bajarCambios<T>(recurso: RecursoDelta, copia: CopiaLocal<T> | null): Observable<CopiaLocal<T>> {
+    const params = copia ? new HttpParams().set('since', copia.since) : undefined;
+
+    return this.http.get<DeltaResponse<T>>(`${this.baseUrl}/cambios/${recurso}/`, { params }).pipe(
+      switchMap((res) => {
+        const filas = { ...(copia?.filas ?? {}) };
+        for (const clave of res.borrados) delete filas[clave];
+        for (const fila of res.cambios) filas[String((fila as Record<string, unknown>)[res.clave])] = fila;
+
+        const nueva = { since: res.since, filas };
+        return res.mas ? this.bajarCambios(recurso, nueva) : of(nueva);
+      })
+    );
+  }
+
+  private leerCopia<T>(recurso: RecursoDelta): CopiaLocal<T> | null {
+    const enMemoria = this.copias.get(recurso);
+    if (enMemoria) return enMemoria as CopiaLocal<T>;
+    try {
+      const guardada = localStorage.getItem(`datapulse.cambios.${recurso}`);
+      return guardada ? (JSON.parse(guardada) as CopiaLocal<T>) : null;
+    } catch {
+      return null;
+    }
+  }
+
+  private guardarCopia<T>(recurso: RecursoDelta, copia: CopiaLocal<T>): void {
+    this.copias.set(recurso, copia);
+    try {
+      localStorage.setItem(`datapulse.cambios.${recurso}`, JSON.stringify(copia));
+    } catch {
+      // Sin espacio: la copia queda solo en memoria hasta recargar
+    }
+  }
+
+  private borrarCopia(recurso: RecursoDelta): void {
+    this.copias.delete(recurso);
+    localStorage.removeItem(`datapulse.cambios.${recurso}`);
+  }
+
+  // ---- Paginación keyset ----
+  getPage<T>(url: string): Observable<CursorPaginatedResponse<T>> {
+    return this.http.get<CursorPaginatedResponse<T>>(url);
+  }
 
   // ---- Projects ----
   getProjects(): Observable<PaginatedResponse<Project>> {
@@ -102,38 +401,214 @@ export class ApiService {
     if (options?.page) params = params.set('page', String(options.page));
     if (options?.pageSize) params = params.set('page_size', String(options.pageSize));
 
-    return this.http.get<PaginatedResponse<Pais>>(`${this.baseUrl}/paises/`, { params });
+    return this.getConditional<PaginatedResponse<Pais>>(`${this.baseUrl}/paises/`, params);
   }
 
   getPais(codigoISO: string): Observable<Pais> {
-    return this.http.get<Pais>(`${this.baseUrl}/paises/${codigoISO}/`);
+    return this.getConditional<Pais>(`${this.baseUrl}/paises/${codigoISO}/`);
   }
 
   getPaisIndicadores(codigoISO: string): Observable<IndicadorEconomico[]> {
-    return this.http.get<IndicadorEconomico[]>(`${this.baseUrl}/paises/${codigoISO}/indicadores/`);
+    return this.getConditional<IndicadorEconomico[]>(`${this.baseUrl}/paises/${codigoISO}/indicadores/`);
   }
 
   getPaisTipoCambio(codigoISO: string): Observable<TipoCambio> {
-    return this.http.get<TipoCambio>(`${this.baseUrl}/paises/${codigoISO}/tipo-cambio/`);
+    return this.getConditional<TipoCambio>(`${this.baseUrl}/paises/${codigoISO}/tipo-cambio/`);
+  }
+
+  getPaisTipoCambioSerie(
+    codigoISO: string,
+    options?: { desde?: string; hasta?: string; frecuencia?: FrecuenciaSerie; puntos?: number }
+  ): Observable<SerieTipoCambio> {
+    let params = new HttpParams();
+
+    if (options?.desde) params = params.set('desde', options.desde);
+    if (options?.hasta) params = params.set('hasta', options.hasta);
+    if (options?.frecuencia) params = params.set('frecuencia', options.frecuencia);
+    if (options?.puntos) params = params.set('puntos', String(options.puntos));
+
+    return this.getConditional<SerieTipoCambio>(`${this.baseUrl}/paises/${codigoISO}/tipo-cambio/serie/`, params);
+  }
+
+  getPaisesBulk(
+    codigosISO: string[],
+    include: PaisesBulkInclude[] = ['indicadores', 'fx']
+  ): Observable<PaisesBulkResponse> {
+    const params = new HttpParams().set('iso', codigosISO.join(',')).set('include', include.join(','));
+    return this.http.get<PaisesBulkResponse>(`${this.baseUrl}/paises/bulk/`, { params });
+  }
+
+  getIndicadores(options?: {
+    pais?: string;
+    region?: Region;
+    tipo?: string;
+    desde?: number;
+    hasta?: number;
+    pageSize?: number;
+    fields?: string[];
+  }): Observable<CursorPaginatedResponse<IndicadorEconomico>> {
+    let params = new HttpParams();
+
+    if (options?.pais) params = params.set('pais', options.pais);
+    if (options?.region) params = params.set('region', options.region);
+    if (options?.tipo) params = params.set('tipo', options.tipo);
+    if (options?.desde) params = params.set('desde', String(options.desde));
+    if (options?.hasta) params = params.set('hasta', String(options.hasta));
+    if (options?.pageSize) params = params.set('page_size', String(options.pageSize));
+    if (options?.fields?.length) params = params.set('fields', options.fields.join(','));
+
+    return this.http.get<CursorPaginatedResponse<IndicadorEconomico>>(`${this.baseUrl}/indicadores/`, { params });
   }
 
-  syncPaises(): Observable<any> {
-    return this.http.post(`${this.baseUrl}/sync/paises/`, {});
+  // Descarga completa con los mismos filtros que getIndicadores / getTiposCambio
+  exportar(
+    recurso: 'indicadores' | 'tipos-cambio',
+    filtros: Record<string, string | number> = {},
+    formato: FormatoExportacion = 'csv'
+  ): Observable<Blob> {
+    let params = new HttpParams().set('formato', formato);
+    for (const [clave, valor] of Object.entries(filtros)) params = params.set(clave, String(valor));
+    return this.http.get(`${this.baseUrl}/${recurso}/exportar/`, { params, responseType: 'blob' });
+  }
+
+  getRegiones(options?: {
+    region?: Region | 'LATAM';
+    tipo?: string;
+    anio?: number;
+    desde?: number;
+    hasta?: number;
+    pageSize?: number;
+    fields?: string[];
+  }): Observable<CursorPaginatedResponse<AgregadoRegional>> {
+    let params = new HttpParams();
+
+    if (options?.region) params = params.set('region', options.region);
+    if (options?.tipo) params = params.set('tipo', options.tipo);
+    if (options?.anio) params = params.set('anio', String(options.anio));
+    if (options?.desde) params = params.set('desde', String(options.desde));
+    if (options?.hasta) params = params.set('hasta', String(options.hasta));
+    if (options?.pageSize) params = params.set('page_size', String(options.pageSize));
+    if (options?.fields?.length) params = params.set('fields', options.fields.join(','));
+
+    return this.http.get<CursorPaginatedResponse<AgregadoRegional>>(`${this.baseUrl}/regiones/`, { params });
+  }
+
+  getTiposCambio(options?: {
+    monedaOrigen?: string;
+    monedaDestino?: string;
+    desde?: string;
+    hasta?: string;
+    pageSize?: number;
+    fields?: string[];
+  }): Observable<CursorPaginatedResponse<TipoCambio>> {
+    let params = new HttpParams();
+
+    if (options?.monedaOrigen) params = params.set('moneda_origen', options.monedaOrigen);
+    if (options?.monedaDestino) params = params.set('moneda_destino', options.monedaDestino);
+    if (options?.desde) params = params.set('desde', options.desde);
+    if (options?.hasta) params = params.set('hasta', options.hasta);
+    if (options?.pageSize) params = params.set('page_size', String(options.pageSize));
+    if (options?.fields?.length) params = params.set('fields', options.fields.join(','));
+
+    return this.http.get<CursorPaginatedResponse<TipoCambio>>(`${this.baseUrl}/tipos-cambio/`, { params });
+  }
+
+  // Deltas en vivo. Emite 'reset' cuando el servidor no puede reanudar (reinicio o
+  // desconexión larga): hay que recargar el estado completo. EventSource reconecta solo.
+  eventos(canales: CanalEvento[] = ['tipos_cambio', 'indicadores']): Observable<EventoCambio | 'reset'> {
+    return new Observable((subscriber) => {
+      const params = new HttpParams()
+        .set('canales', canales.join(','))
+        .set('token', this.auth.getAccessToken() || '');
+      const source = new EventSource(`${this.baseUrl}/eventos/?${params.toString()}`);
+      const onDelta = (e: MessageEvent) => subscriber.next(JSON.parse(e.data) as EventoCambio);
+      canales.forEach((canal) => source.addEventListener(canal, onDelta as EventListener));
+      source.addEventListener('reset', () => subscriber.next('reset'));
+      return () => source.close();
+    });
+  }
+
+  // 202: el sync queda encolado; seguirlo con seguirJob()
+  syncPaises(): Observable<Job> {
+    return this.http.post<Job>(`${this.baseUrl}/sync/paises/`, {});
+  }
+
+  getJob(id: number): Observable<Job> {
+    return this.http.get<Job>(`${this.baseUrl}/jobs/${id}/`);
+  }
+
+  // Consulta el job cada intervaloMs y emite cada estado hasta que termina (incluido el final)
+  seguirJob(id: number, intervaloMs = 1000): Observable<Job> {
+    return timer(0, intervaloMs).pipe(
+      switchMap(() => this.getJob(id)),
+      takeWhile((job) => job.estado === 'PENDIENTE' || job.estado === 'EN_CURSO', true)
+    );
   }
 
   // ---- Portafolios ----
   getPortafolios(): Observable<PaginatedResponse<Portafolio>> {
-    return this.http.get<PaginatedResponse<Portafolio>>(`${this.baseUrl}/portafolios/`);
+    return this.getConditional<PaginatedResponse<Portafolio>>(`${this.baseUrl}/portafolios/`);
   }
 
   getPortafolio(id: number): Observable<Portafolio> {
-    return this.http.get<Portafolio>(`${this.baseUrl}/portafolios/${id}/`);
+    return this.getConditional<Portafolio>(`${this.baseUrl}/portafolios/${id}/`);
   }
 
   createPortafolio(payload: PortafolioCreate): Observable<Portafolio> {
     return this.http.post<Portafolio>(`${this.baseUrl}/portafolios/`, payload);
   }
 
+  getPosiciones(id: number, options?: { pageSize?: number }): Observable<CursorPaginatedResponse<Posicion>> {
+    let params = new HttpParams();
+
+    if (options?.pageSize) params = params.set('page_size', String(options.pageSize));
+
+    return this.http.get<CursorPaginatedResponse<Posicion>>(`${this.baseUrl}/portafolios/${id}/posiciones/`, { params });
+  }
+
+  exportarPosiciones(id: number, formato: FormatoExportacion = 'csv'): Observable<Blob> {
+    const params = new HttpParams().set('formato', formato);
+    return this.http.get(`${this.baseUrl}/portafolios/${id}/posiciones/exportar/`, { params, responseType: 'blob' });
+  }
+
+  getPortafolioValuacion(id: number, options?: { moneda?: string; fecha?: string }): Observable<PortafolioValuacion> {
+    let params = new HttpParams();
+
+    if (options?.moneda) params = params.set('moneda', options.moneda);
+    if (options?.fecha) params = params.set('fecha', options.fecha);
+
+    return this.getConditional<PortafolioValuacion>(`${this.baseUrl}/portafolios/${id}/valuacion/`, params);
+  }
+
+  getPortafolioHistorico(
+    id: number,
+    options?: { moneda?: string; desde?: string; hasta?: string; frecuencia?: PortafolioHistorico['frecuencia'] }
+  ): Observable<PortafolioHistorico> {
+    let params = new HttpParams();
+
+    if (options?.moneda) params = params.set('moneda', options.moneda);
+    if (options?.desde) params = params.set('desde', options.desde);
+    if (options?.hasta) params = params.set('hasta', options.hasta);
+    if (options?.frecuencia) params = params.set('frecuencia', options.frecuencia);
+
+    return this.getConditional<PortafolioHistorico>(`${this.baseUrl}/portafolios/${id}/historico/`, params);
+  }
+
+  getPortafolioRiesgo(
+    id: number,
+    options?: { moneda?: string; desde?: string; hasta?: string; confianza?: number[]; horizonte?: number }
+  ): Observable<PortafolioRiesgo> {
+    let params = new HttpParams();
+
+    if (options?.moneda) params = params.set('moneda', options.moneda);
+    if (options?.desde) params = params.set('desde', options.desde);
+    if (options?.hasta) params = params.set('hasta', options.hasta);
+    if (options?.confianza?.length) params = params.set('confianza', options.confianza.join(','));
+    if (options?.horizonte) params = params.set('horizonte', options.horizonte);
+
+    return this.getConditional<PortafolioRiesgo>(`${this.baseUrl}/portafolios/${id}/riesgo/`, params);
+  }
+
   deletePortafolio(id: number): Observable<any> {
     return this.http.delete(`${this.baseUrl}/portafolios/${id}/`);
   }